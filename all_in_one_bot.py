@@ -10,11 +10,15 @@ import pkgutil
 import platform
 import traceback
 import logging
+import asyncio
+import threading
 from typing import Optional, Any, Tuple
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
+from nija_startup import phase, startup_report
+
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("coinbase_loader")
 
@@ -145,17 +149,31 @@ def brute_force_discover():
     return tried
 
 
-DISCOVERY["attempts"] = brute_force_discover()
-if CLIENT_CLASS:
-    log.info("Discovered Coinbase client class %s from %s", getattr(CLIENT_CLASS, "__name__", str(CLIENT_CLASS)), CLIENT_MODULE)
-else:
-    log.warning("No Coinbase client discovered. Running in diagnostic mode.")
+# Discovery imports candidate SDKs and scans every installed module, so it
+# runs once on first use (kicked off in the background at app startup)
+# instead of at import time.
+_discover_lock = threading.Lock()
+
+
+def ensure_discovered():
+    """Run brute_force_discover() once; returns CLIENT_CLASS (or None)."""
+    if "done" not in DISCOVERY:
+        with _discover_lock:
+            if "done" not in DISCOVERY:
+                with phase("client discovery"):
+                    DISCOVERY["attempts"] = brute_force_discover()
+                DISCOVERY["done"] = True
+                if CLIENT_CLASS:
+                    log.info("Discovered Coinbase client class %s from %s", getattr(CLIENT_CLASS, "__name__", str(CLIENT_CLASS)), CLIENT_MODULE)
+                else:
+                    log.warning("No Coinbase client discovered. Running in diagnostic mode.")
+    return CLIENT_CLASS
 
 
 def instantiate_client_safe(**kwargs) -> Tuple[Optional[Any], dict]:
     """Try common instantiation patterns. Returns (instance_or_none, details)."""
     info = {"attempts": [], "success": False}
-    if CLIENT_CLASS is None:
+    if ensure_discovered() is None:
         info["error"] = "No CLIENT_CLASS discovered"
         return None, info
 
@@ -190,6 +208,11 @@ def instantiate_client_safe(**kwargs) -> Tuple[Optional[Any], dict]:
 app = FastAPI(title="NIJA Coinbase Diagnostic & Loader", version="1.0")
 
 
+@app.on_event("startup")
+async def discover_in_background():
+    asyncio.get_running_loop().run_in_executor(None, ensure_discovered)
+
+
 def installed_snapshot(limit=200):
     out = []
     try:
@@ -204,11 +227,13 @@ def installed_snapshot(limit=200):
 
 @app.get("/")
 async def root():
-    return {"status": "ok", "client_found": bool(CLIENT_CLASS), "client_module": CLIENT_MODULE}
+    return {"status": "ok", "discovery_done": "done" in DISCOVERY, "client_found": bool(CLIENT_CLASS),
+            "client_module": CLIENT_MODULE, "startup": startup_report()}
 
 
 @app.get("/diag2")
 async def diag2():
+    await asyncio.to_thread(ensure_discovered)
     try:
         site_paths = []
         try:
@@ -236,6 +261,7 @@ async def diag2():
 
 @app.get("/tryclient")
 async def tryclient():
+    await asyncio.to_thread(ensure_discovered)
     names = ["coinbase_advanced_py", "coinbase_advanced", "coinbase"]
     out = {}
     for n in names:
@@ -259,7 +285,7 @@ class InstReq(BaseModel):
 
 @app.post("/instantiate")
 async def instantiate(req: InstReq):
-    if CLIENT_CLASS is None:
+    if await asyncio.to_thread(ensure_discovered) is None:
         raise HTTPException(status_code=400, detail="No client discovered; check /diag2")
     kwargs = {}
     if req.api_key:
@@ -287,7 +313,7 @@ class TradeReq(BaseModel):
 
 @app.post("/trade")
 async def trade(req: TradeReq):
-    if CLIENT_CLASS is None:
+    if await asyncio.to_thread(ensure_discovered) is None:
         raise HTTPException(status_code=400, detail="No client discovered; check /diag2 and /instantiate")
     # For safety we expect credentials in env variables
     api_key = os.getenv("COINBASE_API_KEY")
@@ -3,20 +3,33 @@ import os
 import asyncio
 import logging
 import traceback
-from fastapi import FastAPI, Header, HTTPException, Body
-from fastapi.responses import JSONResponse
+import time
+from fastapi import FastAPI, Header, HTTPException, Body, Request
+from fastapi.responses import JSONResponse, Response, PlainTextResponse
+
+from nija_metrics import (
+    render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE, exchange_call,
+    ORDERS_SENT, ORDERS_BLOCKED, ORDERS_DRY_RUN, ORDER_ERRORS, WEBHOOK_LATENCY,
+)
+from nija_loop_monitor import LoopWatchdog
+from nija_profiler import SamplingProfiler
+from nija_risk import RiskEngine
+from nija_portfolio import service_for
+from nija_price_cache import price_cache_for
+from nija_startup import LazyObject, phase, startup_report
+from nija_timeseries import recorder_from_env
 
 # ----------------------
 # Configuration (env)
 # ----------------------
 # You asked to "start trading go live" — DRY_RUN defaults to False here.
 DRY_RUN = os.getenv("DRY_RUN", "false").lower() in ("1", "true", "yes")
-# Extra safety: live order execution requires this to be explicitly set to "true".
-LIVE_ORDER_ENABLED = os.getenv("LIVE_ORDER_ENABLED", "false").lower() in ("1", "true", "yes")
-# Kill switch (set to "ON" to block all orders immediately)
-KILL_SWITCH = os.getenv("KILL_SWITCH", "OFF").upper()
-# Per-order USD cap to avoid giant accidental orders
-MAX_ORDER_USD = float(os.getenv("MAX_ORDER_USD", "10"))
+# Risk limits are read from env ONCE into an in-memory snapshot:
+#   LIVE_ORDER_ENABLED (extra safety, must be "true" for live orders),
+#   KILL_SWITCH ("ON" blocks all orders), MAX_ORDER_USD (per-order cap),
+#   MAX_SYMBOL_EXPOSURE_USD, MAX_PORTFOLIO_EXPOSURE_USD, MAX_DAILY_LOSS_USD, MAX_ORDERS_PER_MIN.
+# Admin endpoints publish new snapshots; os.environ is never mutated.
+risk_engine = RiskEngine()
 # Admin secret (protect admin endpoints)
 ADMIN_SECRET = os.getenv("ADMIN_SECRET", "change-me")
 # Polling interval for balances
@@ -29,65 +42,88 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name
 logger = logging.getLogger("nija")
 
 # ----------------------
-# Initialize Coinbase client (try modern SDK, fallback to legacy)
+# Coinbase client (try modern SDK, fallback to legacy)
+# Created on first use / by the startup task in a worker thread, so importing
+# this module (and answering /health) never waits on SDK imports or auth.
 # ----------------------
-client = None
 client_type = None
-try:
-    import coinbase_advanced_py as cbadv
-    client = cbadv.Client(os.getenv("API_KEY"), os.getenv("API_SECRET"))
-    client_type = "coinbase_advanced_py"
-    logger.info("Using coinbase_advanced_py client")
-except Exception as e:
-    logger.info("coinbase_advanced_py not available or failed to init: %s", e)
+
+def _create_client():
+    global client_type
+    try:
+        import coinbase_advanced_py as cbadv
+        c = cbadv.Client(os.getenv("API_KEY"), os.getenv("API_SECRET"))
+        client_type = "coinbase_advanced_py"
+        logger.info("Using coinbase_advanced_py client")
+        return c
+    except Exception as e:
+        logger.info("coinbase_advanced_py not available or failed to init: %s", e)
     try:
         from coinbase.wallet.client import Client as CBWalletClient
-        client = CBWalletClient(os.getenv("API_KEY"), os.getenv("API_SECRET"))
+        c = CBWalletClient(os.getenv("API_KEY"), os.getenv("API_SECRET"))
         client_type = "coinbase_wallet_client"
         logger.info("Using coinbase.wallet.client")
+        return c
     except Exception as e2:
         logger.warning("No Coinbase client available: %s", e2)
-        client = None
+        return None
+
+client = LazyObject(_create_client, "exchange client")   # falsy if no SDK could be initialized
 
 # ----------------------
 # Helper functions
 # ----------------------
-def can_place_order(usd_value_estimate: float):
+def can_place_order(usd_value_estimate: float, symbol: str | None = None, side: str = "buy"):
     """Return (ok:bool, reason:str|None)"""
-    if os.getenv("KILL_SWITCH", KILL_SWITCH).upper() == "ON":
-        return False, "kill_switch"
-    if usd_value_estimate > float(os.getenv("MAX_ORDER_USD", MAX_ORDER_USD)):
-        return False, "max_order_exceeded"
-    return True, None
+    return risk_engine.check(usd_value_estimate, symbol, side)
+
+def record_sent_order(order_payload: dict, usd_value_estimate: float):
+    """Feed a sent order to the risk engine as a fill (realized PnL -> daily loss limit)."""
+    symbol, side = order_payload.get("symbol"), order_payload.get("side")
+    try:
+        size = float(order_payload.get("size") or 0)
+        price = float(order_payload.get("price") or 0) or price_cache_for(client).get(symbol)
+    except Exception as e:
+        logger.warning("No fill price for %s, recording exposure only: %s", symbol, e)
+        size = price = 0
+    if size and price:
+        risk_engine.record_fill(symbol, side, size, price)
+    else:
+        risk_engine.record_order(symbol, side, usd_value_estimate)
 
 def place_order_safe(order_payload: dict, usd_value_estimate: float):
     """
     Centralized order gate:
       - If KILL_SWITCH is ON -> block
-      - If exceeds MAX_ORDER_USD -> block
+      - If exceeds MAX_ORDER_USD / exposure / daily loss / order-rate limits -> block
       - If DRY_RUN -> returns dry_run
       - If LIVE_ORDER_ENABLED is False -> returns blocked_by_live_flag
       - If client is available and LIVE_ORDER_ENABLED True -> attempt to place order
     IMPORTANT: adapt SDK call below to the exact method of your installed SDK.
     """
+    cfg = risk_engine.config
     logger.info("place_order_safe called: DRY_RUN=%s LIVE_ORDER_ENABLED=%s payload=%s",
-                DRY_RUN, LIVE_ORDER_ENABLED, order_payload)
+                DRY_RUN, cfg.live_order_enabled, order_payload)
 
-    ok, reason = can_place_order(usd_value_estimate)
+    ok, reason = can_place_order(usd_value_estimate, order_payload.get("symbol"), order_payload.get("side", "buy"))
     if not ok:
         logger.warning("Order blocked: %s payload=%s", reason, order_payload)
+        ORDERS_BLOCKED.labels(reason).inc()
         return {"status": "blocked", "reason": reason}
 
     if DRY_RUN:
         logger.info("DRY_RUN active — not sending live order. payload=%s", order_payload)
+        ORDERS_DRY_RUN.labels("go_live").inc()
         return {"status": "dry_run", "order": order_payload}
 
-    if not LIVE_ORDER_ENABLED:
+    if not cfg.live_order_enabled:
         logger.warning("LIVE_ORDER_ENABLED is false — refusing to send live order.")
+        ORDERS_BLOCKED.labels("live_flag_disabled").inc()
         return {"status": "blocked", "reason": "live_flag_disabled"}
 
-    if client is None:
+    if not client:
         logger.error("No exchange client available to send order.")
+        ORDER_ERRORS.labels("go_live").inc()
         return {"status": "error", "reason": "no_client"}
 
     # -----------------------
@@ -99,7 +135,8 @@ def place_order_safe(order_payload: dict, usd_value_estimate: float):
         # For coinbase.wallet.client, you likely need an account id and call account.buy/sell with amount+currency.
         if client_type == "coinbase_advanced_py":
             # PSEUDO: adjust fields for the real method signature
-            result = client.place_market_order(
+            result = exchange_call(
+                "place_market_order", client.place_market_order,
                 symbol=order_payload.get("symbol"),
                 side=order_payload.get("side"),
                 quantity=order_payload.get("size"),
@@ -110,58 +147,84 @@ def place_order_safe(order_payload: dict, usd_value_estimate: float):
             account_id = order_payload.get("account_id")  # placeholder
             if not account_id:
                 raise RuntimeError("Missing account_id for legacy client")
-            acct = client.get_account(account_id)
+            acct = exchange_call("get_account", client.get_account, account_id)
             if order_payload.get("side") == "buy":
-                result = acct.buy(amount=str(order_payload.get("size")), currency="USD")
+                result = exchange_call("account_buy", acct.buy, amount=str(order_payload.get("size")), currency="USD")
             else:
-                result = acct.sell(amount=str(order_payload.get("size")), currency="USD")
+                result = exchange_call("account_sell", acct.sell, amount=str(order_payload.get("size")), currency="USD")
         else:
             raise RuntimeError("Unsupported client_type: %s" % client_type)
 
         logger.info("Live order result: %s", str(result))
+        ORDERS_SENT.labels("go_live").inc()
+        record_sent_order(order_payload, usd_value_estimate)
         return {"status": "sent", "result": result}
     except Exception as e:
         logger.exception("Exception placing live order: %s", e)
+        ORDER_ERRORS.labels("go_live").inc()
         return {"status": "error", "reason": str(e)}
 
 # ----------------------
 # FastAPI app + background poller
 # ----------------------
 app = FastAPI()
+loop_watchdog = LoopWatchdog()
+profiler = None
+recorder = None   # NIJA_TSDB time-series sink, opened at startup (equity samples from the balance poller)
+
+@app.middleware("http")
+async def webhook_latency_middleware(request: Request, call_next):
+    if not request.url.path.startswith("/webhook"):
+        return await call_next(request)
+    start = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        WEBHOOK_LATENCY.labels(request.url.path).observe(time.perf_counter() - start)
 
 async def balance_poller():
     logger.info("Balance poller starting. interval=%s", POLL_INTERVAL)
     while True:
         try:
-            if client is None:
+            if not client:
                 logger.warning("No client: skipping balance poll")
             else:
-                # try a few common methods to fetch balances
                 try:
-                    if hasattr(client, "get_account_balances"):
-                        b = client.get_account_balances()
-                    elif hasattr(client, "get_accounts"):
-                        b = client.get_accounts()
-                    else:
-                        b = {"info":"unknown_balance_method_on_client"}
-                    logger.info("Balances: %s", str(b)[:2000])
+                    snap = await asyncio.to_thread(service_for(client).snapshot, 0)
+                    logger.info("Balances: usd_equity=%.2f %s", snap.usd_equity("total"),
+                                {c: round(b.total, 8) for c, b in snap.balances.items() if b.total})
+                    if recorder is not None:
+                        recorder.equity("go_live", snap.usd_equity("total"))
                 except Exception as be:
                     logger.exception("Error during balance fetch: %s", be)
         except Exception as e:
             logger.exception("Balance poller top-level error: %s", e)
         await asyncio.sleep(POLL_INTERVAL)
 
+async def warm_up_then_poll():
+    # build the exchange client off the event loop, then start polling balances
+    await asyncio.to_thread(client.resolve)
+    await balance_poller()
+
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(balance_poller())
+    global recorder
+    recorder = await asyncio.to_thread(recorder_from_env)
+    if recorder is not None:
+        for task in recorder.background_tasks():
+            asyncio.create_task(task)
+    asyncio.create_task(warm_up_then_poll())
+    asyncio.create_task(loop_watchdog.run(report_every=POLL_INTERVAL * 10))
+    cfg = risk_engine.config
     logger.info("app startup complete DRY_RUN=%s LIVE_ORDER_ENABLED=%s KILL_SWITCH=%s MAX_ORDER_USD=%s",
-                DRY_RUN, LIVE_ORDER_ENABLED, os.getenv("KILL_SWITCH", KILL_SWITCH), MAX_ORDER_USD)
+                DRY_RUN, cfg.live_order_enabled, cfg.kill_switch, cfg.max_order_usd)
 
 # ----------------------
 # Include your webhook router (if present)
 # ----------------------
 try:
-    from webhook_handler import router as webhook_router
+    with phase("import webhook_handler"):
+        from webhook_handler import router as webhook_router
     app.include_router(webhook_router)
     logger.info("Included webhook_handler router.")
 except Exception as e:
@@ -180,11 +243,8 @@ async def admin_kill(action: str = Body(..., embed=True), x_admin_secret: str |
     Toggle kill switch. action = "on" or "off".
     """
     check_admin_secret(x_admin_secret)
-    if action.lower() == "on":
-        os.environ["KILL_SWITCH"] = "ON"
-    else:
-        os.environ["KILL_SWITCH"] = "OFF"
-    return {"kill_switch": os.environ["KILL_SWITCH"]}
+    cfg = risk_engine.update_config(kill_switch=action.lower() == "on")
+    return {"kill_switch": "ON" if cfg.kill_switch else "OFF"}
 
 @app.post("/admin/live_enable")
 async def admin_live_enable(action: str = Body(..., embed=True), x_admin_secret: str | None = Header(None)):
@@ -193,31 +253,103 @@ async def admin_live_enable(action: str = Body(..., embed=True), x_admin_secret:
     This is the extra guard that prevents accidental live orders.
     """
     check_admin_secret(x_admin_secret)
-    if action.lower() in ("enable","on","true"):
-        os.environ["LIVE_ORDER_ENABLED"] = "true"
-    else:
-        os.environ["LIVE_ORDER_ENABLED"] = "false"
-    return {"live_order_enabled": os.environ["LIVE_ORDER_ENABLED"]}
+    cfg = risk_engine.update_config(live_order_enabled=action.lower() in ("enable","on","true"))
+    return {"live_order_enabled": str(cfg.live_order_enabled).lower()}
 
 @app.post("/admin/set_max_order_usd")
 async def admin_set_max_order_usd(value: float = Body(..., embed=True), x_admin_secret: str | None = Header(None)):
     check_admin_secret(x_admin_secret)
-    os.environ["MAX_ORDER_USD"] = str(value)
-    return {"MAX_ORDER_USD": os.environ["MAX_ORDER_USD"]}
+    try:
+        cfg = risk_engine.update_config(max_order_usd=value)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"MAX_ORDER_USD": str(cfg.max_order_usd)}
+
+@app.post("/admin/risk")
+async def admin_risk(changes: dict = Body(...), x_admin_secret: str | None = Header(None)):
+    """
+    Update any RiskConfig field(s), e.g. {"max_daily_loss_usd": 25, "max_orders_per_min": 30}.
+    """
+    check_admin_secret(x_admin_secret)
+    try:
+        risk_engine.update_config(**changes)   # validated and coerced against RiskConfig's field types
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return risk_engine.snapshot()
+
+@app.get("/admin/risk")
+async def admin_risk_snapshot(x_admin_secret: str | None = Header(None)):
+    check_admin_secret(x_admin_secret)
+    return risk_engine.snapshot()
+
+@app.get("/admin/loop_stalls")
+async def admin_loop_stalls(limit: int = 10, x_admin_secret: str | None = Header(None)):
+    """
+    Worst event-loop blocking call sites seen by the watchdog (by total blocked time).
+    """
+    check_admin_secret(x_admin_secret)
+    return {"max_lag_s": round(loop_watchdog.max_lag, 4), "sites": loop_watchdog.worst(limit)}
+
+@app.post("/admin/profile/start")
+async def admin_profile_start(seconds: float = Body(30, embed=True), interval_ms: float = Body(5, embed=True),
+                              x_admin_secret: str | None = Header(None)):
+    """
+    Start the sampling profiler over the whole process for at most `seconds`
+    (capped at 300). Fetch the result with /admin/profile/stop.
+    """
+    global profiler
+    check_admin_secret(x_admin_secret)
+    if profiler is not None and profiler.running:
+        raise HTTPException(status_code=409, detail="profiler already running")
+    profiler = SamplingProfiler(interval=interval_ms / 1000.0, max_seconds=seconds)
+    profiler.start()
+    logger.info("Profiler started: %s", profiler.summary())
+    return profiler.summary()
+
+@app.post("/admin/profile/stop")
+async def admin_profile_stop(x_admin_secret: str | None = Header(None)):
+    """
+    Stop the profiler (if the window has not already elapsed) and return the
+    collapsed stacks as a text file for flamegraph.pl / speedscope.
+    """
+    check_admin_secret(x_admin_secret)
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="no profile recorded")
+    collapsed = await asyncio.to_thread(profiler.stop)
+    logger.info("Profiler stopped: %s", profiler.summary())
+    return PlainTextResponse(collapsed, headers={
+        "Content-Disposition": "attachment; filename=nija-profile-%d.collapsed" % int(profiler.started_at),
+        "X-Profile-Samples": str(profiler.samples),
+    })
 
 # ----------------------
 # Health (and basic order endpoint for manual testing)
 # ----------------------
+@app.get("/portfolio")
+async def portfolio(x_admin_secret: str | None = Header(None)):
+    check_admin_secret(x_admin_secret)
+    if not client.loaded:
+        raise HTTPException(status_code=503, detail="client_starting")
+    if not client:
+        raise HTTPException(status_code=503, detail="no_client")
+    snap = await asyncio.to_thread(service_for(client).snapshot)
+    return snap.to_dict()
+
 @app.get("/health")
 async def health():
     return {
         "status": "ok",
-        "client": client_type,
+        "client": client_type if client.loaded else "starting",
         "dry_run": DRY_RUN,
-        "live_order_enabled": os.getenv("LIVE_ORDER_ENABLED", str(LIVE_ORDER_ENABLED)),
-        "kill_switch": os.getenv("KILL_SWITCH", KILL_SWITCH),
+        "live_order_enabled": str(risk_engine.config.live_order_enabled).lower(),
+        "kill_switch": "ON" if risk_engine.config.kill_switch else "OFF",
+        "startup": startup_report(),
     }
 
+@app.get("/metrics")
+async def metrics():
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 @app.post("/manual_order")
 async def manual_order(symbol: str = Body(...), side: str = Body(...), size: float = Body(...)):
     """
@@ -226,6 +358,6 @@ async def manual_order(symbol: str = Body(...), side: str = Body(...), size: flo
     """
     order = {"symbol": symbol, "side": side, "size": size}
     # estimate USD value conservatively: you should compute market price properly
-    usd_estimate = float(os.getenv("MAX_ORDER_USD", MAX_ORDER_USD))  # placeholder
+    usd_estimate = risk_engine.config.max_order_usd  # placeholder
     res = place_order_safe(order, usd_estimate)
     return JSONResponse(res)
@@ -1,7 +1,11 @@
 # nija_ai.py
-import os, json, time, traceback
+import os, traceback
 from decimal import Decimal
 import ccxt
+from nija_price_cache import price_cache_for
+from nija_startup import LazyObject
+from nija_trade_history import TradeHistory
+from nija_sizing_model import DecayedKelly
 
 # Load API keys from environment
 COINBASE_SPOT_KEY = os.getenv("COINBASE_SPOT_KEY")
@@ -24,55 +28,42 @@ if COINBASE_SPOT_KEY and COINBASE_SPOT_SECRET:
 else:
     print("⚠️ spot API keys not found in environment")
 
-TRADE_HISTORY_FILE = "trade_history.json"
+PRICE_MAX_AGE_SEC = 2.0   # sizing / simulated fills reuse a cached last price up to this old
 
-def _load_history():
-    try:
-        with open(TRADE_HISTORY_FILE, "r") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+# Indexed trade history (SQLite/WAL) with per-symbol win/loss counters;
+# imports a legacy trade_history.json once. Opened on first use, so importing
+# this module does not create trade_history.db.
+history = LazyObject(TradeHistory, "trade history")
 
-def _save_history(h):
-    try:
-        with open(TRADE_HISTORY_FILE, "w") as f:
-            json.dump(h, f, indent=2)
-    except Exception as e:
-        print("❌ Failed to save history:", e)
+def save_entry(symbol, side, amount, entry_price, market_type="spot", note="simulated"):
+    return history.save_entry(symbol, side, amount, entry_price, market_type=market_type, note=note)
 
-trade_history = _load_history()
+# Online sizing model: updated once per closed trade, read at order time.
+# Restored from its snapshot, or rebuilt by replaying closed trades on first run
+# (on first use, like the history it reads).
+def _load_sizing():
+    model = DecayedKelly()
+    if not model.restore(history.load_state("sizing")):
+        for symbol, ret in history.closed_trades():
+            model.update(symbol, ret)
+    return model
 
-def save_entry(symbol, side, amount, entry_price, market_type="spot", note="simulated"):
-    entry = {
-        "id": f"entry-{int(time.time())}",
-        "side": side,
-        "amount": float(amount),
-        "entry_price": float(entry_price) if entry_price is not None else None,
-        "entry_ts": int(time.time()),
-        "exit_price": None,
-        "exit_ts": None,
-        "profit_percent": None,
-        "market_type": market_type,
-        "note": note
-    }
-    trade_history.setdefault(symbol, []).append(entry)
-    _save_history(trade_history)
-    return entry
+sizing = LazyObject(_load_sizing, "sizing model")
+
+def close_entry(entry_id, exit_price):
+    """Record a trade's exit price; updates its symbol's win/loss counters and the sizing model."""
+    row = history.close_entry(entry_id, exit_price)
+    if row and row["profit_percent"] is not None:
+        sizing.update(row["symbol"], row["profit_percent"] / 100.0)
+        history.save_state("sizing", sizing.snapshot())
+    return row
 
 def last_trade_profit_percent(symbol):
-    entries = trade_history.get(symbol, [])
-    for e in reversed(entries):
-        if e.get("profit_percent") is not None:
-            return float(e["profit_percent"])
-    return None
+    return history.stats(symbol)["last_profit_percent"]
 
 def ai_adjust_amount(symbol, base_amount):
     try:
-        entries = trade_history.get(symbol, [])
-        wins = sum(1 for t in entries if (t.get("profit_percent") or 0) > 0)
-        losses = sum(1 for t in entries if (t.get("profit_percent") or 0) < 0)
-        multiplier = 1 + (wins - losses) * 0.08
-        multiplier = max(0.1, min(multiplier, 3.0))
+        multiplier = sizing.multiplier(symbol)
         return float(Decimal(str(base_amount)) * Decimal(str(multiplier)))
     except Exception as e:
         print("ai_adjust_amount failed:", e)
@@ -96,8 +87,7 @@ def execute_trade(symbol, side, amount, market_type="spot", dry_run=True):
         # simulate using last ticker if we can
         last_price = None
         try:
-            t = client.fetch_ticker(symbol) if client else None
-            last_price = (t.get("last") or t.get("close")) if t else None
+            last_price = price_cache_for(client).get(symbol, PRICE_MAX_AGE_SEC) if client else None
         except Exception:
             last_price = None
         entry = save_entry(symbol, side, amount, last_price, market_type=market_type, note="simulated")
@@ -132,8 +122,7 @@ def convert_usd_to_qty(symbol, usd_amount):
         print("⚠️ spot client not configured for price lookup")
         return None
     try:
-        t = spot.fetch_ticker(symbol)
-        last = t.get("last") or t.get("close")
+        last = price_cache_for(spot).get(symbol, PRICE_MAX_AGE_SEC)
         if last:
             last_d = Decimal(str(last))
             qty = Decimal(str(usd_amount)) / last_d
@@ -1,7 +1,9 @@
 import ccxt
+import time
+import asyncio
 import datetime
 from decimal import Decimal
-import random  # placeholder for AI scoring logic
+import numpy as np
 
 # Configure your exchange
 exchange = ccxt.coinbase({
@@ -10,34 +12,100 @@ exchange = ccxt.coinbase({
     "enableRateLimit": True
 })
 
-# Example tickers to scan (you can expand this)
-TICKERS = ["BTC/USD", "ETH/USD", "LTC/USD", "XRP/USD"]
+# Quote currencies to rank (the whole Coinbase universe quoted in these is scanned)
+QUOTES = ("USD", "USDC")
+# Products with less 24h quote volume than this are ignored (illiquid)
+MIN_QUOTE_VOLUME = 50_000
+# Feature weights for ai_score (features are cross-sectional z-scores)
+WEIGHTS = {
+    "momentum": 0.35,
+    "volatility": 0.25,
+    "volume": 0.30,
+    "spread": -0.10,   # wider spread -> worse
+}
 
-def ai_score(ticker):
-    """Placeholder AI function to rate a ticker 0-1 (higher is better)"""
-    # Replace this with real AI logic (trend analysis, volatility, volume, etc.)
-    return random.uniform(0.1, 1.0)
+def _zscore(x):
+    x = np.asarray(x, dtype=float)
+    std = np.nanstd(x)
+    if not std:
+        return np.zeros_like(x)
+    return np.nan_to_num((x - np.nanmean(x)) / std)
 
-def scan_market():
+def _universe():
+    markets = exchange.load_markets()
+    return [s for s, m in markets.items()
+            if m.get("spot") and m.get("active", True) is not False and m.get("quote") in QUOTES]
+
+def compute_features(tickers):
+    """
+    Vectorized features from ONE bulk fetch_tickers() response:
+      momentum   - 24h % change
+      volatility - Parkinson estimate from 24h high/low: ln(H/L) / (2*sqrt(ln 2))
+      volume     - log 24h quote volume (z-scored across the universe)
+      spread     - (ask - bid) / mid
+    Returns (symbols, last, feature matrix dict of numpy arrays).
+    """
+    rows = [t for t in tickers.values()
+            if t.get("last") and t.get("high") and t.get("low") and (t.get("quoteVolume") or 0) >= MIN_QUOTE_VOLUME]
+    symbols = [t["symbol"] for t in rows]
+    last = np.array([t["last"] for t in rows], dtype=float)
+    high = np.array([t["high"] for t in rows], dtype=float)
+    low = np.array([t["low"] for t in rows], dtype=float)
+    pct = np.array([t.get("percentage") if t.get("percentage") is not None else np.nan for t in rows], dtype=float)
+    opn = np.array([t.get("open") or np.nan for t in rows], dtype=float)
+    pct = np.where(np.isnan(pct), (last / opn - 1.0) * 100.0, pct)
+    qvol = np.array([t.get("quoteVolume") or 0.0 for t in rows], dtype=float)
+    bid = np.array([t.get("bid") or np.nan for t in rows], dtype=float)
+    ask = np.array([t.get("ask") or np.nan for t in rows], dtype=float)
+    mid = (bid + ask) / 2.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        features = {
+            "momentum": pct,
+            "volatility": np.log(high / low) / (2.0 * np.sqrt(np.log(2.0))),
+            "volume": np.log1p(qvol),
+            "spread": np.where(mid > 0, (ask - bid) / mid, np.nan),
+        }
+    return symbols, last, features
+
+def ai_score(features):
+    """Weighted sum of cross-sectional z-scores, squashed to 0-1 (higher is better)."""
+    raw = sum(w * _zscore(features[name]) for name, w in WEIGHTS.items())
+    return 1.0 / (1.0 + np.exp(-raw))
+
+def scan_market(symbols=None):
+    """Rank the whole universe (or `symbols`) from a single bulk tickers call."""
+    symbols = symbols or _universe()
+    tickers = exchange.fetch_tickers(symbols)
+    names, last, features = compute_features(tickers)
+    if not names:
+        return []
+    scores = ai_score(features)
     results = []
-    for symbol in TICKERS:
+    for i in np.argsort(-scores):
+        results.append({
+            "symbol": names[i],
+            "product_id": names[i].replace("/", "-"),
+            "last_price": Decimal(str(last[i])),
+            "ai_score": round(float(scores[i]), 2),
+            "momentum_pct": round(float(features["momentum"][i]), 3),
+            "volatility": round(float(np.nan_to_num(features["volatility"][i])), 5),
+            "spread_bps": round(float(np.nan_to_num(features["spread"][i])) * 1e4, 2),
+        })
+    return results
+
+async def scan_forever(interval_sec, callback):
+    """Run scan_market every interval_sec (in a thread) and hand the ranking to callback(results)."""
+    while True:
         try:
-            ticker_data = exchange.fetch_ticker(symbol)
-            price = Decimal(str(ticker_data['last']))
-            score = ai_score(symbol)
-            results.append({
-                "symbol": symbol,
-                "last_price": price,
-                "ai_score": round(score, 2)
-            })
+            results = await asyncio.to_thread(scan_market)
+            callback(results)
         except Exception as e:
-            print(f"❌ Error fetching {symbol}: {e}")
-    # Sort by score descending
-    results.sort(key=lambda x: x['ai_score'], reverse=True)
-    return results
+            print(f"❌ Market scan failed: {e}")
+        await asyncio.sleep(interval_sec)
 
 if __name__ == "__main__":
+    started = time.perf_counter()
     top_tickers = scan_market()
-    print("📊 Top AI tickers for today:")
+    print(f"📊 Top AI tickers for {datetime.date.today()} ({len(top_tickers)} ranked in {time.perf_counter() - started:.2f}s):")
     for t in top_tickers[:5]:
         print(t)
@@ -0,0 +1,102 @@
+# nija_allocator.py
+"""
+NIJA: vectorized volatility-weighted portfolio allocation
+All symbols push their ticks into ONE shared (window x n_symbols) numpy
+price matrix. On a schedule the allocator computes log returns for every
+symbol at once, an exponentially-decayed covariance matrix (half-life in
+ticks), and then either:
+
+  - "inverse_vol":  w_i ~ 1 / sigma_i
+  - "risk_parity":  equal risk contribution w_i * (Cov w)_i (fixed-point)
+
+The new weights dict (fractions summing to 1) is published with a single
+reference assignment, so sizing code (make_order_payload) always reads a
+complete, consistent set. weight(symbol) is the sizing multiplier: the
+symbol's weight relative to equal weighting (w_i * n, mean 1), so
+PctSizing(weight=allocator.weight) tilts risk_pct around its configured
+value instead of shrinking every symbol by 1/n. Weights stay equal (all
+multipliers 1.0) until every symbol has `min_obs` ticks.
+"""
+
+import asyncio
+
+import numpy as np
+
+# ---------- CONFIG ----------
+ALLOC_HALFLIFE_TICKS = 30
+ALLOC_MIN_OBS = 20
+ALLOC_REBALANCE_SEC = 30
+RISK_PARITY_ITERS = 50
+# ----------------------------
+
+
+class PortfolioAllocator:
+    def __init__(self, symbols, window=100, halflife=ALLOC_HALFLIFE_TICKS, method="inverse_vol", min_obs=ALLOC_MIN_OBS):
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.window = window
+        self.halflife = halflife
+        self.method = method
+        self.min_obs = min_obs
+        n = len(self.symbols)
+        self.prices = np.full((window, n), np.nan)
+        self.pos = np.zeros(n, dtype=int)
+        self.count = np.zeros(n, dtype=int)
+        self.weights = {s: 1.0 / n for s in self.symbols}
+
+    def update(self, symbol, price):
+        """O(1): write one tick into the symbol's column of the ring-buffer matrix."""
+        i = self.index[symbol]
+        self.prices[self.pos[i], i] = price
+        self.pos[i] = (self.pos[i] + 1) % self.window
+        self.count[i] += 1
+
+    def weight(self, symbol):
+        """Sizing multiplier: weight relative to equal weighting (mean 1 across symbols)."""
+        n = max(1, len(self.symbols))
+        return self.weights.get(symbol, 1.0 / n) * n
+
+    def _ordered(self):
+        """Price matrix with each column in chronological order (oldest first)."""
+        idx = (self.pos[None, :] + np.arange(self.window)[:, None]) % self.window
+        return np.take_along_axis(self.prices, idx, axis=0)
+
+    def covariance(self):
+        """Exponentially-weighted covariance of log returns, or None if not enough data."""
+        obs = int(min(self.count.min(), self.window))
+        if obs < self.min_obs:
+            return None
+        rets = np.diff(np.log(self._ordered()[-obs:]), axis=0)
+        decay = 0.5 ** (1.0 / self.halflife)
+        w = decay ** np.arange(len(rets) - 1, -1, -1)
+        w /= w.sum()
+        demeaned = rets - w @ rets
+        return (demeaned * w[:, None]).T @ demeaned
+
+    def compute_weights(self):
+        n = len(self.symbols)
+        cov = self.covariance()
+        if cov is None:
+            return np.full(n, 1.0 / n)
+        vol = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        floor = vol[vol > 0].min() if (vol > 0).any() else 1.0
+        inv = 1.0 / np.where(vol > 0, vol, floor)
+        w = inv / inv.sum()
+        if self.method == "risk_parity":
+            for _ in range(RISK_PARITY_ITERS):
+                rc = w * (cov @ w)
+                if not (rc > 0).all():
+                    break
+                w = w * np.sqrt(rc.mean() / rc)
+                w /= w.sum()
+        return w
+
+    def rebalance(self):
+        w = self.compute_weights()
+        self.weights = dict(zip(self.symbols, w.tolist()))   # atomic publish
+        return self.weights
+
+    async def rebalance_forever(self, interval=ALLOC_REBALANCE_SEC):
+        while True:
+            await asyncio.sleep(interval)
+            self.rebalance()
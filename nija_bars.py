@@ -0,0 +1,187 @@
+# nija_bars.py
+"""
+NIJA: streaming tick/trade -> multi-timeframe OHLCV bars
+Every trade (price, size) or ticker sample (size 0) updates the open bar of
+each configured timeframe in O(1): a bar is a 6-slot list
+[ts, open, high, low, close, volume] that is mutated in place. When a tick
+lands in a later bucket, the open bar is closed, appended to that
+timeframe's ring buffer and a bar-close event is emitted:
+
+    bars = BarAggregator()                      # 1s, 1m, 5m, 1h
+    bars.subscribe(on_bar, "1m")                # on_bar(symbol, timeframe, bar)
+    bars.on_trade("BTC-USD", 67000.5, 0.002)    # from a trade feed
+    bars.on_tick("BTC-USD", 67001.0)            # from a ticker poll (no volume)
+    bars.bars("BTC-USD", "5m", 50)["close"]     # last 50 closed 5m bars, oldest first
+
+Buckets with no ticks produce no bar (no gap filling). close_due() closes
+bars whose bucket has ended even if no new tick arrived; close_forever()
+runs it on a timer. A bucket is closed at most once: a late trade for a
+bucket that has already been closed (by a later tick or by the timer) is
+dropped and counted in nija_bar_late_trades_total, never turned into a
+second bar with the same ts. Ring buffers use the nija_candle_cache record layout,
+so closed bars and cached candles are interchangeable.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+
+from nija_startup import lazy_import
+from nija_metrics import Counter
+
+np = lazy_import("numpy")
+logger = logging.getLogger("nija")
+
+# ---------- CONFIG ----------
+TIMEFRAMES = {"1s": 1, "1m": 60, "5m": 300, "1h": 3600}
+BAR_RING_SIZE = 500          # closed bars kept per (symbol, timeframe)
+BAR_CLOSE_INTERVAL_SEC = 1.0
+# ----------------------------
+
+TS, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+LATE_TRADES = Counter("nija_bar_late_trades_total", "Trades dropped because their bar had already closed", ["timeframe"])
+
+
+class BarRing:
+    """Fixed-capacity ring of closed bars (CANDLE_DTYPE records); O(1) append."""
+
+    def __init__(self, capacity=BAR_RING_SIZE):
+        from nija_candle_cache import CANDLE_DTYPE
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=CANDLE_DTYPE)
+        self.count = 0
+        self.head = 0          # next write position
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, bar):
+        self.data[self.head] = tuple(bar)
+        self.head = (self.head + 1) % self.capacity
+        self.count += 1
+
+    def last(self, n=None):
+        """Up to n most recent bars, oldest first (a copy)."""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        if n == 0:
+            return self.data[:0].copy()
+        start = (self.head - n) % self.capacity
+        if start + n <= self.capacity:
+            return self.data[start:start + n].copy()
+        return np.concatenate((self.data[start:], self.data[:self.head]))
+
+    def latest(self):
+        return self.data[(self.head - 1) % self.capacity] if self.count else None
+
+
+class BarAggregator:
+    def __init__(self, timeframes=None, capacity=BAR_RING_SIZE):
+        self.timeframes = dict(timeframes or TIMEFRAMES)     # name -> seconds
+        self.capacity = capacity
+        self._open = {}        # (symbol, timeframe) -> open bar list
+        self._rings = {}       # (symbol, timeframe) -> BarRing
+        self._closed_ts = {}   # (symbol, timeframe) -> ts of the last closed bar
+        self._listeners = []   # (timeframe or None, fn)
+        self._lock = threading.Lock()
+
+    def subscribe(self, fn, timeframe=None):
+        """fn(symbol, timeframe, bar) on every bar close (of `timeframe`, or of all timeframes)."""
+        self._listeners.append((timeframe, fn))
+
+    # -------------------
+    # INPUT
+    # -------------------
+    def on_trade(self, symbol, price, size=0.0, ts=None):
+        """Fold one trade into every timeframe's open bar. O(number of timeframes)."""
+        price = float(price)
+        size = float(size)
+        ts = time.time() if ts is None else ts
+        closed = []
+        with self._lock:
+            for name, sec in self.timeframes.items():
+                key = (symbol, name)
+                start = int(ts // sec) * sec
+                if start <= self._closed_ts.get(key, -1):
+                    LATE_TRADES.labels(name).inc()
+                    continue
+                bar = self._open.get(key)
+                if bar is None or start > bar[TS]:
+                    if bar is not None:
+                        self._close(key, bar)
+                        closed.append((name, bar))
+                    self._open[key] = [start, price, price, price, price, size]
+                    continue
+                # same bucket (or a late trade for an empty bucket before it: folded into the open bar)
+                if price > bar[HIGH]:
+                    bar[HIGH] = price
+                if price < bar[LOW]:
+                    bar[LOW] = price
+                if start == bar[TS]:
+                    bar[CLOSE] = price
+                bar[VOLUME] += size
+        self._emit(symbol, closed)
+
+    def on_tick(self, symbol, price, ts=None):
+        """Ticker sample without volume (engine on_tick hook signature)."""
+        self.on_trade(symbol, price, 0.0, ts)
+
+    def close_due(self, now=None):
+        """Close open bars whose bucket has ended; returns how many were closed."""
+        now = time.time() if now is None else now
+        closed = {}
+        with self._lock:
+            for key, bar in list(self._open.items()):
+                if bar[TS] + self.timeframes[key[1]] <= now:
+                    self._close(key, bar)
+                    del self._open[key]
+                    closed.setdefault(key[0], []).append((key[1], bar))
+        for symbol, bars in closed.items():
+            self._emit(symbol, bars)
+        return sum(len(b) for b in closed.values())
+
+    async def close_forever(self, interval=BAR_CLOSE_INTERVAL_SEC):
+        while True:
+            await asyncio.sleep(interval)
+            self.close_due()
+
+    def _close(self, key, bar):
+        self._ring(key).append(bar)
+        self._closed_ts[key] = bar[TS]
+
+    def _ring(self, key):
+        ring = self._rings.get(key)
+        if ring is None:
+            ring = self._rings[key] = BarRing(self.capacity)
+        return ring
+
+    def _emit(self, symbol, closed):
+        for name, bar in closed:
+            for tf, fn in self._listeners:
+                if tf is None or tf == name:
+                    try:
+                        fn(symbol, name, bar)
+                    except Exception as e:
+                        logger.warning("bar listener failed for %s %s: %s", symbol, name, e)
+
+    # -------------------
+    # READS
+    # -------------------
+    def bars(self, symbol, timeframe, n=None):
+        """Closed bars for (symbol, timeframe), oldest first, as a CANDLE_DTYPE array."""
+        ring = self._rings.get((symbol, timeframe))
+        if ring is None:
+            from nija_candle_cache import CANDLE_DTYPE
+            return np.zeros(0, dtype=CANDLE_DTYPE)
+        with self._lock:
+            return ring.last(n)
+
+    def current(self, symbol, timeframe):
+        """The open (not yet closed) bar as [ts, open, high, low, close, volume], or None."""
+        bar = self._open.get((symbol, timeframe))
+        return list(bar) if bar is not None else None
+
+    def closes(self, symbol, timeframe, n=None):
+        return self.bars(symbol, timeframe, n)["close"]
@@ -23,25 +23,25 @@ TRADING_MIN = 0.02  # 2%
 TRADING_MAX = 0.10  # 10%
 MOCK_MODE = False    # True = simulation, False = live
 
-# ====== AUTO-INSTALL MISSING MODULES ======
-modules = ["coinbase_advanced_py", "flask"]
-for m in modules:
+# ====== EXCHANGE CLIENT (created on first trade, not at import) ======
+# Dependencies come from requirements.txt at build time; installing them
+# with pip on every boot delayed the webhook server by tens of seconds.
+from nija_startup import LazyObject
+
+def _create_client():
+    global MOCK_MODE
     try:
-        __import__(m)
-    except ModuleNotFoundError:
-        print(f"🔄 Installing {m}...")
-        os.system(f"{sys.executable} -m pip install --upgrade {m}")
+        import coinbase_advanced_py as cap
+        c = cap.Client(api_key=API_KEY, api_secret=API_SECRET, api_pem_b64=API_PEM_B64)
+        print("✅ Using coinbase_advanced_py.Client as client")
+        return c
+    except Exception as e:
+        MOCK_MODE = True
+        print("❌ Coinbase client init failed, using MOCK_MODE")
+        print("Error:", e)
+        return None
 
-# ====== IMPORTS ======
-try:
-    import coinbase_advanced_py as cap
-    client = cap.Client(api_key=API_KEY, api_secret=API_SECRET, api_pem_b64=API_PEM_B64)
-    print("✅ Using coinbase_advanced_py.Client as client")
-except Exception as e:
-    client = None
-    MOCK_MODE = True
-    print("❌ Coinbase client init failed, using MOCK_MODE")
-    print("Error:", e)
+client = LazyObject(_create_client, "coinbase client")
 
 from flask import Flask, request, jsonify
 
@@ -52,7 +52,7 @@ def get_allocation():
 # ====== TRADE FUNCTION ======
 def trade(signal: str):
     allocation = get_allocation()
-    if MOCK_MODE or client is None:
+    if MOCK_MODE or not client:
         print(f"[MOCK TRADE] {signal} ({allocation*100}%)")
         return
     print(f"[REAL TRADE] {signal} ({allocation*100}%)")
@@ -0,0 +1,201 @@
+# nija_candle_cache.py
+"""
+NIJA: on-disk OHLCV candle cache with incremental sync
+One append-only file per (product, granularity) under CANDLE_CACHE_DIR,
+made of fixed-size little-endian records:
+
+    ts:int64  open:f8  high:f8  low:f8  close:f8  volume:f8   (48 bytes)
+
+Records are kept sorted by ts, so the file itself is the timestamp index:
+lookups are np.searchsorted over the memory-mapped ts column (O(log n)),
+and range queries return numpy views into the memmap (no copy, no parse).
+
+sync() only requests what is missing: candles newer than the last cached
+one are appended; older history (rare) is fetched and the file rewritten
+once. Backtests, warm starts and the scanner share the same files.
+
+Usage:
+    cache = CandleCache()
+    cache.sync(client, "BTC-USD", "ONE_MINUTE", start_ts, end_ts)
+    bars = cache.range("BTC-USD", "ONE_MINUTE", start_ts, end_ts)
+    bars["close"]   # numpy view
+"""
+
+import os
+import time
+import threading
+
+import numpy as np
+
+from nija_metrics import exchange_call
+
+# ---------- CONFIG ----------
+CANDLE_CACHE_DIR = os.getenv("CANDLE_CACHE_DIR", "candle_cache")
+GRANULARITY_SEC = {
+    "ONE_MINUTE": 60, "FIVE_MINUTE": 300, "FIFTEEN_MINUTE": 900, "THIRTY_MINUTE": 1800,
+    "ONE_HOUR": 3600, "TWO_HOUR": 7200, "SIX_HOUR": 21600, "ONE_DAY": 86400,
+}
+MAX_CANDLES_PER_CALL = 350
+# ----------------------------
+
+CANDLE_DTYPE = np.dtype([
+    ("ts", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8"),
+])
+
+
+def _to_records(candles):
+    """Exchange candle dicts -> sorted, de-duplicated structured array."""
+    arr = np.array([
+        (int(c["start"]), float(c["open"]), float(c["high"]), float(c["low"]), float(c["close"]), float(c["volume"]))
+        for c in candles
+    ], dtype=CANDLE_DTYPE)
+    if len(arr):
+        arr = arr[np.argsort(arr["ts"], kind="stable")]
+        keep = np.ones(len(arr), dtype=bool)
+        keep[1:] = arr["ts"][1:] != arr["ts"][:-1]
+        arr = arr[keep]
+    return arr
+
+
+def fetch_candles(client, product_id, granularity, start, end):
+    """Blocking: all candles with start <= ts < end, chunked to the API's 350-candle limit."""
+    step = GRANULARITY_SEC[granularity]
+    out = []
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(end, chunk_start + step * MAX_CANDLES_PER_CALL)
+        resp = exchange_call("get_candles", client.get_candles, product_id=product_id,
+                             start=str(int(chunk_start)), end=str(int(chunk_end)), granularity=granularity)
+        data = resp.to_dict() if hasattr(resp, "to_dict") else resp
+        out.extend(data.get("candles", []) if isinstance(data, dict) else data)
+        chunk_start = chunk_end
+    recs = _to_records(out)
+    return recs[(recs["ts"] >= start) & (recs["ts"] < end)]
+
+
+class CandleCache:
+    def __init__(self, cache_dir=CANDLE_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._maps = {}    # key -> np.memmap (or empty array)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _key(self, product_id, granularity):
+        return "%s_%s" % (product_id.replace("/", "-"), granularity)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".bin")
+
+    def _lock(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _open(self, key):
+        """(Re)map the file; caller holds self._lock(key)."""
+        path = self._path(key)
+        n = self._truncate_torn(path)
+        if not n:
+            arr = np.empty(0, dtype=CANDLE_DTYPE)
+        else:
+            arr = np.memmap(path, dtype=CANDLE_DTYPE, mode="r", shape=(n,))
+        self._maps[key] = arr
+        return arr
+
+    @staticmethod
+    def _truncate_torn(path):
+        """Cut a torn trailing record (interrupted append) so later appends stay aligned; returns #records."""
+        if not os.path.exists(path):
+            return 0
+        size = os.path.getsize(path)
+        n = size // CANDLE_DTYPE.itemsize
+        if size != n * CANDLE_DTYPE.itemsize:
+            os.truncate(path, n * CANDLE_DTYPE.itemsize)
+        return n
+
+    def data(self, product_id, granularity):
+        """All cached candles (memmap view)."""
+        key = self._key(product_id, granularity)
+        arr = self._maps.get(key)
+        if arr is not None:
+            return arr
+        with self._lock(key):
+            return self._open(key)
+
+    # -------------------
+    # QUERIES
+    # -------------------
+    def range(self, product_id, granularity, start, end):
+        """Candles with start <= ts < end, as a numpy view."""
+        arr = self.data(product_id, granularity)
+        ts = arr["ts"]
+        i = np.searchsorted(ts, start, side="left")
+        j = np.searchsorted(ts, end, side="left")
+        return arr[i:j]
+
+    def last(self, product_id, granularity, count):
+        arr = self.data(product_id, granularity)
+        return arr[-count:] if count else arr[:0]
+
+    def bounds(self, product_id, granularity):
+        arr = self.data(product_id, granularity)
+        if not len(arr):
+            return None, None
+        return int(arr["ts"][0]), int(arr["ts"][-1])
+
+    # -------------------
+    # SYNC
+    # -------------------
+    def _append(self, key, recs):
+        self._truncate_torn(self._path(key))
+        with open(self._path(key), "ab") as f:
+            f.write(recs.tobytes())
+
+    def _rewrite(self, key, recs):
+        path = self._path(key)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(recs.tobytes())
+        os.replace(tmp, path)
+
+    def sync(self, client, product_id, granularity, start, end=None):
+        """Make [start, end) available locally, fetching only the missing head/tail. Returns #new candles."""
+        step = GRANULARITY_SEC[granularity]
+        end = int(end if end is not None else time.time())
+        start = int(start) - int(start) % step
+        key = self._key(product_id, granularity)
+        with self._lock(key):
+            arr = self._open(key)
+            added = 0
+            if not len(arr):
+                recs = fetch_candles(client, product_id, granularity, start, end)
+                self._rewrite(key, recs)
+                added = len(recs)
+            else:
+                first, last = int(arr["ts"][0]), int(arr["ts"][-1])
+                # the newest cached candle may have been incomplete -> refetch it too
+                if end > last:
+                    newer = fetch_candles(client, product_id, granularity, last, end)
+                    if len(newer) and newer["ts"][0] == last:
+                        # replace the partial last candle: rewrite just that record in place
+                        with open(self._path(key), "r+b") as f:
+                            f.seek((len(arr) - 1) * CANDLE_DTYPE.itemsize)
+                            f.write(newer[:1].tobytes())
+                        newer = newer[1:]
+                    if len(newer):
+                        self._append(key, newer)
+                        added += len(newer)
+                if start < first:
+                    older = fetch_candles(client, product_id, granularity, start, first)
+                    if len(older):
+                        self._rewrite(key, np.concatenate([older, np.asarray(self._open(key))]))
+                        added += len(older)
+            self._open(key)
+            return added
+
+    def sync_recent(self, client, product_id, granularity, count):
+        """Ensure at least the last `count` candles are cached; returns them (view)."""
+        step = GRANULARITY_SEC[granularity]
+        now = int(time.time())
+        self.sync(client, product_id, granularity, now - step * count, now)
+        return self.last(product_id, granularity, count)
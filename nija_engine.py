@@ -0,0 +1,792 @@
+# nija_engine.py
+"""
+NIJA: unified trading engine
+The realtime / compound / multi / ultra / ultra-safe (v1, v3, v4) bots were
+copies of one loop with small differences. They are now configurations of
+TradingEngine, which owns the loop once and delegates the parts that
+actually differ to pluggable policies:
+
+  strategy  .signal(symbol, price_data) -> (side, risk_pct, signal_type) | None
+  sizing    .leverage(balance, price_data), .allocation(symbol, balance, risk_pct, leverage)
+  exits     .check(trade, price) -> exit reason | None  (NoExits: never holds positions)
+  balance   .get(), .on_fill(payload, price) -> balance after the fill
+  journal   .record(payload, status, balance_after, pnl, notes)  (batched CSV)
+  bars      optional nija_bars.BarAggregator fed with every tick; a strategy
+            with on_bar(symbol, timeframe, bar) receives its bar-close events
+  router    optional nija_execution.ExecutionScheduler; EngineConfig(execution="smart")
+            builds one on start. Entries / exits then go through it as parent
+            orders (entry_algo / exit_algo) instead of one market order each
+  risk      optional pre-trade hook for routed parents (market orders are gated by
+            whatever wraps client.place_market_order): .before(payload) raises to
+            refuse and returns a token, .after(payload, token, filled, avg_price)
+            books the fill (nija_risk.RiskGate, the sharded runtime's shard gate)
+  recorder  optional nija_timeseries.TimeSeriesRecorder (NIJA_TSDB, SQLite by
+            default) persisting ticks, indicators, signals, orders and equity
+  tracker   optional nija_order_tracker.OrderTracker: every submitted order is
+            tracked and open trades are re-priced with their real fills
+  state     optional nija_state_store.StateStore: each symbol's price window and
+            open trades are checkpointed and restored (restart / shard hand-off)
+  warm      optional async warm(symbol) -> candle closes for a short tick window,
+            handed to strategy.seed(symbol, closes); never mixed into the ticks
+  feed      optional nija_vwap.TradeFeed: bars get matched trades (with volume)
+            from it instead of the ticks
+
+EngineConfig(coalesce_window_sec > 0) nets same-product market entries over
+that window (nija_order_coalescer) before they are submitted.
+
+Shared behaviour lives here and nowhere else: prices come from the shared
+last-price cache, balance/order calls run in worker threads so symbols
+don't block each other, sizes are floored to the product increment, and
+journal rows are written in batches.
+
+Usage (a bot module):
+    engine = TradingEngine(client, EngineConfig("v4", SYMBOLS),
+                           strategy=HfmtHighReturnStrategy(),
+                           sizing=PctSizing(leverage=DynamicLeverage()),
+                           exits=StopTakeTrailingExits(),
+                           balance=LiveBalance(client))
+    asyncio.run(engine.run())
+"""
+
+import os
+import csv
+import uuid
+import asyncio
+import threading
+from datetime import datetime
+from dataclasses import dataclass
+
+from nija_metrics import exchange_call, ORDERS_SENT, ORDER_ERRORS
+from nija_order_coalescer import OrderCoalescer
+from nija_order_tracker import FILLED, CANCELLED, REJECTED, UNKNOWN
+from nija_products import catalog_for
+from nija_price_cache import price_cache_for
+from nija_portfolio import service_for
+from nija_startup import lazy_import
+
+np = lazy_import("numpy")
+
+# ---------- CONFIG ----------
+CSV_FILE = "nija_trade_log.csv"
+JOURNAL_BATCH_ROWS = 20
+JOURNAL_FLUSH_SEC = 2.0
+# ----------------------------
+
+JOURNAL_COLUMNS = [
+    "timestamp", "symbol", "side", "price", "size", "allocation_usd",
+    "leveraged_allocation", "risk_pct", "leverage", "signal_type",
+    "status", "notes", "account_balance_after", "pnl",
+]
+
+
+def now_ts():
+    return datetime.utcnow().isoformat() + "Z"
+
+
+# -------------------
+# INDICATORS
+# -------------------
+def calculate_rsi(prices, period=14):
+    if len(prices) < period + 1:
+        return 50  # neutral
+    deltas = np.diff(prices[-(period+1):])
+    ups = deltas[deltas > 0].sum() / period
+    downs = -deltas[deltas < 0].sum() / period
+    rs = ups / downs if downs != 0 else 0
+    return 100 - (100 / (1 + rs))
+
+
+def calculate_vwap(prices, period=20):
+    # tick-mean fallback (volume=1 per sample); nija_vwap.VwapTracker is the trade-volume VWAP
+    return np.mean(prices[-period:]) if len(prices) >= period else np.mean(prices)
+
+
+# -------------------
+# STRATEGY
+# -------------------
+class HfmtHighReturnStrategy:
+    """
+    High-frequency micro moves first; otherwise RSI extremes + VWAP deviation.
+    With `vwap` (a nija_vwap.VwapTracker) the deviation is measured against the
+    trade-volume VWAP of kind `vwap_kind` ("rolling" / "session"); the tick mean
+    is used until the tracker has trades for the symbol.
+    seed() keeps warm-start candle closes in their own window: RSI / VWAP read it
+    until the tick window is long enough; HFMT only ever sees ticks.
+    """
+
+    def __init__(self, min_pct=0.02, max_pct=0.10, hf_drop_pct=0.2/100, hf_rise_pct=0.3/100,
+                 rsi_period=14, vwap_period=20, vwap=None, vwap_kind="rolling"):
+        self.min_pct = min_pct
+        self.max_pct = max_pct
+        self.hf_drop_pct = hf_drop_pct
+        self.hf_rise_pct = hf_rise_pct
+        self.rsi_period = rsi_period
+        self.vwap_period = vwap_period
+        self.vwap = vwap
+        self.vwap_kind = vwap_kind
+        self.last_indicators = {}    # symbol -> indicator values of the last evaluation (time-series sink)
+        self.seeded = {}             # symbol -> warm-start closes (not ticks)
+
+    def seed(self, symbol, closes):
+        self.seeded[symbol] = list(closes)[-max(self.rsi_period + 1, self.vwap_period):]
+
+    def _window(self, symbol, price_data, needed):
+        seeded = self.seeded.get(symbol)
+        return seeded if seeded and len(price_data) < needed else price_data
+
+    def hf_micro_trade_signal(self, price_data):
+        if len(price_data) < 2:
+            return None
+        last_price = price_data[-2]
+        current_price = price_data[-1]
+        if current_price <= last_price * (1 - self.hf_drop_pct):
+            return "buy"
+        elif current_price >= last_price * (1 + self.hf_rise_pct):
+            return "sell"
+        return None
+
+    def high_return_signal(self, price_data, symbol=None):
+        if symbol in self.seeded and len(price_data) >= max(self.rsi_period + 1, self.vwap_period):
+            del self.seeded[symbol]                 # enough ticks: drop the candle window
+        rsi = calculate_rsi(self._window(symbol, price_data, self.rsi_period + 1), self.rsi_period)
+        vwap = self.vwap.vwap(symbol, self.vwap_kind) if self.vwap is not None and symbol else None
+        if vwap is None:
+            vwap = calculate_vwap(self._window(symbol, price_data, self.vwap_period), self.vwap_period)
+        current_price = price_data[-1]
+        vwap_dev = abs(current_price - vwap) / vwap * 100  # percent deviation
+        if symbol:
+            self.last_indicators[symbol] = {"rsi": rsi, "vwap": vwap, "vwap_dev_pct": vwap_dev}
+        base_risk = 0.04
+        adjustment = 0
+        side = None
+        if rsi < 30:
+            adjustment += 0.03
+            side = "buy"
+        elif rsi > 70:
+            adjustment += 0.03
+            side = "sell"
+        if vwap_dev > 0.5:
+            adjustment += 0.03
+        risk_pct = max(self.min_pct, min(self.max_pct, base_risk + adjustment))
+        return side, risk_pct
+
+    def signal(self, symbol, price_data):
+        side = self.hf_micro_trade_signal(price_data)
+        if side:
+            return side, self.min_pct, "HFMT"
+        side, risk_pct = self.high_return_signal(price_data, symbol)
+        if side:
+            return side, risk_pct, "HighReturn"
+        return None
+
+
+# -------------------
+# SIZING
+# -------------------
+class FixedLeverage:
+    def __init__(self, leverage=1):
+        self.value = leverage
+
+    def leverage(self, account_balance, price_data):
+        return self.value
+
+
+class DynamicLeverage:
+    """Leverage by balance bracket, cut when the coin's recent range is wide."""
+
+    def __init__(self, min_leverage=1, max_leverage=5, balance_thresholds=None, volatility_period=20,
+                 volatility_threshold=2.0, volatility_factor=0.5):
+        self.min_leverage = min_leverage
+        self.max_leverage = max_leverage
+        self.balance_thresholds = balance_thresholds or {20: 1, 50: 2, 100: 3}
+        self.volatility_period = volatility_period
+        self.volatility_threshold = volatility_threshold   # % range over period considered high volatility
+        self.volatility_factor = volatility_factor
+
+    def leverage(self, account_balance, price_data):
+        leverage = self.max_leverage
+        for bal, lev in sorted(self.balance_thresholds.items()):
+            if account_balance < bal:
+                leverage = lev
+                break
+        if len(price_data) >= self.volatility_period:
+            recent_prices = price_data[-self.volatility_period:]
+            pct_change = (max(recent_prices) - min(recent_prices)) / np.mean(recent_prices) * 100
+            if pct_change > self.volatility_threshold:
+                leverage *= self.volatility_factor
+        return max(self.min_leverage, min(self.max_leverage, leverage))
+
+
+class PctSizing:
+    """
+    allocation = balance * clamp(risk_pct * weight(symbol), min_pct, max_pct) * leverage.
+    `weight` is an optional per-symbol multiplier around 1.0 (e.g. PortfolioAllocator.weight);
+    it is applied before the clamp, so it must not be a fraction that sums to 1.
+    """
+
+    def __init__(self, min_pct=0.02, max_pct=0.10, leverage=None, weight=None):
+        self.min_pct = min_pct
+        self.max_pct = max_pct
+        self.leverage_policy = leverage or FixedLeverage(1)
+        self.weight = weight
+
+    def leverage(self, account_balance, price_data):
+        return self.leverage_policy.leverage(account_balance, price_data)
+
+    def allocation(self, symbol, account_balance, risk_pct, leverage):
+        if self.weight is not None:
+            risk_pct *= self.weight(symbol)
+        pct = max(self.min_pct, min(self.max_pct, risk_pct))
+        base_allocation = account_balance * pct
+        return base_allocation, base_allocation * leverage
+
+
+# -------------------
+# EXITS
+# -------------------
+class NoExits:
+    """Fire-and-forget entries; no positions are tracked."""
+    holds_positions = False
+
+    def check(self, trade_payload, current_price):
+        return None
+
+
+class StopTakeTrailingExits:
+    holds_positions = True
+
+    def __init__(self, stop_loss_pct=0.05, take_profit_pct=0.07, trailing_stop=True, trailing_pct=0.03):
+        self.stop_loss_pct = stop_loss_pct
+        self.take_profit_pct = take_profit_pct
+        self.trailing_stop = trailing_stop
+        self.trailing_pct = trailing_pct
+
+    def check(self, trade_payload, current_price):
+        entry_price = trade_payload["meta"]["entry_price"]
+        side = trade_payload["side"]
+        max_price = trade_payload["meta"].get("max_price", entry_price)
+
+        # Update max_price for trailing stop
+        if self.trailing_stop:
+            if side == "buy" and current_price > max_price:
+                trade_payload["meta"]["max_price"] = current_price
+            elif side == "sell" and current_price < max_price:
+                trade_payload["meta"]["max_price"] = current_price
+
+        if side == "buy":
+            pl_pct = (current_price - entry_price) / entry_price
+            if self.trailing_stop and current_price <= max_price * (1 - self.trailing_pct):
+                return "trailing_stop"
+        else:
+            pl_pct = (entry_price - current_price) / entry_price
+            if self.trailing_stop and current_price >= max_price * (1 + self.trailing_pct):
+                return "trailing_stop"
+
+        if pl_pct <= -self.stop_loss_pct:
+            return "stop_loss"
+        elif pl_pct >= self.take_profit_pct:
+            return "take_profit"
+        return None
+
+
+def trade_pnl(trade_payload, exit_price):
+    """
+    PnL of closing trade_payload at exit_price. The size is already the leveraged
+    allocation / price, so leverage is in the size and not applied again.
+    """
+    entry_price = trade_payload["meta"]["entry_price"]
+    size = float(trade_payload["size"])
+    pnl = (exit_price - entry_price) * size
+    if trade_payload["side"] == "sell":
+        pnl = (entry_price - exit_price) * size
+    return pnl
+
+
+# -------------------
+# BALANCE
+# -------------------
+class SimulatedBalance:
+    """Fixed starting balance; with compound=True fills move it (buy spends, sell adds)."""
+
+    def __init__(self, start, compound=False):
+        self.value = start
+        self.compound = compound
+
+    def get(self):
+        return self.value
+
+    def on_fill(self, payload, price):
+        if self.compound:
+            size = float(payload["size"])
+            if payload["side"] == "buy":
+                self.value -= size * price
+            elif payload["side"] == "sell":
+                self.value += size * price
+        return self.value
+
+
+class LiveBalance:
+    """Available USD from the shared portfolio snapshot (nija_portfolio)."""
+
+    def __init__(self, client, currency="USD"):
+        self.client = client
+        self.currency = currency
+        self.value = 0
+
+    def get(self):
+        try:
+            self.value = service_for(self.client).snapshot().available(self.currency)
+        except Exception as e:
+            print("⚠️ Error fetching live balance:", e)
+            self.value = 0
+        return self.value
+
+    def on_fill(self, payload, price):
+        """Balance after the fill: a fresh snapshot (blocking; the engine calls it in a worker thread)."""
+        try:
+            self.value = service_for(self.client).snapshot(max_age=0).available(self.currency)
+        except Exception as e:
+            print("⚠️ Error refreshing live balance:", e)
+        return self.value
+
+
+# -------------------
+# JOURNAL
+# -------------------
+class CsvJournal:
+    """Trade log rows buffered in memory and appended in batches (every batch_rows rows / flush_sec)."""
+
+    def __init__(self, path=CSV_FILE, batch_rows=JOURNAL_BATCH_ROWS, flush_sec=JOURNAL_FLUSH_SEC):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.flush_sec = flush_sec
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def record(self, payload, status, account_balance_after, pnl=0, notes=""):
+        meta = payload["meta"]
+        row = [
+            now_ts(),
+            payload["product_id"],
+            payload["side"],
+            meta.get("entry_price", ""),
+            payload["size"],
+            meta.get("allocation_usd", ""),
+            meta.get("leveraged_allocation", meta.get("allocation_usd", "")),
+            meta.get("risk_pct", ""),
+            meta.get("leverage", 1),
+            meta.get("signal_type", ""),
+            status,
+            notes,
+            round(account_balance_after, 2),
+            round(pnl, 2),
+        ]
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.batch_rows
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            new = not os.path.exists(self.path)
+            with open(self.path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if new:
+                    writer.writerow(JOURNAL_COLUMNS)
+                writer.writerows(rows)
+        return len(rows)
+
+    async def flush_forever(self):
+        while True:
+            await asyncio.sleep(self.flush_sec)
+            await asyncio.to_thread(self.flush)
+
+
+# -------------------
+# ENGINE
+# -------------------
+@dataclass
+class EngineConfig:
+    name: str
+    symbols: list
+    max_ticks: int = 100
+    tick_sec: float = 1.0
+    error_backoff_sec: float = 2.0
+    execution: str = "market"          # "market" | "smart" (nija_execution router)
+    entry_algo: str = "auto"
+    exit_algo: str = "ioc"
+    execution_duration_sec: float = 60.0
+    timeseries: bool = True            # record to NIJA_TSDB when no recorder is passed
+    coalesce_window_sec: float = 0.0   # > 0: net same-product market entries over this window
+    state_max_age_sec: float = 600.0   # older restored price windows are discarded (open trades are kept)
+    warm_min_ticks: int = 1            # warm start when the restored window is shorter than this
+
+
+def coalesced_note(payload, res):
+    """Journal note for an intent that went out merged with others."""
+    merged = res["order"]
+    if not merged or len(merged["meta"].get("coalesced", [])) < 2:
+        return ""
+    return f"coalesced into {merged['idempotency_key']} ({merged['side']} {merged['size']})"
+
+
+class TradingEngine:
+    def __init__(self, client, config, strategy, sizing, exits=None, balance=None, journal=None,
+                 on_tick=(), background=(), bars=None, router=None, recorder=None, tracker=None, state=None,
+                 warm=None, feed=None, risk=None):
+        """
+        on_tick:    callables (symbol, price) run after every new tick (e.g. PortfolioAllocator.update)
+        background: zero-arg callables returning coroutines to run next to the symbol loops
+        bars:       BarAggregator receiving every tick (or the feed's trades) and closing bars on a timer
+        router:     ExecutionScheduler sending orders as sliced / limit parents (see execution)
+        recorder:   TimeSeriesRecorder; built from NIJA_TSDB on start when config.timeseries
+        tracker:    OrderTracker following every submitted order to its fills
+        state:      StateStore checkpointing each symbol's price window and open trades
+        warm:       async warm(symbol) -> closes for a window shorter than config.warm_min_ticks
+        feed:       TradeFeed polled next to the loops (feeds bars instead of the ticks)
+        risk:       pre-trade gate for routed parents (before / after, see the module docstring)
+        """
+        self.client = client
+        self.config = config
+        self.strategy = strategy
+        self.sizing = sizing
+        self.exits = exits or NoExits()
+        self.balance = balance or LiveBalance(client)
+        self.journal = journal or CsvJournal()
+        self.on_tick = list(on_tick)
+        self.background = list(background)
+        self.bars = bars
+        if bars is not None:
+            if feed is None:
+                self.on_tick.append(bars.on_tick)
+            self.background.append(bars.close_forever)
+            if hasattr(strategy, "on_bar"):
+                bars.subscribe(strategy.on_bar)
+        self.router = router
+        self.risk = risk
+        self.recorder = recorder
+        self.tracker = tracker
+        self.state_store = state
+        self.warm = warm
+        self.feed = feed
+        if feed is not None:
+            self.background.append(feed.poll_forever)
+        self.coalescer = None
+        if config.coalesce_window_sec > 0:
+            self.coalescer = OrderCoalescer(self.submit, config.coalesce_window_sec,
+                                            size_fn=lambda pid, size: catalog_for(self.client).base_size(pid, size))
+        self.prices = price_cache_for(client)
+        self.open_trades = {}   # symbol -> list of open entry payloads
+        self._entering = set()  # symbols with a routed entry still working
+
+    @property
+    def symbols(self):
+        return self.config.symbols
+
+    def make_order_payload(self, symbol, side, account_usd_balance, price, risk_pct, signal_type, leverage=1,
+                           size=None):
+        if size is None:
+            base_allocation, leveraged_allocation = self.sizing.allocation(symbol, account_usd_balance, risk_pct, leverage)
+            size = leveraged_allocation / price
+        else:   # explicit size (closing an open trade)
+            leveraged_allocation = size * price
+            base_allocation = leveraged_allocation / leverage
+        return {
+            "product_id": symbol,
+            "side": side,
+            "type": "market",
+            "size": catalog_for(self.client).base_size(symbol, size),
+            "idempotency_key": str(uuid.uuid4()),
+            "meta": {
+                "allocation_usd": base_allocation,
+                "leveraged_allocation": leveraged_allocation,
+                "risk_pct": risk_pct,
+                "leverage": leverage,
+                "signal_type": signal_type,
+                "entry_price": price,
+                "max_price": price,
+            },
+        }
+
+    def submit(self, payload):
+        """
+        Blocking order submission (run in a worker thread); rejects sizes the exchange would refuse.
+        client.place_market_order is resolved per call, so wrappers (the shard risk guard) apply.
+        """
+        reason = catalog_for(self.client).check(payload["product_id"], base_size=payload["size"])
+        if reason:
+            raise ValueError(reason)
+        if self.tracker is None:
+            return exchange_call("place_market_order", self.client.place_market_order, payload)
+        key = payload["idempotency_key"]
+        self.tracker.track(payload)
+        try:
+            resp = exchange_call("place_market_order", self.client.place_market_order, payload)
+        except Exception as e:
+            self.tracker.on_submit_response(key, error=e)
+            raise
+        self.tracker.on_submit_response(key, resp)
+        return resp
+
+    async def execute(self, payload, algo):
+        """
+        Send an order payload: one market order, or a router parent when a router is set.
+        Routed fills rewrite the payload's size and entry price to what actually filled;
+        routed parents are checked by the risk hook first and their fills booked with it.
+        """
+        if self.router is None:
+            return await asyncio.to_thread(self.submit, payload)
+        symbol = payload["product_id"]
+        catalog = catalog_for(self.client)
+        reason = catalog.check(symbol, base_size=payload["size"])
+        if reason:
+            raise ValueError(reason)
+        token = self.risk.before(payload) if self.risk is not None else None
+        try:
+            parent = await self.router.execute(symbol, payload["side"], float(payload["size"]), algo,
+                                               self.config.execution_duration_sec, payload["idempotency_key"])
+        except BaseException:
+            if self.risk is not None:
+                self.risk.after(payload, token, 0.0, None)
+            raise
+        if self.risk is not None:
+            self.risk.after(payload, token, parent.filled, parent.avg_price)
+        if not parent.filled:
+            raise RuntimeError(parent.error or f"{algo} parent {parent.status}")
+        payload["size"] = catalog.base_size(symbol, parent.filled)
+        payload["meta"]["entry_price"] = payload["meta"]["max_price"] = parent.avg_price
+        payload["meta"]["execution"] = parent.status
+        return parent
+
+    def record(self, payload, status, account_balance, pnl=0, notes=""):
+        """Journal an order outcome (and send it, plus the balance after a fill, to the recorder)."""
+        self.journal.record(payload, status, account_balance, pnl, notes)
+        if self.recorder is not None:
+            self.recorder.order(payload, status, notes)
+            if status == "success":
+                self.recorder.equity(self.config.name, account_balance)
+
+    def record_signal(self, symbol, price, decision):
+        """Send the strategy's latest indicator values and its decision (if any) to the recorder."""
+        if self.recorder is None:
+            return
+        indicators = getattr(self.strategy, "last_indicators", {}).get(symbol)
+        if indicators:
+            self.recorder.indicators(symbol, indicators)
+        if decision:
+            side, risk_pct, signal_type = decision
+            self.recorder.signal(symbol, side, signal_type, risk_pct, price)
+
+    async def _close_trades(self, symbol, open_trades, price, account_balance):
+        for trade in list(open_trades):
+            exit_signal = self.exits.check(trade, price)
+            if not exit_signal:
+                continue
+            payload = self.make_order_payload(
+                symbol, "sell" if trade["side"] == "buy" else "buy", account_balance, price,
+                trade["meta"]["risk_pct"], exit_signal, trade["meta"].get("leverage", 1),
+                size=float(trade["size"]),     # close exactly what was opened
+            )
+            try:
+                await self.execute(payload, self.config.exit_algo)
+            except Exception as e:
+                ORDER_ERRORS.labels(exit_signal).inc()
+                self.record(payload, "error", account_balance, 0, str(e))
+                print(f"⚠️ {symbol} Exit failed:", e)
+                continue
+            ORDERS_SENT.labels(exit_signal).inc()
+            price = payload["meta"]["entry_price"]      # the fill price when routed
+            pnl = trade_pnl(trade, price)
+            closed = float(payload["size"])
+            if closed < float(trade["size"]):      # routed exit filled partially: keep the rest open
+                pnl = pnl * closed / float(trade["size"])
+                trade["size"] = catalog_for(self.client).base_size(symbol, float(trade["size"]) - closed)
+            else:
+                open_trades.remove(trade)
+            account_after = await asyncio.to_thread(self.balance.on_fill, payload, price)
+            self.record(payload, "success", account_after, pnl, notes=exit_signal)
+            print(f"⚡ {symbol} | {exit_signal} executed for {trade['side']} | PnL: ${round(pnl,2)} | Balance: ${round(account_after,2)}")
+
+    async def _open_trade(self, symbol, open_trades, price, account_balance, price_data):
+        decision = self.strategy.signal(symbol, price_data)
+        self.record_signal(symbol, price, decision)
+        if not decision:
+            return
+        side, risk_pct, signal_type = decision
+        leverage = self.sizing.leverage(account_balance, price_data)
+        payload = self.make_order_payload(symbol, side, account_balance, price, risk_pct, signal_type, leverage)
+        if self.coalescer is not None and self.router is None:
+            self.coalescer.submit(payload).add_done_callback(
+                lambda f: self._coalesced_entry(symbol, open_trades, payload, account_balance, f.result()))
+            return
+        try:
+            await self.execute(payload, self.config.entry_algo)
+        except Exception as e:
+            ORDER_ERRORS.labels(signal_type).inc()
+            self.record(payload, "error", account_balance, 0, str(e))
+            print(f"⚠️ {symbol} Trade failed:", e)
+            return
+        ORDERS_SENT.labels(signal_type).inc()
+        price = payload["meta"]["entry_price"]
+        if self.exits.holds_positions:
+            open_trades.append(payload)
+            if self.tracker is not None and self.router is None:
+                self._follow_fills(open_trades, payload, payload["idempotency_key"], 1.0)
+        account_after = await asyncio.to_thread(self.balance.on_fill, payload, price)
+        self.record(payload, "success", account_after)
+        print(f"✅ {symbol} | {signal_type} {side} at ${price} size {payload['size']} | Leverage: {leverage} | Balance: ${round(account_after,2)}")
+
+    def _coalesced_entry(self, symbol, open_trades, payload, account_balance, res):
+        """Done-callback of a coalesced entry: keeps the share of this intent that went out."""
+        signal_type = payload["meta"]["signal_type"]
+        if res["status"] == "error":
+            ORDER_ERRORS.labels(signal_type).inc()
+            self.record(payload, "error", account_balance, 0, res["error"])
+            print(f"⚠️ {symbol} Trade failed:", res["error"])
+            return
+        if res["status"] == "netted":
+            self.record(payload, "netted", account_balance)
+            print(f"↔️ {symbol} | {signal_type} {payload['side']} netted against opposing signal")
+            return
+        if res["fill_ratio"] < 1:
+            payload["size"] = catalog_for(self.client).base_size(symbol, round(float(payload["size"]) * res["fill_ratio"], 8))
+        ORDERS_SENT.labels(signal_type).inc()
+        if self.exits.holds_positions:
+            open_trades.append(payload)
+            if self.tracker is not None:
+                merged = res["order"]
+                self._follow_fills(open_trades, payload, merged["idempotency_key"],
+                                   float(payload["size"]) / float(merged["size"]))
+        self.record(payload, "success", account_balance, notes=coalesced_note(payload, res))
+        print(f"✅ {symbol} | {signal_type} {payload['side']} at ${payload['meta']['entry_price']} size {payload['size']} | Leverage: {payload['meta']['leverage']} | Balance: ${round(account_balance,2)}")
+
+    def _follow_fills(self, open_trades, payload, order_key, share):
+        """Re-price the open trade with the real fills of order `order_key` (this trade's `share` of it)."""
+        self.tracker.on_update(order_key, lambda o: self._apply_fill(open_trades, payload, share, o))
+
+    def _apply_fill(self, open_trades, payload, share, order):
+        if order.filled_size > 0:
+            assumed = payload["meta"]["entry_price"]
+            payload["size"] = catalog_for(self.client).base_size(payload["product_id"], round(order.filled_size * share, 8))
+            if order.avg_fill_price:
+                payload["meta"]["entry_price"] = order.avg_fill_price
+                if payload["meta"].get("max_price") == assumed:
+                    payload["meta"]["max_price"] = order.avg_fill_price
+        # only an explicit exchange cancel/reject drops the position; an unconfirmed order (UNKNOWN) may have filled
+        if order.status in (CANCELLED, REJECTED) and order.filled_size == 0 and payload in open_trades:
+            open_trades.remove(payload)
+            self.record(payload, order.status.lower(), 0, notes=order.reason or "")
+        elif order.status == UNKNOWN:
+            print(f"❓ {payload['product_id']} | order {order.client_order_id} unconfirmed; keeping the position")
+        elif order.status == FILLED:
+            print(f"🧾 {payload['product_id']} | filled {payload['size']} @ {payload['meta']['entry_price']}")
+
+    async def _restore(self, symbol, warm):
+        """(price window, open trades) for a starting symbol loop: state snapshot, then strategy warm start."""
+        cfg = self.config
+        price_data, restored = [], []
+        if self.state_store is not None:
+            saved, age = self.state_store.restore(symbol, {})
+            if age is not None and age <= cfg.state_max_age_sec:
+                price_data = saved.get("price_data", [])
+            restored = saved.get("open_trades", [])
+            if age is not None:
+                print(f"♻️ {symbol} restored {len(price_data)} ticks, {len(restored)} open trades (snapshot age {age:.0f}s)")
+        if (len(price_data) < cfg.warm_min_ticks and hasattr(self.strategy, "seed")
+                and (warm is not None or self.warm is not None)):
+            if warm is None:
+                warm = await self.warm(symbol)
+            if warm:
+                self.strategy.seed(symbol, warm)
+                print(f"🔥 {symbol} indicators warm-started with {len(warm)} candle closes")
+        open_trades = self.open_trades.get(symbol)
+        if open_trades is None:
+            open_trades = self.open_trades[symbol] = restored
+        if self.state_store is not None:
+            self.state_store.register(symbol, lambda: {"price_data": price_data, "open_trades": open_trades})
+        return price_data, open_trades
+
+    async def trade_symbol(self, symbol, warm=None):
+        """One symbol's loop; `warm` is a prefetched warm-start window (e.g. from UniverseManager)."""
+        cfg = self.config
+        price_data, open_trades = await self._restore(symbol, warm)
+        while True:
+            try:
+                price = await self.prices.aget(symbol, max_age=-1)   # always a new tick (shared with concurrent misses)
+                price_data.append(price)
+                if len(price_data) > cfg.max_ticks:
+                    price_data.pop(0)
+                if self.state_store is not None:
+                    self.state_store.mark_dirty(symbol)
+                for hook in self.on_tick:
+                    hook(symbol, price)
+                if self.recorder is not None:
+                    self.recorder.tick(symbol, price)
+
+                account_balance = await asyncio.to_thread(self.balance.get)
+                if open_trades:
+                    await self._close_trades(symbol, open_trades, price, account_balance)
+                if self.router is None:
+                    await self._open_trade(symbol, open_trades, price, account_balance, price_data)
+                elif symbol not in self._entering:
+                    # a routed entry may work for a while: keep ticking (and checking exits) meanwhile
+                    self._entering.add(symbol)
+                    task = asyncio.create_task(self._open_trade(symbol, open_trades, price, account_balance, price_data))
+                    task.add_done_callback(lambda _, s=symbol: self._entering.discard(s))
+
+                await asyncio.sleep(cfg.tick_sec)
+            except Exception as e:
+                print(f"⚠️ {symbol} Bot error:", e)
+                await asyncio.sleep(cfg.error_backoff_sec)
+
+    def background_tasks(self):
+        """Coroutines to run next to the symbol loops (called on the loop; also used by nija_sharded_runtime)."""
+        tasks = [self.journal.flush_forever()] + [make() for make in self.background]
+        if self.coalescer is not None:
+            self.coalescer.bind()
+        if self.tracker is not None:
+            self.tracker.bind()
+            tasks.append(self.tracker.poll_forever(self.client))
+        if self.state_store is not None:
+            tasks.append(self.state_store.checkpoint_forever())
+        if self.router is not None:
+            tasks.append(self.router.run())
+        if self.recorder is not None:
+            tasks.extend(self.recorder.background_tasks())
+            tasks.append(self.recorder.sample_forever(self.config.name, self.balance.get))
+        return tasks
+
+    def _make_router(self):
+        """Smart-execution router; raises UnsupportedOperation for a client that cannot rest / cancel orders."""
+        from nija_exchange import exchange_for
+        from nija_execution import ExecutionScheduler, bar_volume_profile, REQUIRED_OPERATIONS
+        exchange = exchange_for(self.client)
+        exchange.require(*REQUIRED_OPERATIONS)
+        profile = (lambda symbol: bar_volume_profile(self.bars, symbol)) if self.bars is not None else None
+        return ExecutionScheduler(exchange, catalog_for(self.client), profile)
+
+    async def run(self):
+        await asyncio.to_thread(getattr(self.client, "resolve", lambda: self.client))
+        if self.router is None and self.config.execution == "smart":
+            self.router = self._make_router()
+        if self.recorder is None and self.config.timeseries:
+            from nija_timeseries import recorder_from_env
+            self.recorder = await asyncio.to_thread(recorder_from_env)
+        tasks = [self.trade_symbol(sym) for sym in self.symbols]
+        tasks.extend(self.background_tasks())
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self.close()
+
+    def close(self):
+        """Final state checkpoint and journal / recorder flush (on shutdown)."""
+        if self.state_store is not None:
+            self.state_store.checkpoint()
+        self.journal.flush()
+        if self.recorder is not None:
+            self.recorder.close()
@@ -0,0 +1,627 @@
+# nija_exchange.py
+"""
+NIJA: one async exchange interface over the Coinbase SDK and ccxt
+The tree talks to coinbase.rest.RESTClient, coinbase_advanced_py.Client and
+ccxt exchanges, and used to probe each call (hasattr(client, "fetch_ticker"),
+"get_ticker", "create_order", ...). A backend is now picked ONCE per client
+and every call goes straight to a bound method:
+
+    CoinbaseBackend   coinbase.rest.RESTClient (Advanced Trade)
+    LegacyBackend     coinbase_advanced_py.Client (get_ticker / place_market_order)
+    CcxtBackend       any ccxt exchange (ccxt.coinbase, ...)
+
+Backends are blocking and return the typed models below (Ticker, Trade,
+Order, Book; balances are nija_portfolio.Balance, products nija_products.Product).
+Exchange is the async facade: calls run on one shared, bounded I/O thread
+pool, and clients built by create_exchange() share one pooled HTTP session,
+so all backends reuse keep-alive connections.
+
+    ex = create_exchange("coinbase", api_key=..., api_secret=...)
+    t = await ex.ticker("BTC-USD")            # Ticker(price, bid, ask, ...)
+    o = await ex.market_order("BTC-USD", "buy", base_size="0.001")
+
+    ex = exchange_for(client)                 # wrap an existing client
+    routed = RoutedExchange([ex_sdk, ex_ccxt])   # reads go to the faster backend
+
+Each backend lists the calls it implements in `operations`; a call outside
+that set raises UnsupportedOperation. Callers that need a set of calls
+check up front with ex.require("book", "limit_order", ...), so a missing
+capability fails at startup and not on the first order.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from nija_metrics import exchange_call, time_waits
+from nija_order_tracker import normalize_status, REJECTED
+from nija_portfolio import Balance, fetch_all_accounts, normalize_account
+from nija_products import Product, fetch_all_products, normalize_product, _dec
+
+# ---------- CONFIG ----------
+EXCHANGE_BACKEND = os.getenv("EXCHANGE_BACKEND", "coinbase")     # coinbase | legacy | ccxt:<exchange id>
+EXCHANGE_IO_THREADS = int(os.getenv("EXCHANGE_IO_THREADS", "16"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+ROUTE_EWMA_ALPHA = 0.2
+ROUTE_EXPLORE_EVERY = 50        # re-time a slower backend every N routed calls
+# ----------------------------
+
+
+class UnsupportedOperation(NotImplementedError):
+    """The backend (or its client) has no endpoint for this call."""
+
+
+# -------------------
+# MODELS
+# -------------------
+class Ticker:
+    __slots__ = ("symbol", "price", "bid", "ask", "volume", "ts")
+
+    def __init__(self, symbol, price, bid=None, ask=None, volume=None, ts=None):
+        self.symbol = symbol
+        self.price = price
+        self.bid = bid
+        self.ask = ask
+        self.volume = volume
+        self.ts = ts if ts is not None else time.time()
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class Trade:
+    __slots__ = ("trade_id", "symbol", "price", "size", "side", "ts")
+
+    def __init__(self, trade_id, symbol, price, size, side=None, ts=None):
+        self.trade_id = trade_id
+        self.symbol = symbol
+        self.price = price
+        self.size = size
+        self.side = side
+        self.ts = ts
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class Order:
+    __slots__ = ("order_id", "client_order_id", "symbol", "side", "size", "status", "filled_size",
+                 "avg_fill_price", "reason")
+
+    def __init__(self, order_id, client_order_id, symbol, side, size=None, status="NEW", filled_size=0.0,
+                 avg_fill_price=None, reason=None):
+        self.order_id = order_id
+        self.client_order_id = client_order_id
+        self.symbol = symbol
+        self.side = side
+        self.size = size
+        self.status = status
+        self.filled_size = filled_size
+        self.avg_fill_price = avg_fill_price
+        self.reason = reason
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class Book:
+    """Top of the order book: bids/asks as [(price, size)], best first."""
+    __slots__ = ("symbol", "bids", "asks", "ts")
+
+    def __init__(self, symbol, bids, asks, ts=None):
+        self.symbol = symbol
+        self.bids = bids
+        self.asks = asks
+        self.ts = ts if ts is not None else time.time()
+
+    @property
+    def best_bid(self):
+        return self.bids[0][0] if self.bids else None
+
+    @property
+    def best_ask(self):
+        return self.asks[0][0] if self.asks else None
+
+    @property
+    def mid(self):
+        if not self.bids or not self.asks:
+            return None
+        return (self.bids[0][0] + self.asks[0][0]) / 2
+
+    def spread_bps(self):
+        mid = self.mid
+        return (self.asks[0][0] - self.bids[0][0]) / mid * 1e4 if mid else float("inf")
+
+    def depth(self, side, band_bps):
+        """Base size a `side` order can take within band_bps of the touch (buy -> asks, sell -> bids)."""
+        levels = self.asks if side == "buy" else self.bids
+        if not levels:
+            return 0.0
+        touch = levels[0][0]
+        limit = touch * (1 + band_bps / 1e4) if side == "buy" else touch * (1 - band_bps / 1e4)
+        total = 0.0
+        for price, size in levels:
+            if (side == "buy" and price > limit) or (side == "sell" and price < limit):
+                break
+            total += size
+        return total
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+def _as_dict(obj):
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    return obj
+
+
+def _num(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_ts(value):
+    """Epoch seconds from epoch s/ms or an ISO-8601 string."""
+    if isinstance(value, (int, float)):
+        return value / 1000.0 if value > 1e11 else float(value)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def _method(client, name):
+    """Bound client method, or a stub raising UnsupportedOperation (resolved once, at backend creation)."""
+    fn = getattr(client, name, None)
+    if fn is not None:
+        return fn
+
+    def missing(*args, **kwargs):
+        raise UnsupportedOperation("%s has no %s()" % (type(client).__name__, name))
+    return missing
+
+
+# -------------------
+# SHARED I/O
+# -------------------
+_executor = None
+_session = None
+_io_lock = threading.Lock()
+
+
+def io_executor():
+    """The bounded thread pool every backend call runs on."""
+    global _executor
+    with _io_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(EXCHANGE_IO_THREADS, thread_name_prefix="nija-exchange")
+        return _executor
+
+
+def shared_session():
+    """One requests.Session with a pooled adapter, shared by every client create_exchange() builds."""
+    global _session
+    with _io_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+# -------------------
+# BACKENDS (blocking)
+# -------------------
+class CoinbaseBackend:
+    """coinbase.rest.RESTClient (Advanced Trade API)."""
+    name = "coinbase"
+    operations = frozenset(("ticker", "tickers", "market_trades", "book", "market_order", "limit_order",
+                            "get_order", "cancel_order", "balances", "products"))
+
+    def __init__(self, client):
+        self.client = client
+        self._get_product = _method(client, "get_product")
+        self._get_best_bid_ask = _method(client, "get_best_bid_ask")
+        self._get_market_trades = _method(client, "get_market_trades")
+        self._market_order = _method(client, "market_order")
+        self._limit_order_gtc = _method(client, "limit_order_gtc")
+        self._limit_order_ioc = _method(client, "limit_order_ioc")
+        self._get_product_book = _method(client, "get_product_book")
+        self._get_order = _method(client, "get_order")
+        self._cancel_orders = _method(client, "cancel_orders")
+
+    def ticker(self, symbol):
+        p = _as_dict(exchange_call("get_product", self._get_product, symbol))
+        return Ticker(symbol, float(p["price"]), volume=_num(p.get("volume_24h")))
+
+    def tickers(self, symbols):
+        """Best bid/ask for many symbols in one call (price = mid)."""
+        resp = _as_dict(exchange_call("get_best_bid_ask", self._get_best_bid_ask, product_ids=list(symbols)))
+        out = {}
+        for book in resp.get("pricebooks", []):
+            bid = _num((book.get("bids") or [{}])[0].get("price"))
+            ask = _num((book.get("asks") or [{}])[0].get("price"))
+            if bid and ask:
+                out[book["product_id"]] = Ticker(book["product_id"], (bid + ask) / 2, bid, ask)
+        return out
+
+    def market_trades(self, symbol, limit=100):
+        resp = _as_dict(exchange_call("get_market_trades", self._get_market_trades, symbol, limit=limit))
+        trades = [Trade(str(t["trade_id"]), symbol, float(t["price"]), float(t["size"]), t.get("side"), parse_ts(t["time"]))
+                  for t in resp.get("trades", [])]
+        trades.sort(key=lambda t: t.ts)
+        return trades
+
+    def book(self, symbol, depth=50):
+        resp = _as_dict(exchange_call("get_product_book", self._get_product_book, symbol, limit=depth))
+        pb = resp.get("pricebook", resp)
+        return Book(symbol, [(float(l["price"]), float(l["size"])) for l in pb.get("bids", [])],
+                    [(float(l["price"]), float(l["size"])) for l in pb.get("asks", [])])
+
+    def market_order(self, symbol, side, base_size=None, quote_size=None, client_order_id=None):
+        cid = client_order_id or str(uuid.uuid4())
+        kwargs = {"base_size": str(base_size)} if base_size is not None else {"quote_size": str(quote_size)}
+        resp = _as_dict(exchange_call("market_order", self._market_order, cid, symbol, side.upper(), **kwargs))
+        return self._created(resp, cid, symbol, side, base_size)
+
+    def limit_order(self, symbol, side, base_size, price, post_only=False, ioc=False, client_order_id=None):
+        cid = client_order_id or str(uuid.uuid4())
+        if ioc:
+            resp = exchange_call("limit_order_ioc", self._limit_order_ioc, cid, symbol, side.upper(),
+                                 str(base_size), str(price))
+        else:
+            resp = exchange_call("limit_order_gtc", self._limit_order_gtc, cid, symbol, side.upper(),
+                                 str(base_size), str(price), post_only=post_only)
+        return self._created(_as_dict(resp), cid, symbol, side, base_size)
+
+    def _created(self, resp, cid, symbol, side, base_size):
+        if not resp.get("success", True):
+            err = resp.get("error_response") or {}
+            return Order(None, cid, symbol, side, base_size, REJECTED,
+                         reason=err.get("message") or resp.get("failure_reason"))
+        ok = resp.get("success_response") or {}
+        return Order(ok.get("order_id") or resp.get("order_id"), cid, symbol, side, base_size)
+
+    def get_order(self, order_id, symbol=None):
+        o = _as_dict(exchange_call("get_order", self._get_order, order_id))
+        o = o.get("order", o)
+        return Order(o.get("order_id"), o.get("client_order_id"), o.get("product_id"), str(o.get("side", "")).lower(),
+                     None, normalize_status(o.get("status")), _num(o.get("filled_size")) or 0.0,
+                     _num(o.get("average_filled_price")), o.get("reject_reason") or None)
+
+    def cancel_order(self, order_id, symbol=None):
+        resp = _as_dict(exchange_call("cancel_orders", self._cancel_orders, [order_id]))
+        results = resp.get("results", [])
+        return bool(results and results[0].get("success"))
+
+    def balances(self):
+        out = {}
+        for a in fetch_all_accounts(self.client):
+            b = normalize_account(a)
+            if b is not None:
+                out[b.currency] = b
+        return out
+
+    def products(self):
+        return [p for p in map(normalize_product, fetch_all_products(self.client)) if p is not None]
+
+
+class LegacyBackend(CoinbaseBackend):
+    """coinbase_advanced_py.Client as used by the bots (get_ticker / place_market_order(payload))."""
+    name = "legacy"
+    operations = frozenset(("ticker", "tickers", "market_order", "balances", "products"))
+
+    def __init__(self, client):
+        self.client = client
+        self._get_ticker = _method(client, "get_ticker")
+        self._place_market_order = _method(client, "place_market_order")
+
+    def ticker(self, symbol):
+        t = _as_dict(exchange_call("get_ticker", self._get_ticker, symbol))
+        return Ticker(symbol, float(t["price"]), _num(t.get("bid")), _num(t.get("ask")), _num(t.get("volume")))
+
+    def tickers(self, symbols):
+        return {s: self.ticker(s) for s in symbols}
+
+    def market_trades(self, symbol, limit=100):
+        raise UnsupportedOperation("legacy client has no market trades endpoint")
+
+    def book(self, symbol, depth=50):
+        raise UnsupportedOperation("legacy client has no order book endpoint")
+
+    def limit_order(self, symbol, side, base_size, price, post_only=False, ioc=False, client_order_id=None):
+        raise UnsupportedOperation("legacy client has no limit orders")
+
+    def market_order(self, symbol, side, base_size=None, quote_size=None, client_order_id=None):
+        cid = client_order_id or str(uuid.uuid4())
+        payload = {"product_id": symbol, "side": side, "type": "market", "idempotency_key": cid}
+        if base_size is not None:
+            payload["size"] = str(base_size)
+        else:
+            payload["funds"] = str(quote_size)
+        resp = _as_dict(exchange_call("place_market_order", self._place_market_order, payload)) or {}
+        return Order(resp.get("order_id") or resp.get("id"), cid, symbol, side, base_size,
+                     normalize_status(resp.get("status")))
+
+    def get_order(self, order_id, symbol=None):
+        raise UnsupportedOperation("legacy client has no order lookup")
+
+    def cancel_order(self, order_id, symbol=None):
+        raise UnsupportedOperation("legacy client has no order cancel")
+
+
+class CcxtBackend:
+    """Any ccxt exchange instance (symbols are converted BTC-USD <-> BTC/USD)."""
+    name = "ccxt"
+    operations = CoinbaseBackend.operations
+
+    def __init__(self, client):
+        self.client = client
+        self.name = "ccxt:" + getattr(client, "id", "exchange")
+        self._fetch_ticker = _method(client, "fetch_ticker")
+        self._fetch_tickers = _method(client, "fetch_tickers")
+        self._fetch_trades = _method(client, "fetch_trades")
+        self._fetch_order_book = _method(client, "fetch_order_book")
+        self._create_order = _method(client, "create_order")
+        self._fetch_order = _method(client, "fetch_order")
+        self._cancel_order = _method(client, "cancel_order")
+        self._fetch_balance = _method(client, "fetch_balance")
+        self._load_markets = _method(client, "load_markets")
+        time_waits(client, "throttle", self.name)      # enableRateLimit sleeps before each request
+
+    @staticmethod
+    def market(symbol):
+        return symbol.replace("-", "/")
+
+    @staticmethod
+    def product_id(market):
+        return market.replace("/", "-")
+
+    def _ticker(self, t):
+        return Ticker(self.product_id(t["symbol"]), float(t.get("last") or t.get("close")), _num(t.get("bid")),
+                      _num(t.get("ask")), _num(t.get("baseVolume")),
+                      t["timestamp"] / 1000.0 if t.get("timestamp") else None)
+
+    def ticker(self, symbol):
+        return self._ticker(exchange_call("fetch_ticker", self._fetch_ticker, self.market(symbol)))
+
+    def tickers(self, symbols):
+        raw = exchange_call("fetch_tickers", self._fetch_tickers, [self.market(s) for s in symbols])
+        return {self.product_id(m): self._ticker(t) for m, t in raw.items()}
+
+    def market_trades(self, symbol, limit=100):
+        raw = exchange_call("fetch_trades", self._fetch_trades, self.market(symbol), limit=limit)
+        trades = [Trade(str(t["id"]), symbol, float(t["price"]), float(t["amount"]), t.get("side"), t["timestamp"] / 1000.0)
+                  for t in raw]
+        trades.sort(key=lambda t: t.ts)
+        return trades
+
+    def _order(self, o, symbol=None, cid=None):
+        return Order(str(o.get("id")), o.get("clientOrderId") or cid, self.product_id(o.get("symbol") or symbol or ""),
+                     o.get("side"), _num(o.get("amount")), normalize_status(o.get("status")),
+                     _num(o.get("filled")) or 0.0, _num(o.get("average")))
+
+    def book(self, symbol, depth=50):
+        raw = exchange_call("fetch_order_book", self._fetch_order_book, self.market(symbol), depth)
+        return Book(symbol, [(float(p), float(q)) for p, q, *_ in raw.get("bids", [])],
+                    [(float(p), float(q)) for p, q, *_ in raw.get("asks", [])])
+
+    def limit_order(self, symbol, side, base_size, price, post_only=False, ioc=False, client_order_id=None):
+        cid = client_order_id or str(uuid.uuid4())
+        params = {"clientOrderId": cid}
+        if post_only:
+            params["postOnly"] = True
+        if ioc:
+            params["timeInForce"] = "IOC"
+        o = exchange_call("create_order", self._create_order, self.market(symbol), "limit", side, float(base_size),
+                          float(price), params)
+        return self._order(o, symbol, cid)
+
+    def market_order(self, symbol, side, base_size=None, quote_size=None, client_order_id=None):
+        cid = client_order_id or str(uuid.uuid4())
+        params = {"clientOrderId": cid}
+        if base_size is None:
+            params["cost"] = float(quote_size)
+        o = exchange_call("create_order", self._create_order, self.market(symbol), "market", side,
+                          float(base_size) if base_size is not None else None, None, params)
+        return self._order(o, symbol, cid)
+
+    def get_order(self, order_id, symbol=None):
+        return self._order(exchange_call("fetch_order", self._fetch_order, order_id,
+                                         self.market(symbol) if symbol else None), symbol)
+
+    def cancel_order(self, order_id, symbol=None):
+        exchange_call("cancel_order", self._cancel_order, order_id, self.market(symbol) if symbol else None)
+        return True
+
+    def balances(self):
+        raw = exchange_call("fetch_balance", self._fetch_balance)
+        free, used = raw.get("free", {}), raw.get("used", {})
+        return {cur: Balance(cur, float(free.get(cur) or 0), float(used.get(cur) or 0)) for cur in free}
+
+    def products(self):
+        markets = exchange_call("load_markets", self._load_markets)
+        out = []
+        for m in markets.values():
+            prec = m.get("precision") or {}
+            limits = m.get("limits") or {}
+            out.append(Product(
+                self.product_id(m["symbol"]),
+                base_increment=_dec(prec.get("amount")),
+                quote_increment=_dec(prec.get("price")),
+                base_min_size=_dec((limits.get("amount") or {}).get("min")),
+                base_max_size=_dec((limits.get("amount") or {}).get("max")),
+                quote_min_size=_dec((limits.get("cost") or {}).get("min")),
+                status="online" if m.get("active", True) else "offline",
+            ))
+        return out
+
+
+def backend_for_client(client):
+    """Pick the backend for a client object (the only place that inspects the client's shape)."""
+    if hasattr(client, "resolve"):          # nija_startup.LazyObject
+        client = client.resolve()
+    if hasattr(client, "fetch_ticker"):
+        return CcxtBackend(client)
+    if hasattr(client, "get_ticker"):
+        return LegacyBackend(client)
+    return CoinbaseBackend(client)
+
+
+# -------------------
+# ASYNC FACADE
+# -------------------
+class Exchange:
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+
+    def supports(self, *operations):
+        return all(op in self.backend.operations for op in operations)
+
+    def require(self, *operations):
+        """Raise UnsupportedOperation unless the backend implements every one of `operations`."""
+        missing = [op for op in operations if op not in self.backend.operations]
+        if missing:
+            raise UnsupportedOperation("%s backend does not support %s" % (self.name, ", ".join(missing)))
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(io_executor(), lambda: fn(*args, **kwargs))
+
+    async def ticker(self, symbol):
+        return await self._run(self.backend.ticker, symbol)
+
+    async def tickers(self, symbols):
+        return await self._run(self.backend.tickers, symbols)
+
+    async def market_trades(self, symbol, limit=100):
+        return await self._run(self.backend.market_trades, symbol, limit)
+
+    async def market_order(self, symbol, side, base_size=None, quote_size=None, client_order_id=None):
+        if (base_size is None) == (quote_size is None):
+            raise ValueError("exactly one of base_size / quote_size is required")
+        return await self._run(self.backend.market_order, symbol, side, base_size, quote_size, client_order_id)
+
+    async def limit_order(self, symbol, side, base_size, price, post_only=False, ioc=False, client_order_id=None):
+        return await self._run(self.backend.limit_order, symbol, side, base_size, price, post_only, ioc,
+                               client_order_id)
+
+    async def book(self, symbol, depth=50):
+        return await self._run(self.backend.book, symbol, depth)
+
+    async def get_order(self, order_id, **kwargs):
+        return await self._run(self.backend.get_order, order_id, **kwargs)
+
+    async def cancel_order(self, order_id, **kwargs):
+        return await self._run(self.backend.cancel_order, order_id, **kwargs)
+
+    async def balances(self):
+        return await self._run(self.backend.balances)
+
+    async def products(self):
+        return await self._run(self.backend.products)
+
+
+class RoutedExchange:
+    """
+    Several backends for the SAME account. Read calls go to the backend with
+    the lowest EWMA latency for that call (every ROUTE_EXPLORE_EVERY calls a
+    slower one is re-timed); orders always go to the primary (first) backend
+    so order ids stay on one API.
+    """
+
+    def __init__(self, exchanges):
+        self.exchanges = list(exchanges)
+        self.primary = self.exchanges[0]
+        self.name = "routed(%s)" % ",".join(e.name for e in self.exchanges)
+        self.latency = {}     # (op, backend name) -> EWMA seconds
+        self._calls = 0
+
+    def _pick(self, op):
+        self._calls += 1
+        untimed = [e for e in self.exchanges if (op, e.name) not in self.latency]
+        if untimed:
+            return untimed[0]
+        ranked = sorted(self.exchanges, key=lambda e: self.latency[(op, e.name)])
+        if len(ranked) > 1 and self._calls % ROUTE_EXPLORE_EVERY == 0:
+            return ranked[1]
+        return ranked[0]
+
+    async def _routed(self, op, *args):
+        ex = self._pick(op)
+        start = time.perf_counter()
+        try:
+            return await getattr(ex, op)(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            key = (op, ex.name)
+            prev = self.latency.get(key)
+            self.latency[key] = elapsed if prev is None else prev + ROUTE_EWMA_ALPHA * (elapsed - prev)
+
+    async def ticker(self, symbol):
+        return await self._routed("ticker", symbol)
+
+    async def tickers(self, symbols):
+        return await self._routed("tickers", symbols)
+
+    async def market_trades(self, symbol, limit=100):
+        return await self._routed("market_trades", symbol, limit)
+
+    async def book(self, symbol, depth=50):
+        return await self._routed("book", symbol, depth)
+
+    async def products(self):
+        return await self._routed("products")
+
+    def __getattr__(self, attr):
+        # orders / balances: primary backend only
+        return getattr(self.primary, attr)
+
+
+# -------------------
+# CONSTRUCTION
+# -------------------
+def create_client(backend=EXCHANGE_BACKEND, api_key=None, api_secret=None):
+    """Build a raw client for `backend`, sharing the pooled HTTP session."""
+    api_key = api_key or os.getenv("API_KEY") or os.getenv("COINBASE_API_KEY")
+    api_secret = api_secret or os.getenv("API_SECRET") or os.getenv("COINBASE_API_SECRET")
+    if backend == "coinbase":
+        from coinbase.rest import RESTClient
+        client = RESTClient(api_key=api_key, api_secret=api_secret)
+        client.session = shared_session()
+        return client
+    if backend == "legacy":
+        import coinbase_advanced_py as cb
+        return cb.Client(api_key, api_secret)
+    if backend.startswith("ccxt"):
+        import ccxt
+        exchange_id = backend.partition(":")[2] or "coinbase"
+        return getattr(ccxt, exchange_id)({"apiKey": api_key, "secret": api_secret, "enableRateLimit": True,
+                                           "session": shared_session()})
+    raise ValueError("unknown exchange backend %r" % backend)
+
+
+def create_exchange(backend=EXCHANGE_BACKEND, **credentials):
+    client = create_client(backend, **credentials)
+    ex = Exchange(backend_for_client(client))
+    _exchanges[id(client)] = (client, ex)
+    return ex
+
+
+_exchanges = {}
+
+
+def exchange_for(client):
+    """Shared Exchange per client object; the backend is chosen on first use (client resolved then)."""
+    entry = _exchanges.get(id(client))
+    if entry is None or entry[0] is not client:
+        entry = _exchanges[id(client)] = (client, Exchange(backend_for_client(client)))
+    return entry[1]
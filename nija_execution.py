@@ -0,0 +1,402 @@
+# nija_execution.py
+"""
+NIJA: smart order routing / execution algorithms
+Every order path used to send one market order for the whole size, which
+walks the book when the size is large next to top-of-book depth. The
+ExecutionScheduler turns a parent order into child orders instead:
+
+  per child, from the current book:
+    cross  - spread <= MAX_CROSS_SPREAD_BPS and the child is small next to the
+             depth within CROSS_BAND_BPS: IOC limit a few bps through the touch
+    rest   - otherwise: post-only limit at the touch, re-priced ("chased") when
+             the touch moves away, IOC for whatever is left at the deadline
+
+  slicing (algo "auto" / "twap" / "vwap"): a parent larger than
+    SLICE_DEPTH_FRACTION of the band depth is split into slices spread over
+    `duration`; "vwap" weights the slices by a volume profile (e.g. the
+    1m bar volumes from nija_bars) instead of equally
+
+  "passive" always rests; "ioc" crosses and sends a market order for the
+  rest; "market" is a plain market order.
+
+Parents run concurrently as tasks of one scheduler (run() is its
+background task); each has an asyncio future resolved with the finished
+ParentOrder:
+
+    ex = exchange_for(client)
+    ex.require(*REQUIRED_OPERATIONS)      # e.g. the legacy client has no book / limit orders
+    router = ExecutionScheduler(ex, catalog_for(client))
+    asyncio.create_task(router.run())
+    parent = await router.execute("BTC-USD", "buy", 0.5, algo="twap", duration=120)
+    parent.filled, parent.avg_price
+"""
+
+import math
+import time
+import uuid
+import asyncio
+import logging
+from collections import deque
+
+from nija_metrics import Counter, Histogram, QUEUE_DEPTH
+from nija_order_tracker import REJECTED, TERMINAL
+from nija_products import floor_to
+
+logger = logging.getLogger("nija")
+
+# ---------- CONFIG ----------
+MAX_CROSS_SPREAD_BPS = 10.0
+CROSS_BAND_BPS = 15.0           # depth is counted within this band from the touch
+CROSS_DEPTH_FRACTION = 0.5      # cross only if the child is <= this fraction of band depth
+SLICE_DEPTH_FRACTION = 0.25     # slice parents bigger than this fraction of band depth
+MAX_SLICES = 20
+DEFAULT_DURATION_SEC = 60.0
+CHASE_INTERVAL_SEC = 2.0
+MAX_CHASES = 5
+IOC_SLIPPAGE_BPS = 20.0         # IOC limit this far through the touch
+BOOK_DEPTH = 50
+MAX_ACTIVE_PARENTS = 20
+SETTLE_POLL_SEC = 0.25          # IOC / market children are polled this often until terminal...
+SETTLE_TIMEOUT_SEC = 10.0       # ...for at most this long (then the parent stops sending)
+COMPLETED_HISTORY = 200
+# ----------------------------
+
+REQUIRED_OPERATIONS = ("book", "limit_order", "market_order", "get_order", "cancel_order")
+
+CHILD_ORDERS = Counter("nija_execution_child_orders_total", "Child orders sent by the execution scheduler", ["kind"])
+EXECUTION_SLIPPAGE = Histogram("nija_execution_slippage_bps", "Parent average fill vs arrival mid (bps, + = worse)",
+                               ["algo"], buckets=(-10, -5, -2, 0, 2, 5, 10, 25, 50, 100))
+
+WORKING = "WORKING"
+DONE = "DONE"
+PARTIAL = "PARTIAL"
+FAILED = "FAILED"
+
+
+class ParentOrder:
+    __slots__ = ("parent_id", "symbol", "side", "size", "algo", "duration", "filled", "notional", "status",
+                 "arrival_mid", "children", "created_ts", "done_ts", "error", "future")
+
+    def __init__(self, symbol, side, size, algo="auto", duration=DEFAULT_DURATION_SEC, parent_id=None):
+        self.parent_id = parent_id or str(uuid.uuid4())
+        self.symbol = symbol
+        self.side = side
+        self.size = float(size)
+        self.algo = algo
+        self.duration = duration
+        self.filled = 0.0
+        self.notional = 0.0
+        self.status = WORKING
+        self.arrival_mid = None
+        self.children = []          # child client order ids
+        self.created_ts = time.time()
+        self.done_ts = None
+        self.error = None
+        self.future = None
+
+    @property
+    def remaining(self):
+        return max(0.0, self.size - self.filled)
+
+    @property
+    def avg_price(self):
+        return self.notional / self.filled if self.filled else None
+
+    def slippage_bps(self):
+        if not self.filled or not self.arrival_mid:
+            return None
+        bps = (self.avg_price - self.arrival_mid) / self.arrival_mid * 1e4
+        return bps if self.side == "buy" else -bps
+
+    def to_dict(self):
+        out = {k: getattr(self, k) for k in self.__slots__ if k != "future"}
+        out["avg_price"] = self.avg_price
+        return out
+
+
+def decide(book, side, size):
+    """'cross' or 'rest' for a child of `size` given the current book."""
+    if book.best_bid is None or book.best_ask is None:
+        return "rest"
+    if book.spread_bps() > MAX_CROSS_SPREAD_BPS:
+        return "rest"
+    if size > book.depth(side, CROSS_BAND_BPS) * CROSS_DEPTH_FRACTION:
+        return "rest"
+    return "cross"
+
+
+def plan_slices(size, algo, book, side, duration, profile=None):
+    """[(offset_sec, size)] for a parent; sizes sum to `size`."""
+    if algo in ("market", "ioc", "passive"):
+        return [(0.0, size)]
+    depth = book.depth(side, CROSS_BAND_BPS) if book is not None else 0.0
+    cap = depth * SLICE_DEPTH_FRACTION
+    n = 1 if cap <= 0 or size <= cap else min(MAX_SLICES, int(math.ceil(size / cap)))
+    if algo in ("twap", "vwap"):
+        # at least one slice per full chase cycle of the duration
+        n = max(n, min(MAX_SLICES, int(duration // (CHASE_INTERVAL_SEC * MAX_CHASES))))
+    weights = [1.0] * n
+    if algo == "vwap" and profile:
+        prof = [max(0.0, float(w)) for w in profile(n)]
+        if len(prof) == n and sum(prof) > 0:
+            weights = prof
+    total = sum(weights)
+    step = duration / n if n > 1 else 0.0
+    return [(i * step, size * w / total) for i, w in enumerate(weights)]
+
+
+def bar_volume_profile(bars, symbol, timeframe="1m"):
+    """profile(n) from the last n closed bars' volumes (nija_bars.BarAggregator)."""
+    def profile(n):
+        return list(bars.bars(symbol, timeframe, n)["volume"])
+    return profile
+
+
+class ExecutionScheduler:
+    def __init__(self, exchange, catalog=None, profile=None, max_active=MAX_ACTIVE_PARENTS):
+        """
+        exchange: nija_exchange.Exchange (book / limit_order / market_order / get_order / cancel_order)
+        catalog:  nija_products.ProductCatalog for size / price increments (optional)
+        profile:  profile(symbol) -> fn(n) -> n volume weights, for algo="vwap"
+        """
+        self.exchange = exchange
+        self.catalog = catalog
+        self.profile = profile
+        self.active = {}                 # parent_id -> ParentOrder
+        self.completed = deque(maxlen=COMPLETED_HISTORY)
+        self.loop = None
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(max_active)
+        self._depth = QUEUE_DEPTH.labels("execution_parents")
+
+    # -------------------
+    # SUBMISSION
+    # -------------------
+    def submit(self, symbol, side, size, algo="auto", duration=DEFAULT_DURATION_SEC, parent_id=None):
+        """Queue a parent order (call on the scheduler's loop); returns it, with .future resolved when done."""
+        parent = ParentOrder(symbol, side, size, algo, duration, parent_id)
+        parent.future = asyncio.get_running_loop().create_future()
+        self.active[parent.parent_id] = parent
+        self._depth.inc()
+        self._queue.put_nowait(parent)
+        return parent
+
+    async def execute(self, symbol, side, size, algo="auto", duration=DEFAULT_DURATION_SEC, parent_id=None):
+        return await self.submit(symbol, side, size, algo, duration, parent_id).future
+
+    def submit_threadsafe(self, symbol, side, size, algo="auto", duration=DEFAULT_DURATION_SEC):
+        """execute() from another thread; returns a concurrent.futures.Future."""
+        if self.loop is None:
+            raise RuntimeError("ExecutionScheduler is not running; start run() first")
+        return asyncio.run_coroutine_threadsafe(self.execute(symbol, side, size, algo, duration), self.loop)
+
+    async def run(self):
+        """Background task: start every queued parent (at most max_active at a time)."""
+        self.loop = asyncio.get_running_loop()
+        while True:
+            parent = await self._queue.get()
+            await self._slots.acquire()
+            self.loop.create_task(self._run_parent(parent))
+
+    # -------------------
+    # PARENT
+    # -------------------
+    async def _run_parent(self, parent):
+        try:
+            book = await self.exchange.book(parent.symbol, BOOK_DEPTH) if parent.algo != "market" else None
+            if book is not None:
+                parent.arrival_mid = book.mid
+            if parent.algo == "market":
+                await self._market(parent, parent.remaining)
+            else:
+                profile = self.profile(parent.symbol) if self.profile else None
+                slices = plan_slices(parent.size, parent.algo, book, parent.side, parent.duration, profile)
+                start = time.monotonic()
+                carry = 0.0
+                for i, (offset, size) in enumerate(slices):
+                    wait = start + offset - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    last = i == len(slices) - 1
+                    want = parent.remaining if last else min(parent.remaining, size + carry)
+                    before = parent.filled
+                    deadline = start + (slices[i + 1][0] if not last else max(parent.duration, CHASE_INTERVAL_SEC * MAX_CHASES))
+                    await self._child(parent, want, deadline)
+                    carry = max(0.0, want - (parent.filled - before))
+                if parent.remaining > self._min_size(parent) and parent.algo == "ioc":
+                    await self._market(parent, parent.remaining)
+            parent.status = DONE if parent.remaining <= self._min_size(parent) else (PARTIAL if parent.filled else FAILED)
+        except Exception as e:
+            parent.error = str(e)
+            parent.status = PARTIAL if parent.filled else FAILED
+            logger.warning("execution of %s %s %s failed: %s", parent.side, parent.size, parent.symbol, e)
+        finally:
+            parent.done_ts = time.time()
+            slip = parent.slippage_bps()
+            if slip is not None:
+                EXECUTION_SLIPPAGE.labels(parent.algo).observe(slip)
+            self.active.pop(parent.parent_id, None)
+            self.completed.append(parent)
+            self._depth.dec()
+            self._slots.release()
+            if not parent.future.done():
+                parent.future.set_result(parent)
+
+    # -------------------
+    # CHILDREN
+    # -------------------
+    async def _child(self, parent, size, deadline):
+        size = self._size(parent, size)
+        if size <= 0:
+            return
+        book = await self.exchange.book(parent.symbol, BOOK_DEPTH)
+        mode = "rest" if parent.algo == "passive" else ("cross" if parent.algo == "ioc" else decide(book, parent.side, size))
+        if mode == "rest":
+            size = await self._rest(parent, size, book, deadline)
+        if size > 0:
+            await self._ioc(parent, size, book if mode == "cross" else None)
+
+    async def _rest(self, parent, size, book, deadline):
+        """Post-only at the touch, chasing the touch; returns the size still unfilled."""
+        order = None
+        chases = 0
+        while size > 0:
+            price = self._passive_price(parent, book)
+            if price is None:
+                return size
+            order = await self.exchange.limit_order(parent.symbol, parent.side, self._fmt(parent, size), price,
+                                                    post_only=True, client_order_id=self._child_id(parent))
+            CHILD_ORDERS.labels("post_only").inc()
+            if order.status == REJECTED:          # would have crossed: book moved, re-read and retry
+                chases += 1
+            elif not order.order_id:
+                # accepted without an id: it can't be watched or cancelled, so don't send more for this child
+                parent.error = "post-only child %s returned no order id" % order.client_order_id
+                logger.warning("execution of %s %s: %s", parent.side, parent.symbol, parent.error)
+                return 0.0
+            else:
+                filled = await self._watch(parent, order, deadline, float(price))
+                size = self._size(parent, size - filled)
+                chases += 1
+            if chases > MAX_CHASES or time.monotonic() >= deadline or size <= 0:
+                return size
+            book = await self.exchange.book(parent.symbol, BOOK_DEPTH)
+        return size
+
+    async def _watch(self, parent, order, deadline, price):
+        """
+        Poll a resting child until filled, the touch moves away, or the deadline. Unless it
+        reached a terminal state it is always cancelled, also when polling raises (or the
+        parent task is cancelled), so no limit order outlives its parent.
+        """
+        seen = 0.0
+        terminal = False
+        try:
+            while True:
+                await asyncio.sleep(min(CHASE_INTERVAL_SEC, max(0.0, deadline - time.monotonic())))
+                o = await self.exchange.get_order(order.order_id, symbol=parent.symbol)
+                seen = self._fill(parent, o, seen)
+                if o.status in TERMINAL:
+                    terminal = True
+                    return seen
+                book = await self.exchange.book(parent.symbol, 1)
+                touch = book.best_bid if parent.side == "buy" else book.best_ask
+                moved = touch is not None and (touch > price if parent.side == "buy" else touch < price)
+                if moved or time.monotonic() >= deadline:
+                    break
+        finally:
+            if not terminal:
+                try:
+                    await self.exchange.cancel_order(order.order_id, symbol=parent.symbol)
+                except Exception as e:
+                    logger.error("cancel of resting child %s (%s) failed: %s", order.order_id, parent.symbol, e)
+        o = await self.exchange.get_order(order.order_id, symbol=parent.symbol)
+        return self._fill(parent, o, seen)
+
+    async def _ioc(self, parent, size, book=None):
+        book = book or await self.exchange.book(parent.symbol, BOOK_DEPTH)
+        touch = book.best_ask if parent.side == "buy" else book.best_bid
+        if touch is None:
+            return 0.0
+        slip = IOC_SLIPPAGE_BPS / 1e4
+        price = self._price(parent, touch * (1 + slip) if parent.side == "buy" else touch * (1 - slip))
+        order = await self.exchange.limit_order(parent.symbol, parent.side, self._fmt(parent, size), price, ioc=True,
+                                                client_order_id=self._child_id(parent))
+        CHILD_ORDERS.labels("ioc").inc()
+        if order.status == REJECTED or not order.order_id:
+            return 0.0
+        return self._fill(parent, await self._settle(parent, order), 0.0)
+
+    async def _market(self, parent, size):
+        size = self._size(parent, size)
+        if size <= 0:
+            return 0.0
+        order = await self.exchange.market_order(parent.symbol, parent.side, base_size=self._fmt(parent, size),
+                                                 client_order_id=self._child_id(parent))
+        CHILD_ORDERS.labels("market").inc()
+        if order.status == REJECTED or not order.order_id:
+            return 0.0
+        return self._fill(parent, await self._settle(parent, order), 0.0)
+
+    async def _settle(self, parent, order):
+        """
+        Poll an IOC / market child until it is terminal, so its final fill is booked before the
+        parent sizes the next child. A child still open after SETTLE_TIMEOUT_SEC may yet fill:
+        its fill so far is booked and the parent raises instead of re-sending that size.
+        """
+        deadline = time.monotonic() + SETTLE_TIMEOUT_SEC
+        while order.status not in TERMINAL:
+            if time.monotonic() >= deadline:
+                self._fill(parent, order, 0.0)
+                raise RuntimeError("child %s not settled after %.0fs (status %s)"
+                                   % (order.client_order_id, SETTLE_TIMEOUT_SEC, order.status))
+            await asyncio.sleep(SETTLE_POLL_SEC)
+            order = await self.exchange.get_order(order.order_id, symbol=parent.symbol)
+        return order
+
+    # -------------------
+    # HELPERS
+    # -------------------
+    def _fill(self, parent, order, seen):
+        """Fold a child's cumulative fill into the parent; returns the child's new cumulative fill."""
+        filled = order.filled_size or 0.0
+        delta = filled - seen
+        if delta > 0:
+            parent.filled += delta
+            parent.notional += delta * (order.avg_fill_price or parent.arrival_mid or 0.0)
+        return max(filled, seen)
+
+    def _child_id(self, parent):
+        cid = "%s-%d" % (parent.parent_id[:8], len(parent.children))
+        parent.children.append(cid)
+        return cid
+
+    def _product(self, parent):
+        return self.catalog.get(parent.symbol) if self.catalog is not None else None
+
+    def _min_size(self, parent):
+        p = self._product(parent)
+        return float(p.base_increment) if p is not None else 1e-8
+
+    def _size(self, parent, size):
+        size = min(size, parent.remaining)
+        if self.catalog is not None:
+            return float(self.catalog.floor_base(parent.symbol, size))
+        return size if size > 1e-12 else 0.0
+
+    def _fmt(self, parent, size):
+        return self.catalog.base_size(parent.symbol, size) if self.catalog is not None else repr(size)
+
+    def _price(self, parent, price):
+        p = self._product(parent)
+        return str(floor_to(price, p.quote_increment)) if p is not None else repr(price)
+
+    def _passive_price(self, parent, book):
+        touch = book.best_bid if parent.side == "buy" else book.best_ask
+        return self._price(parent, touch) if touch is not None else None
+
+    def status(self):
+        return {
+            "active": [p.to_dict() for p in self.active.values()],
+            "completed": [p.to_dict() for p in list(self.completed)[-20:]],
+        }
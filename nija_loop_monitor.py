@@ -0,0 +1,158 @@
+# nija_loop_monitor.py
+"""
+NIJA: asyncio event-loop watchdog + blocking-call detector
+A heartbeat coroutine stamps the loop every `interval` seconds and publishes
+the scheduling lag to nija_metrics.LOOP_LAG. A daemon sampler thread watches
+the heartbeat; when it goes quiet for longer than `threshold` the loop thread
+is blocked, so the sampler grabs the loop thread's current stack via
+sys._current_frames() and charges the stall to the innermost NIJA frame
+(e.g. the synchronous client.get_ticker() inside trade_symbol).
+
+Usage:
+    watchdog = LoopWatchdog(threshold=0.1)
+    asyncio.create_task(watchdog.run())
+    ...
+    watchdog.worst(5)   # -> list of worst blocking call sites
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+
+from nija_metrics import Counter, LOOP_LAG
+
+logger = logging.getLogger("nija")
+
+# ---------- CONFIG ----------
+STALL_THRESHOLD_SEC = float(os.getenv("LOOP_STALL_THRESHOLD_SEC", "0.1"))
+HEARTBEAT_SEC = 0.02
+SAMPLE_SEC = 0.01
+MAX_STACK_DEPTH = 40
+# ----------------------------
+
+LOOP_STALLS = Counter("nija_loop_stalls_total", "Event-loop stalls longer than the watchdog threshold", ["site"])
+
+_REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def _call_site(stack):
+    """Innermost frame that lives in this repo (not vendor/, not this module); else innermost frame."""
+    for fs in reversed(stack):
+        fn = os.path.abspath(fs.filename)
+        if fn.startswith(_REPO_DIR) and fn != _THIS_FILE and os.sep + "vendor" + os.sep not in fn:
+            return "%s:%d %s" % (os.path.relpath(fn, _REPO_DIR), fs.lineno, fs.name)
+    if stack:
+        fs = stack[-1]
+        return "%s:%d %s" % (fs.filename, fs.lineno, fs.name)
+    return "<unknown>"
+
+
+class LoopWatchdog:
+    def __init__(self, threshold=STALL_THRESHOLD_SEC, interval=HEARTBEAT_SEC, sample_interval=SAMPLE_SEC):
+        self.threshold = threshold
+        self.interval = interval
+        self.sample_interval = sample_interval
+        self.max_lag = 0.0
+        self._last_beat = time.monotonic()
+        self._loop_thread_id = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._sites = {}          # site -> {"count", "total_s", "max_s", "samples", "stack"}
+        self._stall_start = None  # monotonic time of the last beat before the current stall
+        self._stall_site = None
+
+    # -------------------
+    # LOOP SIDE
+    # -------------------
+    async def run(self, report_every=None):
+        """Heartbeat coroutine; run it as a task on the loop you want to watch."""
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._start_sampler()
+        next_report = loop.time() + report_every if report_every else None
+        try:
+            while True:
+                expected = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                now = loop.time()
+                lag = max(0.0, now - expected)
+                self._last_beat = time.monotonic()
+                LOOP_LAG.set(lag)
+                if lag > self.max_lag:
+                    self.max_lag = lag
+                if next_report and now >= next_report:
+                    next_report = now + report_every
+                    self.log_report()
+        finally:
+            self._stop.set()
+
+    # -------------------
+    # SAMPLER THREAD
+    # -------------------
+    def _start_sampler(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="nija-loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            beat = self._last_beat
+            blocked_for = time.monotonic() - beat
+            if blocked_for < self.threshold:
+                if self._stall_start is not None:
+                    self._finish_stall(beat - self._stall_start)
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame, limit=MAX_STACK_DEPTH)
+            del frame
+            site = _call_site(stack)
+            with self._lock:
+                entry = self._sites.setdefault(site, {"count": 0, "total_s": 0.0, "max_s": 0.0, "samples": 0, "stack": None})
+                entry["samples"] += 1
+                if entry["stack"] is None:
+                    entry["stack"] = "".join(traceback.format_list(stack))
+            if self._stall_start is None:
+                self._stall_start = beat
+                self._stall_site = site
+                logger.warning("Event loop blocked > %.0fms at %s\n%s",
+                               self.threshold * 1000, site, "".join(traceback.format_list(stack[-8:])))
+
+    def _finish_stall(self, duration):
+        site = self._stall_site
+        self._stall_start = None
+        self._stall_site = None
+        LOOP_STALLS.labels(site).inc()
+        with self._lock:
+            entry = self._sites[site]
+            entry["count"] += 1
+            entry["total_s"] += duration
+            entry["max_s"] = max(entry["max_s"], duration)
+
+    # -------------------
+    # REPORTING
+    # -------------------
+    def worst(self, n=10):
+        """Return the n call sites with the most total blocked time."""
+        with self._lock:
+            rows = [dict(site=site, **entry) for site, entry in self._sites.items()]
+        rows.sort(key=lambda r: (r["total_s"], r["samples"]), reverse=True)
+        for r in rows:
+            r["total_s"] = round(r["total_s"], 4)
+            r["max_s"] = round(r["max_s"], 4)
+        return rows[:n]
+
+    def log_report(self, n=5):
+        for r in self.worst(n):
+            logger.info("loop stall site %s: stalls=%d total=%.3fs max=%.3fs",
+                        r["site"], r["count"], r["total_s"], r["max_s"])
@@ -0,0 +1,293 @@
+# nija_metrics.py
+"""
+NIJA: in-process metrics (Prometheus text exposition format)
+Counters, gauges and histograms with optional labels, rendered by
+render_metrics() for a /metrics endpoint. No prometheus_client dependency.
+
+Hot-path updates only take a per-series lock (uncontended, ~tens of ns);
+the registry lock is only taken when a new label combination is first seen
+or when /metrics is scraped.
+
+exchange_call() retries rate-limited (HTTP 429) calls after a backoff, and
+time_waits() wraps a client-side limiter (ccxt's throttle); both record the
+time spent waiting under RATE_LIMIT_WAIT.
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+# ---------- CONFIG ----------
+# Default histogram buckets (seconds) - tuned for exchange REST calls / webhooks
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "3"))
+RATE_LIMIT_BACKOFF_SEC = 0.5        # doubled per retry unless the response sends Retry-After
+RATE_LIMIT_MAX_WAIT_SEC = 10.0
+# ----------------------------
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _fmt_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _fmt_value(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v))
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self._value += amount
+
+    def get(self):
+        return self._value
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        # plain attribute store is atomic under the GIL
+        self._value = float(value)
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def get(self):
+        return self._value
+
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_counts", "_sum", "_count", "_lock")
+
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self._counts = [0] * len(buckets)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        # find the first bucket >= value; bucket lists are short so a scan is fine
+        idx = len(self._buckets)
+        for i, bound in enumerate(self._buckets):
+            if value <= bound:
+                idx = i
+                break
+        with self._lock:
+            if idx < len(self._counts):
+                self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, doc, labelnames=()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._children_lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+        with _registry_lock:
+            _registry.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwvalues):
+        if kwvalues:
+            values = tuple(kwvalues[n] for n in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._children_lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _items(self):
+        with self._children_lock:
+            return list(self._children.items())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+    def render(self):
+        return ["%s%s %s" % (self.name, _fmt_labels(self.labelnames, k), _fmt_value(c.get()))
+                for k, c in self._items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default.set(value)
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount=1.0):
+        self._default.dec(amount)
+
+    def render(self):
+        return ["%s%s %s" % (self.name, _fmt_labels(self.labelnames, k), _fmt_value(c.get()))
+                for k, c in self._items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, doc, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def render(self):
+        lines = []
+        for k, c in self._items():
+            counts, total, n = c.snapshot()
+            cumulative = 0
+            for bound, cnt in zip(self.buckets, counts):
+                cumulative += cnt
+                lines.append("%s_bucket%s %d" % (self.name, _fmt_labels(self.labelnames, k, ("le", _fmt_value(bound))), cumulative))
+            lines.append("%s_bucket%s %d" % (self.name, _fmt_labels(self.labelnames, k, ("le", "+Inf")), n))
+            lines.append("%s_sum%s %s" % (self.name, _fmt_labels(self.labelnames, k), _fmt_value(total)))
+            lines.append("%s_count%s %d" % (self.name, _fmt_labels(self.labelnames, k), n))
+        return lines
+
+
+def render_metrics():
+    """Return all registered metrics in Prometheus text format (version 0.0.4)."""
+    with _registry_lock:
+        metrics = list(_registry)
+    out = []
+    for m in metrics:
+        out.append("# HELP %s %s" % (m.name, m.doc))
+        out.append("# TYPE %s %s" % (m.name, m.kind))
+        out.extend(m.render())
+    return "\n".join(out) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ---------- Shared NIJA metrics ----------
+ORDERS_SENT = Counter("nija_orders_sent_total", "Orders submitted to the exchange", ["source"])
+ORDERS_BLOCKED = Counter("nija_orders_blocked_total", "Orders refused by the risk gate", ["reason"])
+ORDERS_DRY_RUN = Counter("nija_orders_dry_run_total", "Orders short-circuited by DRY_RUN", ["source"])
+ORDER_ERRORS = Counter("nija_order_errors_total", "Order submissions that raised", ["source"])
+WEBHOOK_LATENCY = Histogram("nija_webhook_latency_seconds", "Webhook handler latency", ["route"])
+EXCHANGE_LATENCY = Histogram("nija_exchange_call_latency_seconds", "Exchange API call latency", ["endpoint"])
+RATE_LIMIT_WAIT = Histogram("nija_rate_limit_wait_seconds", "Time spent waiting on rate limits (429 backoff, client throttling)", ["endpoint"])
+QUEUE_DEPTH = Gauge("nija_queue_depth", "Items waiting in internal queues", ["queue"])
+LOOP_LAG = Gauge("nija_event_loop_lag_seconds", "Most recent asyncio scheduling lag")
+
+
+def rate_limit_delay(exc, attempt):
+    """Seconds to wait before retry `attempt` of a call that raised exc, or None if exc is not a rate limit."""
+    response = getattr(exc, "response", None)
+    status = (getattr(response, "status_code", None) or getattr(exc, "http_status", None)
+              or getattr(exc, "status_code", None))
+    if status != 429 and not any(c.__name__ in ("RateLimitExceeded", "DDoSProtection") for c in type(exc).__mro__):
+        return None
+    try:
+        delay = float((getattr(response, "headers", None) or {}).get("Retry-After"))
+    except (TypeError, ValueError):
+        delay = RATE_LIMIT_BACKOFF_SEC * 2 ** attempt
+    return min(max(delay, 0.0), RATE_LIMIT_MAX_WAIT_SEC)
+
+
+def exchange_call(endpoint, fn, *args, **kwargs):
+    """
+    Call fn(*args, **kwargs) and record its latency under EXCHANGE_LATENCY{endpoint}.
+    A rate-limited call is retried up to RATE_LIMIT_RETRIES times; each backoff is
+    recorded under RATE_LIMIT_WAIT{endpoint}.
+    """
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        try:
+            with EXCHANGE_LATENCY.labels(endpoint).time():
+                return fn(*args, **kwargs)
+        except Exception as e:
+            delay = rate_limit_delay(e, attempt) if attempt < RATE_LIMIT_RETRIES else None
+            if delay is None:
+                raise
+        with RATE_LIMIT_WAIT.labels(endpoint).time():
+            time.sleep(delay)
+
+
+def time_waits(obj, attr, endpoint):
+    """Wrap the blocking limiter obj.<attr> (e.g. ccxt's throttle) so its waits land in RATE_LIMIT_WAIT{endpoint}."""
+    fn = getattr(obj, attr, None)
+    if fn is None or getattr(fn, "rate_limit_timed", False):
+        return
+    child = RATE_LIMIT_WAIT.labels(endpoint)
+
+    def timed(*args, **kwargs):
+        with child.time():
+            return fn(*args, **kwargs)
+
+    timed.rate_limit_timed = True
+    setattr(obj, attr, timed)
+
@@ -0,0 +1,152 @@
+# nija_order_coalescer.py
+"""
+NIJA: order coalescing for bursts of same-symbol signals
+Order intents for one product that arrive within `window` seconds are
+held, netted (buys minus sells) and sent as a single market order. If the
+intents cancel out nothing is sent at all.
+
+Every originating intent gets its own result, so callers can still log and
+track the order they asked for:
+    {"status": "sent",   "fill_ratio": 0.6, "order": merged, "result": ...}
+    {"status": "netted", "fill_ratio": 0.0, "order": merged or None}
+    {"status": "error",  "error": "..."}
+fill_ratio is the share of the intent's size that went out in the merged
+order (intents on the losing side of the net are fully "netted").
+
+Coinbase Advanced Trade has no batch create-order endpoint, so products
+that flush together are submitted concurrently instead of in one request.
+
+Usage (inside the bot's event loop):
+    coalescer = OrderCoalescer(lambda p: client.place_market_order(p))
+    fut = coalescer.submit(payload)        # asyncio.Future
+    fut.add_done_callback(...)            # or: result = await fut
+From another thread (e.g. a uvicorn webhook thread):
+    result = await asyncio.wrap_future(coalescer.submit_threadsafe(payload))
+"""
+
+import os
+import uuid
+import asyncio
+
+from nija_metrics import QUEUE_DEPTH
+
+# ---------- CONFIG ----------
+COALESCE_WINDOW_SEC = float(os.getenv("ORDER_COALESCE_WINDOW_SEC", "1.5"))
+SIZE_PRECISION = 8
+# ----------------------------
+
+
+def _signed_size(payload):
+    size = float(payload["size"])
+    return size if payload["side"] == "buy" else -size
+
+
+class OrderCoalescer:
+    def __init__(self, submit_fn, window=COALESCE_WINDOW_SEC, size_fn=None):
+        """size_fn(product_id, size) -> size string for the merged order (e.g. floored to the product's increment)."""
+        self.submit_fn = submit_fn
+        self.window = window
+        self.size_fn = size_fn
+        self.loop = None
+        self._pending = {}   # product_id -> [(payload, future), ...]
+        self._timers = {}    # product_id -> TimerHandle
+        self._flushing = {}  # product_id -> timer-started flush task still running
+        self._depth = QUEUE_DEPTH.labels("order_coalescer")
+
+    def submit(self, payload):
+        """Queue an order intent; returns an asyncio.Future resolved with this intent's result."""
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        fut = self.loop.create_future()
+        pid = payload["product_id"]
+        self._pending.setdefault(pid, []).append((payload, fut))
+        self._depth.inc()
+        if pid not in self._timers:
+            self._timers[pid] = self.loop.call_later(self.window, self._on_timer, pid)
+        return fut
+
+    async def _submit_async(self, payload):
+        return await self.submit(payload)
+
+    def submit_threadsafe(self, payload):
+        """submit() from a thread that is not running the coalescer's loop; returns a concurrent.futures.Future."""
+        if self.loop is None:
+            raise RuntimeError("OrderCoalescer has not been used from its event loop yet; call bind() first")
+        return asyncio.run_coroutine_threadsafe(self._submit_async(payload), self.loop)
+
+    def bind(self):
+        """Bind to the running loop up front (needed before submit_threadsafe)."""
+        self.loop = asyncio.get_running_loop()
+
+    def _on_timer(self, pid):
+        self._timers.pop(pid, None)
+        task = self.loop.create_task(self._flush(pid))
+        self._flushing[pid] = task
+        task.add_done_callback(lambda t, pid=pid: self._flushing.pop(pid, None) if self._flushing.get(pid) is t else None)
+
+    async def flush(self, pid):
+        """Send what is pending for one product now and wait for a flush of it already under way."""
+        handle = self._timers.pop(pid, None)
+        if handle is not None:
+            handle.cancel()
+        running = self._flushing.get(pid)
+        if running is not None:
+            await running
+        await self._flush(pid)
+        await asyncio.sleep(0)     # let the intents' done-callbacks run
+
+    async def _flush(self, pid):
+        intents = self._pending.pop(pid, [])
+        if not intents:
+            return
+        self._depth.dec(len(intents))
+
+        net = round(sum(_signed_size(p) for p, _ in intents), SIZE_PRECISION)
+        attribution = [{
+            "idempotency_key": p.get("idempotency_key"),
+            "side": p["side"],
+            "size": p["size"],
+            "signal_type": p.get("meta", {}).get("signal_type"),
+        } for p, _ in intents]
+
+        if net == 0:
+            for _, fut in intents:
+                if not fut.done():
+                    fut.set_result({"status": "netted", "fill_ratio": 0.0, "order": None, "attribution": attribution})
+            return
+
+        side = "buy" if net > 0 else "sell"
+        same_side = [(p, f) for p, f in intents if p["side"] == side]
+        same_side_total = sum(float(p["size"]) for p, _ in same_side)
+        ratio = abs(net) / same_side_total if same_side_total else 0.0
+
+        base = same_side[-1][0]  # newest intent on the winning side carries price/meta
+        merged = dict(base)
+        merged["side"] = side
+        merged["size"] = self.size_fn(pid, abs(net)) if self.size_fn else str(abs(net))
+        merged["idempotency_key"] = str(uuid.uuid4())
+        merged["meta"] = dict(base.get("meta", {}), coalesced=attribution)
+
+        try:
+            result = await asyncio.to_thread(self.submit_fn, merged)
+        except Exception as e:
+            for _, fut in intents:
+                if not fut.done():
+                    fut.set_result({"status": "error", "error": str(e), "order": merged, "attribution": attribution})
+            return
+
+        for p, fut in intents:
+            if fut.done():
+                continue
+            if p["side"] == side:
+                fut.set_result({"status": "sent", "fill_ratio": ratio, "order": merged, "result": result,
+                                "attribution": attribution})
+            else:
+                fut.set_result({"status": "netted", "fill_ratio": 0.0, "order": merged, "attribution": attribution})
+
+    async def flush_all(self):
+        """Send everything that is pending right now (e.g. on shutdown)."""
+        for pid, handle in list(self._timers.items()):
+            handle.cancel()
+            self._timers.pop(pid, None)
+        await asyncio.gather(*(self._flush(pid) for pid in list(self._pending)))
@@ -0,0 +1,278 @@
+# nija_order_tracker.py
+"""
+NIJA: order lifecycle tracking + fill reconciliation
+Every submitted order is indexed by client order id (our idempotency_key)
+and moved through a small state machine:
+
+    NEW -> OPEN -> PARTIALLY_FILLED -> FILLED
+       \\-> REJECTED      \\-> CANCELLED
+       \\-> UNKNOWN (no exchange ack after STALE_ORDER_SEC; still tracked)
+
+An order whose create response carried no order id (the legacy
+coinbase_advanced_py client returns none) is looked up by client order id
+in the unfiltered list_orders result. If it never shows up it becomes
+UNKNOWN, not REJECTED: it may well have filled, so callers must keep the
+position. It stays in flight and resolves if it appears later.
+
+Updates come from either source (both can be used at once):
+  - the Advanced Trade user WebSocket channel: feed raw messages to
+    tracker.handle_ws_message(msg)
+  - batched polling: tracker.poll_forever(client) issues ONE
+    list_orders(order_ids=[...]) call per interval for all in-flight orders
+
+Listeners registered with tracker.on_update(client_order_id, fn) receive
+the TrackedOrder whenever filled size / status changes, so callers can
+replace the assumed tick-price entry with the real average fill.
+"""
+
+import time
+import json
+import asyncio
+import logging
+import threading
+from collections import deque
+
+from nija_metrics import Counter, QUEUE_DEPTH
+
+logger = logging.getLogger("nija")
+
+# ---------- CONFIG ----------
+POLL_INTERVAL_SEC = 2.0
+POLL_BATCH_SIZE = 50          # order ids per list_orders call
+STALE_ORDER_SEC = 300         # give up polling an order that never shows up
+COMPLETED_HISTORY = 500
+# ----------------------------
+
+NEW = "NEW"
+OPEN = "OPEN"
+PARTIALLY_FILLED = "PARTIALLY_FILLED"
+FILLED = "FILLED"
+CANCELLED = "CANCELLED"
+REJECTED = "REJECTED"
+UNKNOWN = "UNKNOWN"
+TERMINAL = (FILLED, CANCELLED, REJECTED)
+
+# exchange status -> our state (Advanced Trade REST + WS user channel spellings)
+_STATUS_MAP = {
+    "PENDING": NEW,
+    "QUEUED": NEW,
+    "OPEN": OPEN,
+    "FILLED": FILLED,
+    "DONE": FILLED,
+    "CANCELLED": CANCELLED,
+    "CANCEL_QUEUED": OPEN,
+    "EXPIRED": CANCELLED,
+    "FAILED": REJECTED,
+    "REJECTED": REJECTED,
+    "CLOSED": FILLED,          # ccxt spellings
+    "CANCELED": CANCELLED,
+    "UNKNOWN": UNKNOWN,
+    "UNKNOWN_ORDER_STATUS": UNKNOWN,
+}
+
+
+def normalize_status(status, default=NEW):
+    """Exchange/ccxt order status string -> NEW/OPEN/FILLED/CANCELLED/REJECTED."""
+    return _STATUS_MAP.get(str(status or "").upper(), default)
+
+ORDER_TRANSITIONS = Counter("nija_order_transitions_total", "Order state transitions", ["state"])
+
+
+def _num(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_dict(resp):
+    if hasattr(resp, "to_dict"):
+        return resp.to_dict()
+    return resp if isinstance(resp, dict) else {}
+
+
+class TrackedOrder:
+    __slots__ = ("client_order_id", "order_id", "product_id", "side", "size", "filled_size",
+                 "avg_fill_price", "status", "created_ts", "updated_ts", "reason")
+
+    def __init__(self, client_order_id, product_id, side, size):
+        self.client_order_id = client_order_id
+        self.order_id = None
+        self.product_id = product_id
+        self.side = side
+        self.size = size
+        self.filled_size = 0.0
+        self.avg_fill_price = None
+        self.status = NEW
+        self.created_ts = time.time()
+        self.updated_ts = self.created_ts
+        self.reason = None
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class OrderTracker:
+    def __init__(self):
+        self.inflight = {}           # client_order_id -> TrackedOrder
+        self._by_order_id = {}       # exchange order_id -> client_order_id
+        self.completed = deque(maxlen=COMPLETED_HISTORY)
+        self._listeners = {}         # client_order_id -> [fn, ...]
+        self._lock = threading.Lock()
+        self.loop = None
+        self._depth = QUEUE_DEPTH.labels("inflight_orders")
+
+    def bind(self):
+        """Deliver listener callbacks on the running loop (safe when updates arrive from threads)."""
+        self.loop = asyncio.get_running_loop()
+
+    # -------------------
+    # REGISTRATION
+    # -------------------
+    def track(self, payload):
+        """Index an order payload before it is sent; returns its TrackedOrder."""
+        cid = payload["idempotency_key"]
+        with self._lock:
+            order = self.inflight.get(cid)
+            if order is None:
+                order = TrackedOrder(cid, payload["product_id"], payload["side"], float(payload["size"]))
+                self.inflight[cid] = order
+                self._depth.inc()
+        return order
+
+    def on_submit_response(self, client_order_id, resp=None, error=None):
+        """Record the synchronous create-order response (order id, or rejection)."""
+        data = _as_dict(resp)
+        success = data.get("success", error is None)
+        body = data.get("success_response") or data
+        update = {"client_order_id": client_order_id, "order_id": body.get("order_id") or data.get("id")}
+        if error is not None or success is False:
+            update["status"] = "REJECTED"
+            update["reason"] = str(error) if error is not None else str(data.get("error_response") or data.get("failure_reason"))
+        else:
+            update["status"] = "OPEN"
+        self.apply_update(update)
+
+    def on_update(self, client_order_id, fn):
+        """fn(order) on every change; called immediately if the order already has fills or is done."""
+        with self._lock:
+            order = self.inflight.get(client_order_id)
+            if order is not None:
+                self._listeners.setdefault(client_order_id, []).append(fn)
+        if order is None:
+            for done in self.completed:
+                if done.client_order_id == client_order_id:
+                    self._emit(fn, done)
+                    break
+        elif order.filled_size > 0:
+            self._emit(fn, order)
+
+    # -------------------
+    # STATE MACHINE
+    # -------------------
+    def apply_update(self, u):
+        """
+        Apply one normalized or raw exchange order update. Recognized keys:
+        client_order_id, order_id, status, filled_size / cumulative_quantity,
+        average_filled_price / avg_price, reject_reason / reason.
+        """
+        with self._lock:
+            cid = u.get("client_order_id")
+            if not cid and u.get("order_id"):
+                cid = self._by_order_id.get(u["order_id"])
+            order = self.inflight.get(cid)
+            if order is None:
+                return None
+            if u.get("order_id") and not order.order_id:
+                order.order_id = u["order_id"]
+                self._by_order_id[order.order_id] = cid
+
+            filled = _num(u.get("filled_size", u.get("cumulative_quantity")))
+            avg = _num(u.get("average_filled_price", u.get("avg_price")))
+            status = normalize_status(u.get("status"), order.status)
+            changed = False
+
+            if filled is not None and filled > order.filled_size:
+                order.filled_size = filled
+                changed = True
+            if avg:
+                changed = changed or avg != order.avg_fill_price
+                order.avg_fill_price = avg
+            if status == OPEN and 0 < order.filled_size < order.size:
+                status = PARTIALLY_FILLED
+            if status != order.status:
+                order.status = status
+                order.reason = u.get("reject_reason") or u.get("reason") or order.reason
+                ORDER_TRANSITIONS.labels(status).inc()
+                changed = True
+            if not changed:
+                return order
+            order.updated_ts = time.time()
+
+            listeners = list(self._listeners.get(cid, ()))
+            if order.status in TERMINAL:
+                self.inflight.pop(cid, None)
+                self._listeners.pop(cid, None)
+                self._by_order_id.pop(order.order_id, None)
+                self.completed.append(order)
+                self._depth.dec()
+        for fn in listeners:
+            self._emit(fn, order)
+        return order
+
+    def _emit(self, fn, order):
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(fn, order)
+        else:
+            fn(order)
+
+    # -------------------
+    # SOURCES
+    # -------------------
+    def handle_ws_message(self, msg):
+        """Feed a raw user-channel WebSocket message (str or dict)."""
+        if isinstance(msg, (str, bytes)):
+            msg = json.loads(msg)
+        if msg.get("channel") != "user":
+            return
+        for event in msg.get("events", []):
+            for o in event.get("orders", []):
+                self.apply_update(o)
+
+    def poll_once(self, client):
+        """One batched list_orders call per POLL_BATCH_SIZE in-flight orders (blocking)."""
+        now = time.time()
+        with self._lock:
+            ids = [o.order_id for o in self.inflight.values() if o.order_id]
+            unacked = [cid for cid, o in self.inflight.items() if not o.order_id]
+        if unacked:
+            # no exchange order id: match by client_order_id in the recent (unfiltered) order list
+            try:
+                for o in _as_dict(client.list_orders()).get("orders", []):
+                    self.apply_update(o)
+            except Exception as e:
+                logger.warning("order lookup by client id failed: %s", e)
+            with self._lock:
+                stale = [cid for cid in unacked if cid in self.inflight and not self.inflight[cid].order_id
+                         and self.inflight[cid].status != UNKNOWN
+                         and now - self.inflight[cid].created_ts > STALE_ORDER_SEC]
+            for cid in stale:
+                self.apply_update({"client_order_id": cid, "status": UNKNOWN, "reason": "no exchange ack"})
+        for i in range(0, len(ids), POLL_BATCH_SIZE):
+            batch = ids[i:i + POLL_BATCH_SIZE]
+            try:
+                resp = client.list_orders(order_ids=batch)
+            except TypeError:
+                resp = client.list_orders()   # older clients: no id filter
+            for o in _as_dict(resp).get("orders", []):
+                self.apply_update(o)
+
+    async def poll_forever(self, client, interval=POLL_INTERVAL_SEC):
+        self.bind()
+        while True:
+            if self.inflight:
+                try:
+                    await asyncio.to_thread(self.poll_once, client)
+                except Exception as e:
+                    logger.warning("order poll failed: %s", e)
+            await asyncio.sleep(interval)
@@ -0,0 +1,205 @@
+# nija_portfolio.py
+"""
+NIJA: bulk account / balance snapshot service
+Fetches ALL accounts with paginated bulk get_accounts() calls, normalizes
+every client shape ONCE into {currency: Balance}, and serves all consumers
+(bot balance checks, get_usd_equity, the balance poller) from the same
+snapshot until it is older than `ttl` seconds. Concurrent refreshes are
+coalesced into one.
+
+Non-USD holdings are valued in USD with prices fetched in one bulk
+get_best_bid_ask() call and cached for PRICE_TTL_SEC.
+
+Client shapes handled:
+  - coinbase.rest.RESTClient: {"currency", "available_balance": {"value"}, "hold": {"value"}}
+  - coinbase.wallet / legacy: {"currency": "USD" | {"code"}, "balance": {"amount"}}
+  - ccxt-style:               {"asset"/"code", "available"/"free", "total"}
+"""
+
+import time
+import threading
+
+from nija_metrics import exchange_call
+
+# ---------- CONFIG ----------
+SNAPSHOT_TTL_SEC = 5
+PRICE_TTL_SEC = 30
+PAGE_LIMIT = 250
+USD_CURRENCIES = ("USD", "USDC", "USD-C")
+# ----------------------------
+
+
+def _as_dict(obj):
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    return obj
+
+
+def _amount(v):
+    if isinstance(v, dict):
+        v = v.get("value", v.get("amount"))
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Balance:
+    __slots__ = ("currency", "available", "hold")
+
+    def __init__(self, currency, available, hold=0.0):
+        self.currency = currency
+        self.available = available
+        self.hold = hold
+
+    @property
+    def total(self):
+        return self.available + self.hold
+
+    def to_dict(self):
+        return {"currency": self.currency, "available": self.available, "hold": self.hold}
+
+
+def normalize_account(a):
+    """One raw account (any supported client shape) -> Balance, or None."""
+    a = _as_dict(a)
+    if not isinstance(a, dict):
+        return None
+    cur = a.get("currency") or a.get("asset") or a.get("code")
+    if isinstance(cur, dict):
+        cur = cur.get("code")
+    if not cur:
+        return None
+    if "available_balance" in a:
+        available = _amount(a["available_balance"])
+    elif "available" in a:
+        available = _amount(a["available"])
+    elif "free" in a:
+        available = _amount(a["free"])
+    elif "balance" in a:
+        available = _amount(a["balance"])
+    else:
+        available = _amount(a.get("total"))
+    hold = _amount(a.get("hold")) if "hold" in a else 0.0
+    return Balance(cur.upper(), available, hold)
+
+
+def fetch_all_accounts(client):
+    """Blocking: every account via paginated bulk calls (falls back to a single unpaginated call)."""
+    out = []
+    cursor = None
+    while True:
+        try:
+            kwargs = {"limit": PAGE_LIMIT}
+            if cursor:
+                kwargs["cursor"] = cursor
+            resp = exchange_call("get_accounts", client.get_accounts, **kwargs)
+        except TypeError:
+            resp = exchange_call("get_accounts", client.get_accounts)   # client without pagination args
+            cursor = None
+        data = _as_dict(resp)
+        if isinstance(data, dict):
+            out.extend(data.get("accounts", data.get("data", [])))
+            cursor = data.get("cursor") if data.get("has_next") else None
+        else:
+            out.extend(data)
+            cursor = None
+        if not cursor:
+            return out
+
+
+class PortfolioSnapshot:
+    def __init__(self, balances, prices, taken_at):
+        self.balances = balances     # currency -> Balance
+        self.prices = prices         # currency -> USD price
+        self.taken_at = taken_at
+
+    def available(self, currency="USD"):
+        b = self.balances.get(currency)
+        return b.available if b else 0.0
+
+    def usd_value(self, currency, field="available"):
+        b = self.balances.get(currency)
+        if b is None:
+            return 0.0
+        qty = getattr(b, field)
+        if currency in USD_CURRENCIES:
+            return qty
+        return qty * self.prices.get(currency, 0.0)
+
+    def usd_equity(self, field="available"):
+        """All holdings valued in USD (assets without a price are counted as 0)."""
+        return sum(self.usd_value(c, field) for c in self.balances)
+
+    def to_dict(self):
+        return {
+            "taken_at": self.taken_at,
+            "usd_equity": round(self.usd_equity("total"), 2),
+            "balances": {c: dict(b.to_dict(), usd=round(self.usd_value(c, "total"), 2))
+                         for c, b in self.balances.items() if b.total},
+        }
+
+
+class PortfolioService:
+    def __init__(self, client, ttl=SNAPSHOT_TTL_SEC):
+        self.client = client
+        self.ttl = ttl
+        self._snapshot = None
+        self._prices = {}            # currency -> (price, fetched_at)
+        self._lock = threading.Lock()
+
+    def _fetch_prices(self, currencies):
+        now = time.time()
+        need = [c for c in currencies
+                if c not in USD_CURRENCIES and (c not in self._prices or now - self._prices[c][1] > PRICE_TTL_SEC)]
+        if need and hasattr(self.client, "get_best_bid_ask"):
+            try:
+                resp = _as_dict(exchange_call("get_best_bid_ask", self.client.get_best_bid_ask,
+                                              product_ids=["%s-USD" % c for c in need]))
+                for book in resp.get("pricebooks", []):
+                    bid = _amount((book.get("bids") or [{}])[0].get("price"))
+                    ask = _amount((book.get("asks") or [{}])[0].get("price"))
+                    px = (bid + ask) / 2 if bid and ask else bid or ask
+                    if px:
+                        self._prices[book["product_id"].split("-")[0]] = (px, now)
+            except Exception as e:
+                print("⚠️ Bulk price fetch failed:", e)
+        return {c: p for c, (p, _) in self._prices.items()}
+
+    def refresh(self):
+        balances = {}
+        for raw in fetch_all_accounts(self.client):
+            b = normalize_account(raw)
+            if b is None:
+                continue
+            if b.currency in balances:   # multiple wallets per currency -> sum
+                prev = balances[b.currency]
+                b = Balance(b.currency, prev.available + b.available, prev.hold + b.hold)
+            balances[b.currency] = b
+        held = [c for c, b in balances.items() if b.total]
+        snap = PortfolioSnapshot(balances, self._fetch_prices(held), time.time())
+        self._snapshot = snap
+        return snap
+
+    def snapshot(self, max_age=None):
+        """Latest snapshot no older than max_age (default ttl); refreshes at most once for concurrent callers."""
+        max_age = self.ttl if max_age is None else max_age
+        snap = self._snapshot
+        if snap is not None and time.time() - snap.taken_at <= max_age:
+            return snap
+        with self._lock:
+            snap = self._snapshot
+            if snap is not None and time.time() - snap.taken_at <= max_age:
+                return snap
+            return self.refresh()
+
+
+_services = {}
+
+
+def service_for(client):
+    """Shared PortfolioService per client object, so every consumer reads the same snapshot."""
+    svc = _services.get(id(client))
+    if svc is None or svc.client is not client:
+        svc = _services[id(client)] = PortfolioService(client)
+    return svc
@@ -0,0 +1,120 @@
+# nija_price_cache.py
+"""
+NIJA: shared last-price cache
+One cache per client holds the latest price per symbol. Whatever market
+data source is active feeds it (the bot's polling loop via refresh()/aget(),
+a websocket handler via put()), and every other consumer (webhooks, sizing
+helpers) reads it with its own staleness limit:
+
+    prices = price_cache_for(client)
+    price = prices.get("BTC-USD", max_age=2)      # cached if <= 2s old, else fetched
+
+Misses are coalesced: concurrent readers of the same symbol (from any
+thread or from the event loop) share ONE in-flight fetch instead of each
+making a REST round trip.
+"""
+
+import time
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from nija_metrics import Counter
+from nija_exchange import exchange_for
+
+# ---------- CONFIG ----------
+PRICE_MAX_AGE_SEC = 2.0
+# ----------------------------
+
+PRICE_CACHE_READS = Counter("nija_price_cache_reads_total", "Last-price cache reads", ["result"])
+
+
+def fetch_last_price(client, symbol):
+    """Blocking: last traded price for symbol through the client's nija_exchange backend."""
+    return exchange_for(client).backend.ticker(symbol).price
+
+
+class PriceCache:
+    def __init__(self, fetch, max_age=PRICE_MAX_AGE_SEC):
+        """fetch(symbol) -> float, blocking."""
+        self.fetch = fetch
+        self.max_age = max_age
+        self._prices = {}      # symbol -> (price, ts)
+        self._inflight = {}    # symbol -> concurrent.futures.Future
+        self._lock = threading.Lock()
+
+    def put(self, symbol, price, ts=None):
+        """Feed a price from a market-data source (ticker poll, websocket, fill)."""
+        self._prices[symbol] = (float(price), ts if ts is not None else time.time())
+
+    def peek(self, symbol, max_age=None):
+        """Cached price no older than max_age, or None. Never fetches."""
+        max_age = self.max_age if max_age is None else max_age
+        entry = self._prices.get(symbol)
+        if entry is not None and time.time() - entry[1] <= max_age:
+            return entry[0]
+        return None
+
+    def age(self, symbol):
+        entry = self._prices.get(symbol)
+        return time.time() - entry[1] if entry is not None else None
+
+    def _claim(self, symbol):
+        """(future, leader): the in-flight fetch for symbol, creating it if this caller is first."""
+        with self._lock:
+            fut = self._inflight.get(symbol)
+            if fut is not None:
+                return fut, False
+            fut = self._inflight[symbol] = Future()
+            return fut, True
+
+    def _run(self, symbol, fut):
+        try:
+            price = float(self.fetch(symbol))
+            self.put(symbol, price)
+            fut.set_result(price)
+        except Exception as e:
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(symbol, None)
+
+    def get(self, symbol, max_age=None):
+        """Blocking read: cached price if fresh enough, otherwise one (shared) fetch."""
+        price = self.peek(symbol, max_age)
+        if price is not None:
+            PRICE_CACHE_READS.labels("hit").inc()
+            return price
+        fut, leader = self._claim(symbol)
+        PRICE_CACHE_READS.labels("miss" if leader else "coalesced").inc()
+        if leader:
+            self._run(symbol, fut)
+        return fut.result()
+
+    def refresh(self, symbol):
+        """Force a fetch (shared with any concurrent miss) and return the new price."""
+        return self.get(symbol, max_age=-1)
+
+    async def aget(self, symbol, max_age=None):
+        """get() for the event loop: the fetch runs in a worker thread."""
+        price = self.peek(symbol, max_age)
+        if price is not None:
+            PRICE_CACHE_READS.labels("hit").inc()
+            return price
+        fut, leader = self._claim(symbol)
+        PRICE_CACHE_READS.labels("miss" if leader else "coalesced").inc()
+        if leader:
+            await asyncio.to_thread(self._run, symbol, fut)
+        return await asyncio.wrap_future(fut)
+
+
+_caches = {}
+
+
+def price_cache_for(client, fetch=None):
+    """Shared PriceCache per client object; `fetch` defaults to fetch_last_price(client, symbol)."""
+    cache = _caches.get(id(client))
+    if cache is None or cache.client is not client:
+        cache = _caches[id(client)] = PriceCache(fetch or (lambda symbol: fetch_last_price(client, symbol)))
+        cache.client = client
+    return cache
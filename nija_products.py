@@ -0,0 +1,226 @@
+# nija_products.py
+"""
+NIJA: product catalog cache (increments, size limits, trading status)
+Every product is loaded with ONE bulk get_products() call, normalized once
+into a Product and indexed by product_id, so sizing code gets O(1) lookups
+instead of a hand-written precision table. The catalog is reloaded in a
+background thread once it is older than `ttl`; readers keep using the
+previous index until the new one is swapped in.
+
+Sizes are floored (never rounded up) to the product's base_increment /
+quote_increment with Decimal arithmetic, and check() reports orders the
+exchange would reject (below min size, above max size, product not
+tradable) before they are sent.
+
+Usage:
+    products = catalog_for(client)
+    size = products.base_size("BTC-USD", usd / price)     # "0.00012345"
+    reason = products.check("BTC-USD", base_size=size)    # None if OK
+"""
+
+import time
+import threading
+from decimal import Decimal, ROUND_DOWN, InvalidOperation
+
+from nija_metrics import exchange_call
+
+# ---------- CONFIG ----------
+PRODUCT_REFRESH_SEC = 3600
+LOAD_RETRY_SEC = 60
+FALLBACK_BASE_INCREMENT = Decimal("0.00000001")   # unknown products: previous 8-decimal behaviour
+FALLBACK_QUOTE_INCREMENT = Decimal("0.01")
+# ----------------------------
+
+
+def _as_dict(obj):
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    return obj
+
+
+def _dec(v):
+    if v in (None, ""):
+        return None
+    try:
+        d = Decimal(str(v))
+    except InvalidOperation:
+        return None
+    return d if d > 0 else None
+
+
+def floor_to(value, increment):
+    """Largest multiple of `increment` <= value, as a Decimal with the increment's exponent."""
+    value = Decimal(str(value))
+    if value <= 0:
+        return Decimal(0).quantize(increment)
+    return ((value // increment) * increment).quantize(increment, rounding=ROUND_DOWN)
+
+
+class Product:
+    __slots__ = ("product_id", "base_increment", "quote_increment", "base_min_size", "base_max_size",
+                 "quote_min_size", "quote_max_size", "status", "trading_disabled")
+
+    def __init__(self, product_id, base_increment=None, quote_increment=None, base_min_size=None,
+                 base_max_size=None, quote_min_size=None, quote_max_size=None, status="online",
+                 trading_disabled=False):
+        self.product_id = product_id
+        self.base_increment = base_increment or FALLBACK_BASE_INCREMENT
+        self.quote_increment = quote_increment or FALLBACK_QUOTE_INCREMENT
+        self.base_min_size = base_min_size
+        self.base_max_size = base_max_size
+        self.quote_min_size = quote_min_size
+        self.quote_max_size = quote_max_size
+        self.status = status
+        self.trading_disabled = trading_disabled
+
+    @property
+    def tradable(self):
+        return self.status == "online" and not self.trading_disabled
+
+    def floor_base(self, size):
+        return floor_to(size, self.base_increment)
+
+    def floor_quote(self, usd):
+        return floor_to(usd, self.quote_increment)
+
+    def check(self, base_size=None, quote_size=None):
+        """Reason the exchange would reject an order of this size, or None."""
+        if not self.tradable:
+            return "%s not tradable (status=%s)" % (self.product_id, self.status)
+        if base_size is not None:
+            size = Decimal(str(base_size))
+            if self.base_min_size and size < self.base_min_size:
+                return "base size %s below minimum %s" % (size, self.base_min_size)
+            if self.base_max_size and size > self.base_max_size:
+                return "base size %s above maximum %s" % (size, self.base_max_size)
+        if quote_size is not None:
+            usd = Decimal(str(quote_size))
+            if self.quote_min_size and usd < self.quote_min_size:
+                return "quote size %s below minimum %s" % (usd, self.quote_min_size)
+            if self.quote_max_size and usd > self.quote_max_size:
+                return "quote size %s above maximum %s" % (usd, self.quote_max_size)
+        return None
+
+    def to_dict(self):
+        out = {}
+        for k in self.__slots__:
+            v = getattr(self, k)
+            out[k] = str(v) if isinstance(v, Decimal) else v
+        return out
+
+
+def normalize_product(p):
+    """One raw product (Advanced Trade or legacy Exchange shape) -> Product, or None."""
+    p = _as_dict(p)
+    if not isinstance(p, dict):
+        return None
+    pid = p.get("product_id") or p.get("id")
+    if not pid:
+        return None
+    disabled = bool(p.get("trading_disabled") or p.get("is_disabled") or p.get("cancel_only"))
+    return Product(
+        pid,
+        base_increment=_dec(p.get("base_increment")),
+        quote_increment=_dec(p.get("quote_increment")),
+        base_min_size=_dec(p.get("base_min_size")),
+        base_max_size=_dec(p.get("base_max_size")),
+        quote_min_size=_dec(p.get("quote_min_size") or p.get("min_market_funds")),
+        quote_max_size=_dec(p.get("quote_max_size") or p.get("max_market_funds")),
+        status=str(p.get("status") or "online").lower(),
+        trading_disabled=disabled,
+    )
+
+
+def fetch_all_products(client):
+    """Blocking: every product in one bulk call (falls back to an argument-less call)."""
+    try:
+        resp = exchange_call("get_products", client.get_products, get_all_products=True)
+    except TypeError:
+        resp = exchange_call("get_products", client.get_products)   # client without the flag
+    data = _as_dict(resp)
+    if isinstance(data, dict):
+        data = data.get("products", data.get("data", []))
+    return data or []
+
+
+class ProductCatalog:
+    def __init__(self, client, ttl=PRODUCT_REFRESH_SEC):
+        self.client = client
+        self.ttl = ttl
+        self._products = None        # product_id -> Product
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def refresh(self):
+        index = {}
+        for raw in fetch_all_products(self.client):
+            prod = normalize_product(raw)
+            if prod is not None:
+                index[prod.product_id] = prod
+        self._products = index       # atomic publish
+        self.loaded_at = time.time()
+        return index
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print("⚠️ Product catalog refresh failed:", e)
+        finally:
+            self._refreshing = False
+
+    def products(self):
+        """The current index; loads it on first use and reloads it in the background once stale."""
+        index = self._products
+        if index is None:
+            with self._lock:
+                if self._products is None:
+                    try:
+                        return self.refresh()
+                    except Exception as e:
+                        print("⚠️ Product catalog load failed, using fallback increments:", e)
+                        self.loaded_at = time.time() - self.ttl + LOAD_RETRY_SEC   # retry soon
+                        self._products = {}
+                return self._products
+        if time.time() - self.loaded_at > self.ttl and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._background_refresh, name="product-catalog", daemon=True).start()
+        return index
+
+    def get(self, product_id):
+        """Product for product_id, or None if the exchange does not list it."""
+        return self.products().get(product_id)
+
+    def _product(self, product_id):
+        return self.get(product_id) or Product(product_id)
+
+    def floor_base(self, product_id, size):
+        """Base size floored to the product's base_increment (float)."""
+        return float(self._product(product_id).floor_base(size))
+
+    def floor_quote(self, product_id, usd):
+        """Quote amount floored to the product's quote_increment (float)."""
+        return float(self._product(product_id).floor_quote(usd))
+
+    def base_size(self, product_id, size):
+        """Base size floored to base_increment, formatted for an order payload (no exponent notation)."""
+        return format(self._product(product_id).floor_base(size), "f")
+
+    def check(self, product_id, base_size=None, quote_size=None):
+        """Reason the exchange would reject the order, or None (unknown products pass)."""
+        prod = self.get(product_id)
+        if prod is None:
+            return None
+        return prod.check(base_size, quote_size)
+
+
+_catalogs = {}
+
+
+def catalog_for(client):
+    """Shared ProductCatalog per client object, so every sizing path reads the same index."""
+    cat = _catalogs.get(id(client))
+    if cat is None or cat.client is not client:
+        cat = _catalogs[id(client)] = ProductCatalog(client)
+    return cat
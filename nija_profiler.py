@@ -0,0 +1,105 @@
+# nija_profiler.py
+"""
+NIJA: low-overhead statistical profiler for the live process
+A daemon thread wakes every `interval` seconds, snapshots every thread's
+stack via sys._current_frames() and counts identical stacks. The result is
+emitted in the "collapsed stack" format understood by flamegraph.pl,
+speedscope and inferno:
+
+    MainThread;run (runners.py:160);trade_symbol (bot.py:238) 42
+
+Sampling is bounded: the thread stops on its own after `max_seconds`.
+"""
+
+import os
+import sys
+import time
+import threading
+
+# ---------- CONFIG ----------
+DEFAULT_INTERVAL_SEC = 0.005   # 200 Hz
+DEFAULT_MAX_SEC = 30
+HARD_MAX_SEC = 300             # never sample longer than this, whatever the caller asks
+MAX_STACK_DEPTH = 64
+# ----------------------------
+
+
+def _frame_label(code):
+    return "%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+
+class SamplingProfiler:
+    def __init__(self, interval=DEFAULT_INTERVAL_SEC, max_seconds=DEFAULT_MAX_SEC):
+        self.interval = max(0.001, float(interval))
+        self.max_seconds = min(float(max_seconds), HARD_MAX_SEC)
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._counts = {}
+        self._labels = {}   # code object -> label cache, avoids re-formatting hot frames
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            raise RuntimeError("profiler already running")
+        self._stop.clear()
+        self.started_at = time.time()
+        self.stopped_at = None
+        self._thread = threading.Thread(target=self._run, name="nija-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling (if still running) and return the collapsed-stack text."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.collapsed()
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + self.max_seconds
+        counts = self._counts
+        while not self._stop.wait(self.interval):
+            if time.monotonic() >= deadline:
+                break
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                depth = 0
+                while frame is not None and depth < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    label = self._labels.get(code)
+                    if label is None:
+                        label = self._labels[code] = _frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                    depth += 1
+                stack.append(names.get(tid, "thread-%d" % tid))
+                key = ";".join(reversed(stack))
+                counts[key] = counts.get(key, 0) + 1
+            self.samples += 1
+        self.stopped_at = time.time()
+
+    def collapsed(self):
+        lines = ["%s %d" % (stack, n) for stack, n in sorted(self._counts.items())]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def summary(self):
+        return {
+            "running": self.running,
+            "interval_s": self.interval,
+            "max_seconds": self.max_seconds,
+            "samples": self.samples,
+            "unique_stacks": len(self._counts),
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
@@ -0,0 +1,263 @@
+# nija_risk.py
+"""
+NIJA: in-memory risk engine
+Replaces per-order os.getenv()/float() parsing with an immutable RiskConfig
+snapshot that is swapped atomically (a single reference assignment) when an
+admin changes a limit. Exposure, open notional, daily PnL and order-rate
+counters are maintained incrementally on every order/fill, so check() is
+O(1): a handful of dict lookups and float compares.
+
+record_fill() keeps a per-symbol position (signed base size, average cost)
+and books realized PnL whenever a fill reduces or flips it, so the daily
+loss limit is fed by every order path that reports its fills. Orders that
+only shrink a symbol's exposure (exits) are refused by the kill switch
+alone: once a loss or rate limit trips, stops and take-profits still go out.
+
+Subscribers (e.g. the sharded runtime's workers) are notified of every new
+config snapshot, so changes never have to go through os.environ.
+
+RiskGate plugs a RiskEngine into TradingEngine(risk=...) for routed parent
+orders, which never pass through a wrapped client.place_market_order.
+"""
+
+import os
+import math
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass, replace, asdict, fields
+from datetime import datetime, timezone
+
+
+def _env_bool(name, default):
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off")
+
+
+def _coerce(name, kind, value):
+    """One admin-supplied value -> the field's type; ValueError if it doesn't fit."""
+    if kind is bool:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, int) and value in (0, 1):
+            return bool(value)
+        if isinstance(value, str) and value.strip().lower() in _TRUE + _FALSE:
+            return value.strip().lower() in _TRUE
+        raise ValueError("%s must be a boolean (true/false, on/off), got %r" % (name, value))
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError("%s must be a number, got %r" % (name, value))
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError("%s must be a number, got %r" % (name, value)) from None
+    if not math.isfinite(number) or number < 0:
+        raise ValueError("%s must be a finite number >= 0, got %r" % (name, value))
+    if kind is int:
+        if not number.is_integer():
+            raise ValueError("%s must be a whole number, got %r" % (name, value))
+        return int(number)
+    return number
+
+
+@dataclass(frozen=True)
+class RiskConfig:
+    kill_switch: bool = False
+    live_order_enabled: bool = False
+    max_order_usd: float = 10.0
+    max_symbol_exposure_usd: float = 0.0     # 0 = unlimited
+    max_portfolio_exposure_usd: float = 0.0  # 0 = unlimited (gross, sum of |symbol exposure|)
+    max_daily_loss_usd: float = 0.0          # 0 = unlimited
+    max_orders_per_min: int = 0              # 0 = unlimited
+
+    @classmethod
+    def from_env(cls):
+        """Read limits from the environment once (at startup)."""
+        return cls(
+            kill_switch=os.getenv("KILL_SWITCH", "OFF").upper() == "ON",
+            live_order_enabled=_env_bool("LIVE_ORDER_ENABLED", "false"),
+            max_order_usd=float(os.getenv("MAX_ORDER_USD", "10")),
+            max_symbol_exposure_usd=float(os.getenv("MAX_SYMBOL_EXPOSURE_USD", "0")),
+            max_portfolio_exposure_usd=float(os.getenv("MAX_PORTFOLIO_EXPOSURE_USD", "0")),
+            max_daily_loss_usd=float(os.getenv("MAX_DAILY_LOSS_USD", "0")),
+            max_orders_per_min=int(os.getenv("MAX_ORDERS_PER_MIN", "0")),
+        )
+
+    @classmethod
+    def coerce(cls, changes):
+        """Validate {field: value} (e.g. admin JSON) against the field types; returns typed values."""
+        kinds = {f.name: f.type for f in fields(cls)}
+        unknown = sorted(set(changes) - set(kinds))
+        if unknown:
+            raise ValueError("unknown risk setting(s): %s" % ", ".join(unknown))
+        return {name: _coerce(name, kinds[name], value) for name, value in changes.items()}
+
+
+class RiskEngine:
+    def __init__(self, config=None):
+        self.config = config or RiskConfig.from_env()
+        self.symbol_exposure = {}   # symbol -> signed USD notional (buy +, sell -)
+        self.open_notional = 0.0    # sum of |symbol_exposure|
+        self.net_exposure = 0.0     # sum of symbol_exposure
+        self.daily_pnl = 0.0
+        self.positions = {}         # symbol -> (signed base size, average entry price)
+        self._day = self._today()
+        self._order_times = deque(maxlen=max(1, self.config.max_orders_per_min))
+        self._lock = threading.Lock()       # guards counter updates, never taken by check()
+        self._subscribers = []
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).date()
+
+    # -------------------
+    # CONFIG SNAPSHOTS
+    # -------------------
+    def update_config(self, **changes):
+        """Publish a new config snapshot; returns it. Unknown keys / ill-typed values raise ValueError."""
+        new = replace(self.config, **RiskConfig.coerce(changes))
+        if new.max_orders_per_min != self.config.max_orders_per_min:
+            with self._lock:
+                self._order_times = deque(self._order_times, maxlen=max(1, new.max_orders_per_min))
+        self.config = new
+        for fn in list(self._subscribers):
+            fn(new)
+        return new
+
+    def subscribe(self, fn):
+        """fn(config) is called with every new snapshot."""
+        self._subscribers.append(fn)
+
+    # -------------------
+    # PRE-TRADE CHECK (O(1))
+    # -------------------
+    def reduces(self, symbol, usd_value, side):
+        """True if the order shrinks |symbol_exposure[symbol]| (an exit, without flipping past it)."""
+        current = self.symbol_exposure.get(symbol, 0.0) if symbol is not None else 0.0
+        signed = usd_value if side == "buy" else -usd_value
+        return abs(current + signed) < abs(current)
+
+    def check(self, usd_value, symbol=None, side="buy", reduce_only=None):
+        """
+        Return (ok:bool, reason:str|None) for an order of `usd_value` notional.
+        reduce_only (inferred with reduces() when None) exempts the order from every limit but the kill switch.
+        """
+        cfg = self.config  # one read -> consistent snapshot for the whole check
+        if cfg.kill_switch:
+            return False, "kill_switch"
+        if reduce_only is None:
+            reduce_only = self.reduces(symbol, usd_value, side)
+        if reduce_only:
+            return True, None
+        if usd_value > cfg.max_order_usd:
+            return False, "max_order_exceeded"
+        if cfg.max_daily_loss_usd and self._today() == self._day and -self.daily_pnl >= cfg.max_daily_loss_usd:
+            return False, "daily_loss_limit"
+        if cfg.max_orders_per_min:
+            times = self._order_times
+            if len(times) >= cfg.max_orders_per_min and time.monotonic() - times[0] < 60:
+                return False, "order_rate_limit"
+        signed = usd_value if side == "buy" else -usd_value
+        if cfg.max_symbol_exposure_usd and symbol is not None:
+            current = self.symbol_exposure.get(symbol, 0.0)
+            if abs(current + signed) > cfg.max_symbol_exposure_usd and abs(current + signed) > abs(current):
+                return False, "symbol_exposure_limit"
+        if cfg.max_portfolio_exposure_usd:
+            current = self.symbol_exposure.get(symbol, 0.0)
+            projected = self.open_notional - abs(current) + abs(current + signed)
+            if projected > cfg.max_portfolio_exposure_usd and projected > self.open_notional:
+                return False, "portfolio_exposure_limit"
+        return True, None
+
+    # -------------------
+    # INCREMENTAL UPDATES
+    # -------------------
+    def record_order(self, symbol, side, usd_value):
+        """Account for a sent order (or fill) of `usd_value` notional."""
+        signed = usd_value if side == "buy" else -usd_value
+        with self._lock:
+            current = self.symbol_exposure.get(symbol, 0.0)
+            new = current + signed
+            self.symbol_exposure[symbol] = new
+            self.open_notional += abs(new) - abs(current)
+            self.net_exposure += signed
+            self._order_times.append(time.monotonic())
+
+    def record_fill(self, symbol, side, size, price):
+        """
+        Account for a fill of `size` base units at `price`: exposure and order rate as
+        record_order(), plus realized PnL (booked via record_pnl) for the part that
+        reduces an open position. Returns the realized PnL.
+        """
+        size, price = float(size), float(price)
+        self.record_order(symbol, side, size * price)
+        signed = size if side == "buy" else -size
+        realized = 0.0
+        with self._lock:
+            qty, avg = self.positions.get(symbol, (0.0, 0.0))
+            new_qty = round(qty + signed, 12)
+            if qty and (qty > 0) != (signed > 0):          # reduces, closes or flips the position
+                closed = min(abs(qty), abs(signed))
+                realized = closed * (price - avg) * (1 if qty > 0 else -1)
+                if new_qty == 0:
+                    avg = 0.0
+                elif (new_qty > 0) != (qty > 0):           # flipped: the remainder opened at this price
+                    avg = price
+            elif new_qty:
+                avg = (abs(qty) * avg + abs(signed) * price) / abs(new_qty)
+            self.positions[symbol] = (new_qty, avg)
+        if realized:
+            self.record_pnl(realized)
+        return realized
+
+    def record_pnl(self, pnl_usd):
+        """Add realized PnL to today's (UTC) running total."""
+        with self._lock:
+            today = self._today()
+            if today != self._day:
+                self._day = today
+                self.daily_pnl = 0.0
+            self.daily_pnl += pnl_usd
+
+    def snapshot(self):
+        return {
+            "config": asdict(self.config),
+            "symbol_exposure": dict(self.symbol_exposure),
+            "open_notional": round(self.open_notional, 2),
+            "net_exposure": round(self.net_exposure, 2),
+            "daily_pnl": round(self.daily_pnl, 2),
+            "positions": {s: {"size": q, "avg_price": a} for s, (q, a) in list(self.positions.items()) if q},
+            "orders_last_min": sum(1 for t in list(self._order_times) if time.monotonic() - t < 60),
+        }
+
+
+def order_notional(payload):
+    """USD notional of an order payload (size x meta entry_price); 0.0 if either is missing."""
+    try:
+        return float(payload["size"]) * float(payload["meta"]["entry_price"])
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
+class RiskGate:
+    """
+    TradingEngine risk hook: before(payload) raises RuntimeError(reason) when the engine
+    refuses the order and returns a token; after(payload, token, size, price) books what
+    the order actually filled (size 0 when it failed).
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def before(self, payload):
+        ok, reason = self.engine.check(order_notional(payload), payload.get("product_id"),
+                                       payload.get("side", "buy"))
+        if not ok:
+            raise RuntimeError(reason)
+        return None
+
+    def after(self, payload, token, size, price):
+        if size and price:
+            self.engine.record_fill(payload.get("product_id"), payload.get("side"), size, price)
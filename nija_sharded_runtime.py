@@ -0,0 +1,398 @@
+# nija_sharded_runtime.py
+"""
+NIJA: multi-process symbol sharding
+A coordinator process partitions the symbol universe across N worker
+processes. Each worker imports a bot module (default: the v4 webhook bot)
+and runs its `trade_symbol(symbol)` coroutine for every symbol in its shard
+on its own event loop, so CPU-bound indicator work scales with cores
+instead of sharing one GIL.
+
+Shared state lives in multiprocessing shared memory:
+  - kill switch (checked before every order in every worker)
+  - signed notional exposure per symbol, plus the gross and net totals:
+    the symbol and portfolio exposure limits are checked against these
+    (and the order's exposure reserved) under one shared lock, so the
+    limits hold across all shards rather than per shard; orders for
+    symbols outside the coordinator's universe have no slot and are refused
+  - per-worker heartbeat + event-loop lag (used for rebalancing)
+
+Every worker also runs a local nija_risk.RiskEngine for the other O(1)
+pre-trade checks (order size, rate, daily loss), told whether the order
+reduces the symbol's global exposure so exits are never blocked by them.
+The same ShardRiskGate wraps the bot's market orders and is the risk hook
+of its TradingEngine, so routed parent orders are gated as well;
+Coordinator.publish_config() pushes new RiskConfig snapshots to all
+workers over their command queues.
+
+When a worker's loop lag stays above SHARD_LAG_REBALANCE_SEC the
+coordinator moves one of its symbols to the least-lagged worker. A move is
+a hand-off: the source stops the symbol's loop, flushes its pending
+orders, writes its state snapshot synchronously and acks; only then is the
+symbol added to the destination, which restores that snapshot. Dead
+workers are respawned with their shard.
+
+Run:
+    SHARD_WORKERS=4 SHARD_SYMBOLS=BTC-USD,ETH-USD,SOL-USD python nija_sharded_runtime.py
+"""
+
+import os
+import time
+import queue
+import signal
+import asyncio
+import logging
+import importlib
+import multiprocessing as mp
+from dataclasses import asdict
+
+from nija_risk import RiskEngine, RiskConfig, order_notional
+from nija_startup import LazyObject
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger("nija")
+
+# ---------- CONFIG ----------
+BOT_MODULE = os.getenv("SHARD_BOT_MODULE", "nija_ultra_safe_trading_bot_v4_webhook")
+NUM_WORKERS = int(os.getenv("SHARD_WORKERS", str(os.cpu_count() or 1)))
+SYMBOLS = [s.strip() for s in os.getenv("SHARD_SYMBOLS", "BTC-USD,ETH-USD,LTC-USD").split(",") if s.strip()]
+LAG_REBALANCE_SEC = float(os.getenv("SHARD_LAG_REBALANCE_SEC", "0.25"))
+REBALANCE_COOLDOWN_SEC = 30
+HEARTBEAT_TIMEOUT_SEC = 15
+MONITOR_INTERVAL_SEC = 1.0
+# ----------------------------
+
+
+class SharedRiskState:
+    """Risk state shared by the coordinator and every worker (lives in shared memory)."""
+
+    def __init__(self, ctx, num_workers, symbols=()):
+        self.kill_switch = ctx.Value("b", 0)
+        self.total_exposure = ctx.Value("d", 0.0)       # net (signed)
+        self.gross_exposure = ctx.Value("d", 0.0)       # sum of |symbol exposure|
+        self.index = {sym: i for i, sym in enumerate(sorted(symbols))}
+        self.symbol_exposure = ctx.Array("d", max(1, len(self.index)), lock=False)   # guarded by self.lock
+        self.lock = ctx.Lock()
+        self.heartbeats = ctx.Array("d", num_workers)
+        self.loop_lag = ctx.Array("d", num_workers)
+
+    def killed(self):
+        # single-byte read; no lock needed
+        return bool(self.kill_switch.value)
+
+    def set_kill(self, on):
+        self.kill_switch.value = 1 if on else 0
+
+    def add_exposure(self, usd, symbol):
+        """Add signed exposure unconditionally (e.g. to undo a reservation)."""
+        with self.lock:
+            self._apply(symbol, usd)
+
+    def reduces(self, symbol, usd):
+        """True if a signed `usd` order shrinks the symbol's global |exposure| (an exit)."""
+        i = self.index.get(symbol)
+        if i is None:
+            return False
+        with self.lock:
+            current = self.symbol_exposure[i]
+        return abs(current + usd) < abs(current)
+
+    def reserve(self, symbol, usd, config):
+        """
+        Check the projected global exposure of a signed `usd` order against config's symbol and
+        portfolio limits and, if it fits, add it, atomically. Returns a block reason or None.
+        Symbols outside the coordinator's universe have no exposure slot and are refused.
+        """
+        i = self.index.get(symbol)
+        if i is None:
+            return "unknown_symbol"
+        with self.lock:
+            current = self.symbol_exposure[i]
+            new = current + usd
+            if config.max_symbol_exposure_usd and abs(new) > config.max_symbol_exposure_usd and abs(new) > abs(current):
+                return "symbol_exposure_limit"
+            gross = self.gross_exposure.value
+            projected = gross - abs(current) + abs(new)
+            if config.max_portfolio_exposure_usd and projected > config.max_portfolio_exposure_usd and projected > gross:
+                return "portfolio_exposure_limit"
+            self._apply(symbol, usd)
+            return None
+
+    def _apply(self, symbol, usd):
+        i = self.index[symbol]
+        current = self.symbol_exposure[i]
+        self.symbol_exposure[i] = current + usd
+        self.gross_exposure.value += abs(current + usd) - abs(current)
+        self.total_exposure.value += usd
+
+
+def partition(symbols, n):
+    """Round-robin symbols into n shards (sorted so assignment is deterministic)."""
+    shards = [[] for _ in range(n)]
+    for i, sym in enumerate(sorted(symbols)):
+        shards[i % n].append(sym)
+    return shards
+
+
+# -------------------
+# WORKER
+# -------------------
+class ShardRiskGate:
+    """
+    One worker's pre-trade gate: the shared kill switch, the local RiskEngine checks and the
+    global exposure reservation. before(payload) raises RuntimeError(reason) or returns the
+    reserved signed notional; after(payload, reserved, size, price) swaps the reservation for
+    what actually filled and books the fill. Also a TradingEngine risk hook for routed parents.
+    """
+
+    def __init__(self, risk, engine):
+        self.risk = risk
+        self.engine = engine
+
+    def before(self, payload):
+        if self.risk.killed():
+            raise RuntimeError("kill_switch")
+        notional = order_notional(payload)
+        symbol = payload.get("product_id")
+        signed = notional if payload.get("side") == "buy" else -notional
+        ok, reason = self.engine.check(notional, symbol, payload.get("side", "buy"),
+                                       reduce_only=self.risk.reduces(symbol, signed))
+        if not ok:
+            raise RuntimeError(reason)
+        reason = self.risk.reserve(symbol, signed, self.engine.config)     # global (all shards) exposure limits
+        if reason:
+            raise RuntimeError(reason)
+        return signed
+
+    def after(self, payload, reserved, size, price):
+        symbol, side = payload.get("product_id"), payload.get("side")
+        filled = float(size or 0) * float(price or 0)
+        actual = filled if side == "buy" else -filled
+        if actual != reserved:
+            self.risk.add_exposure(actual - reserved, symbol)
+        if filled:
+            # books realized PnL on exits, which feeds the daily loss limit
+            self.engine.record_fill(symbol, side, size, price)
+        elif size:
+            self.engine.record_order(symbol, side, 0.0)
+
+
+def _guard_client(bot, risk, engine):
+    """
+    Gate the bot's orders with a ShardRiskGate: bot.client.place_market_order is wrapped, and
+    the bot's TradingEngine (bot.engine, if any) gets it as its risk hook for routed parents.
+    Returns False (nothing to guard) if the bot has no exchange client.
+    """
+    gate = ShardRiskGate(risk, engine)
+    trading = getattr(bot, "engine", None)
+    if trading is not None and hasattr(trading, "risk"):
+        trading.risk = gate
+    client = bot.client
+    if isinstance(client, LazyObject):
+        client = client.resolve()
+    if client is None:
+        logger.warning("%s has no exchange client; its orders are not guarded", getattr(bot, "__name__", bot))
+        return False
+    raw_place = client.place_market_order
+
+    def place_market_order(payload, *args, **kwargs):
+        reserved = gate.before(payload)
+        try:
+            result = raw_place(payload, *args, **kwargs)
+        except Exception:
+            gate.after(payload, reserved, 0.0, None)
+            raise
+        meta = payload.get("meta") or {}
+        gate.after(payload, reserved, payload.get("size"), meta.get("entry_price"))
+        return result
+
+    client.place_market_order = place_market_order
+    return True
+
+
+async def _worker_main(idx, shard, commands, acks, risk, bot_module, risk_config):
+    bot = importlib.import_module(bot_module)
+    engine = RiskEngine(RiskConfig(**risk_config))
+    _guard_client(bot, risk, engine)
+    tasks = {}
+
+    def add(sym):
+        if sym not in tasks:
+            tasks[sym] = asyncio.create_task(bot.trade_symbol(sym))
+            logger.info("worker %d: +%s (%d symbols)", idx, sym, len(tasks))
+
+    def remove(sym):
+        task = tasks.pop(sym, None)
+        if task is not None:
+            task.cancel()
+            logger.info("worker %d: -%s (%d symbols)", idx, sym, len(tasks))
+        return task
+
+    async def hand_off(sym):
+        """Stop sym here and persist its final state before the coordinator starts it elsewhere."""
+        task = remove(sym)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+        coalescer = getattr(bot, "coalescer", None)
+        if coalescer is not None:
+            await coalescer.flush(sym)        # resolved entries land in open_trades before the snapshot
+        store = getattr(bot, "state_store", None)
+        if store is not None:
+            store.release(sym)
+        getattr(bot, "OPEN_TRADES", {}).pop(sym, None)
+        acks.put(("removed", idx, sym))
+
+    for sym in shard:
+        add(sym)
+    # bot-level services (order tracking, state checkpoints, ...) if the bot defines them
+    background = [asyncio.create_task(c) for c in getattr(bot, "background_tasks", lambda: [])()]
+
+    loop = asyncio.get_running_loop()
+    lag_ewma = 0.0
+    while True:
+        expected = loop.time() + MONITOR_INTERVAL_SEC
+        await asyncio.sleep(MONITOR_INTERVAL_SEC)
+        lag = max(0.0, loop.time() - expected)
+        lag_ewma = 0.7 * lag_ewma + 0.3 * lag
+        risk.loop_lag[idx] = lag_ewma
+        risk.heartbeats[idx] = time.time()
+        while True:
+            try:
+                cmd, sym = commands.get_nowait()
+            except queue.Empty:
+                break
+            if cmd == "add":
+                add(sym)
+            elif cmd == "remove":
+                await hand_off(sym)
+            elif cmd == "config":
+                engine.update_config(**sym)
+            elif cmd == "stop":
+                for s in list(tasks):
+                    remove(s)
+                for t in background:
+                    t.cancel()
+                if hasattr(bot, "state_store"):
+                    bot.state_store.checkpoint()
+                return
+
+
+def worker_entry(idx, shard, commands, acks, risk, bot_module, risk_config):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # coordinator owns shutdown
+    asyncio.run(_worker_main(idx, shard, commands, acks, risk, bot_module, risk_config))
+
+
+# -------------------
+# COORDINATOR
+# -------------------
+class Coordinator:
+    def __init__(self, symbols=SYMBOLS, num_workers=NUM_WORKERS, bot_module=BOT_MODULE):
+        self.ctx = mp.get_context("spawn")
+        self.num_workers = max(1, min(num_workers, len(symbols) or 1))
+        self.bot_module = bot_module
+        self.risk = SharedRiskState(self.ctx, self.num_workers, symbols)
+        self.risk_engine = RiskEngine()
+        self.risk.set_kill(self.risk_engine.config.kill_switch)
+        self.shards = partition(symbols, self.num_workers)
+        self.commands = [self.ctx.Queue() for _ in range(self.num_workers)]
+        self.acks = self.ctx.Queue()        # workers -> coordinator ("removed", idx, symbol)
+        self.moving = {}                    # symbol -> (src, dst) until the source acks its hand-off
+        self.procs = [None] * self.num_workers
+        self._last_rebalance = 0.0
+
+    def _spawn(self, idx):
+        p = self.ctx.Process(
+            target=worker_entry,
+            args=(idx, list(self.shards[idx]), self.commands[idx], self.acks, self.risk, self.bot_module,
+                  asdict(self.risk_engine.config)),
+            name="nija-shard-%d" % idx,
+            daemon=True,
+        )
+        p.start()
+        self.risk.heartbeats[idx] = time.time()
+        self.procs[idx] = p
+        logger.info("Spawned shard %d pid=%s symbols=%s", idx, p.pid, self.shards[idx])
+
+    def start(self):
+        for i in range(self.num_workers):
+            self._spawn(i)
+
+    def publish_config(self, **changes):
+        """Apply RiskConfig changes locally and push the new snapshot to every worker."""
+        cfg = self.risk_engine.update_config(**changes)
+        self.risk.set_kill(cfg.kill_switch)
+        for q in self.commands:
+            q.put(("config", asdict(cfg)))
+        return cfg
+
+    def move_symbol(self, sym, src, dst):
+        """Start a hand-off; dst gets the symbol in drain_acks() once src has checkpointed it."""
+        self.shards[src].remove(sym)
+        self.moving[sym] = (src, dst)
+        self.commands[src].put(("remove", sym))
+        logger.info("Moving %s: shard %d -> %d", sym, src, dst)
+
+    def _complete_move(self, sym):
+        src, dst = self.moving.pop(sym)
+        self.shards[dst].append(sym)
+        self.commands[dst].put(("add", sym))
+        logger.info("Rebalanced %s: shard %d -> %d", sym, src, dst)
+
+    def drain_acks(self):
+        while True:
+            try:
+                kind, idx, sym = self.acks.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "removed" and self.moving.get(sym, (None,))[0] == idx:
+                self._complete_move(sym)
+
+    def rebalance(self):
+        now = time.time()
+        if now - self._last_rebalance < REBALANCE_COOLDOWN_SEC or self.num_workers < 2 or self.moving:
+            return
+        lags = list(self.risk.loop_lag)
+        worst = max(range(self.num_workers), key=lambda i: lags[i])
+        best = min(range(self.num_workers), key=lambda i: lags[i])
+        if lags[worst] < LAG_REBALANCE_SEC or lags[best] > LAG_REBALANCE_SEC / 2 or len(self.shards[worst]) < 2:
+            return
+        self.move_symbol(self.shards[worst][-1], worst, best)
+        self._last_rebalance = now
+
+    def supervise(self):
+        now = time.time()
+        for i, p in enumerate(self.procs):
+            if not p.is_alive():
+                logger.warning("Shard %d exited (code=%s) — respawning", i, p.exitcode)
+                # a dead source can't ack: its last periodic snapshot is all there is
+                for sym in [s for s, (src, _) in self.moving.items() if src == i]:
+                    self._complete_move(sym)
+                self._spawn(i)
+            elif now - self.risk.heartbeats[i] > HEARTBEAT_TIMEOUT_SEC:
+                logger.warning("Shard %d missed heartbeats for %.0fs", i, now - self.risk.heartbeats[i])
+
+    def run_forever(self):
+        self.start()
+        try:
+            while True:
+                time.sleep(MONITOR_INTERVAL_SEC)
+                self.drain_acks()
+                self.supervise()
+                self.rebalance()
+        except KeyboardInterrupt:
+            logger.info("Coordinator shutting down")
+        finally:
+            self.stop()
+
+    def stop(self, timeout=5):
+        for q in self.commands:
+            q.put(("stop", None))
+        for p in self.procs:
+            if p is not None:
+                p.join(timeout)
+                if p.is_alive():
+                    p.terminate()
+
+
+if __name__ == "__main__":
+    print(f"🚀 NIJA sharded runtime: {len(SYMBOLS)} symbols across {min(NUM_WORKERS, len(SYMBOLS))} workers ({BOT_MODULE})")
+    Coordinator().run_forever()
@@ -0,0 +1,119 @@
+# nija_sizing_model.py
+"""
+NIJA: online position-sizing model (exponentially decayed Kelly)
+Per symbol the model keeps four decayed sums over closed trades:
+
+    wins, losses          decayed counts
+    win_ret, loss_ret     decayed sums of |return| for wins / losses
+
+Every closed trade multiplies the symbol's sums by `decay` (half-life in
+trades) and adds the new result, so recent trades dominate and an update
+is O(1). From the sums:
+
+    p = P(win)          (Beta(prior, prior) smoothed)
+    b = avg win / avg loss
+    f = p - (1 - p) / b    (Kelly fraction)
+
+and the size multiplier is 1 + gain * f, clamped to [min_mult, max_mult].
+With no history f = 0, so sizes start at 1x. The multiplier is recomputed
+on update, so reading it at order time is a dict lookup.
+
+snapshot()/restore() give a small JSON-able state; backtest() replays
+closed trades through the same update()/multiplier() calls the bot uses.
+"""
+
+# ---------- CONFIG ----------
+SIZING_HALFLIFE_TRADES = 20
+SIZING_PRIOR_TRADES = 2.0       # pseudo-trades on each side (win/loss) before real results
+SIZING_PRIOR_RETURN = 0.01      # assumed |return| of the pseudo-trades
+KELLY_GAIN = 4.0                # multiplier = 1 + gain * kelly_fraction
+MIN_MULTIPLIER = 0.1
+MAX_MULTIPLIER = 3.0
+# ----------------------------
+
+
+class DecayedKelly:
+    def __init__(self, halflife=SIZING_HALFLIFE_TRADES, prior=SIZING_PRIOR_TRADES, prior_return=SIZING_PRIOR_RETURN,
+                 gain=KELLY_GAIN, min_mult=MIN_MULTIPLIER, max_mult=MAX_MULTIPLIER):
+        self.decay = 0.5 ** (1.0 / halflife)
+        self.prior = prior
+        self.prior_return = prior_return
+        self.gain = gain
+        self.min_mult = min_mult
+        self.max_mult = max_mult
+        self.state = {}          # symbol -> [wins, losses, win_ret, loss_ret, trades]
+        self._mult = {}          # symbol -> cached multiplier
+
+    def kelly_fraction(self, symbol):
+        wins, losses, win_ret, loss_ret, _ = self.state.get(symbol) or (0.0, 0.0, 0.0, 0.0, 0)
+        k = self.prior
+        p = (wins + k) / (wins + losses + 2 * k)
+        avg_win = (win_ret + k * self.prior_return) / (wins + k)
+        avg_loss = (loss_ret + k * self.prior_return) / (losses + k)
+        return p - (1.0 - p) * avg_loss / avg_win
+
+    def update(self, symbol, ret):
+        """O(1): fold one closed trade's fractional return (0.02 = +2%) into the symbol's state."""
+        s = self.state.get(symbol)
+        if s is None:
+            s = self.state[symbol] = [0.0, 0.0, 0.0, 0.0, 0]
+        d = self.decay
+        s[0] *= d
+        s[1] *= d
+        s[2] *= d
+        s[3] *= d
+        if ret > 0:
+            s[0] += 1.0
+            s[2] += ret
+        elif ret < 0:
+            s[1] += 1.0
+            s[3] -= ret
+        s[4] += 1
+        return self._refresh(symbol)
+
+    def _refresh(self, symbol):
+        mult = 1.0 + self.gain * self.kelly_fraction(symbol)
+        self._mult[symbol] = max(self.min_mult, min(self.max_mult, mult))
+        return self._mult[symbol]
+
+    def multiplier(self, symbol):
+        """Size multiplier for the next order on symbol (1.0 until it has closed trades)."""
+        return self._mult.get(symbol, 1.0)
+
+    # -------------------
+    # PERSISTENCE
+    # -------------------
+    def snapshot(self):
+        return {"version": 1, "decay": self.decay, "state": {s: list(v) for s, v in self.state.items()}}
+
+    def restore(self, snap):
+        if not snap or snap.get("version") != 1:
+            return False
+        self.state = {s: list(v) for s, v in snap["state"].items()}
+        self._mult = {}
+        for s in self.state:
+            self._refresh(s)
+        return True
+
+
+def backtest(model, trades, base_amount=1.0):
+    """
+    Replay closed trades (iterable of (symbol, ret) in exit order) through
+    `model` exactly as the live bot would: size with multiplier() first,
+    then update() with the result. Returns a summary dict.
+    """
+    pnl = flat_pnl = 0.0
+    n = 0
+    for symbol, ret in trades:
+        pnl += base_amount * model.multiplier(symbol) * ret
+        flat_pnl += base_amount * ret
+        model.update(symbol, ret)
+        n += 1
+    return {"trades": n, "pnl": pnl, "flat_pnl": flat_pnl}
+
+
+if __name__ == "__main__":
+    from nija_trade_history import TradeHistory
+    result = backtest(DecayedKelly(), TradeHistory().closed_trades())
+    print(f"📈 Sizing backtest over {result['trades']} closed trades: "
+          f"pnl {result['pnl']:+.4f} (flat sizing {result['flat_pnl']:+.4f}, per unit of base_amount)")
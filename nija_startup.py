@@ -0,0 +1,148 @@
+# nija_startup.py
+"""
+NIJA: fast-boot startup pipeline
+Keeps the import of a bot/service module cheap so the web server can
+answer health checks within a fraction of a second of boot:
+
+  - LazyObject(factory)   exchange clients are built on first attribute
+                          access (or explicitly, off the event loop, via
+                          resolve()), not at import time
+  - lazy_import("numpy")  heavy libraries load on first attribute access
+  - phase("name")         times each startup step; startup_report() is the
+                          per-phase breakdown served by /health
+
+The import cost itself can be broken down per top-level module with
+CPython's -X importtime:
+
+    python nija_startup.py go_live_main          # top 25 imports by cumulative time
+"""
+
+import sys
+import time
+import logging
+import threading
+import subprocess
+import importlib.util
+from contextlib import contextmanager
+
+logger = logging.getLogger("nija")
+
+BOOT_TS = time.time()
+PHASES = {}          # phase name -> seconds (in completion order)
+
+
+@contextmanager
+def phase(name):
+    """Time one startup step into PHASES."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASES[name] = time.perf_counter() - start
+        logger.info("startup: %s took %.3fs", name, PHASES[name])
+
+
+def startup_report():
+    return {
+        "uptime_sec": round(time.time() - BOOT_TS, 3),
+        "phases": {name: round(sec, 4) for name, sec in PHASES.items()},
+    }
+
+
+def lazy_import(name):
+    """Module object whose real import runs on first attribute access (importlib.util.LazyLoader)."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError("No module named %r" % name, name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+class LazyObject:
+    """
+    Stand-in for an object that is expensive to build (an exchange client).
+    factory() runs once, on first attribute access / resolve(); attribute
+    reads and writes are forwarded to the real object afterwards. bool()
+    is False if the factory returned None.
+    """
+
+    def __init__(self, factory, name="object"):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_target", None)
+        object.__setattr__(self, "_loaded", False)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def resolve(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    with phase("init " + self._name):
+                        object.__setattr__(self, "_target", self._factory())
+                    object.__setattr__(self, "_loaded", True)
+        return self._target
+
+    def __getattr__(self, attr):
+        return getattr(self.resolve(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.resolve(), attr, value)
+
+    def __bool__(self):
+        return self.resolve() is not None
+
+    def __repr__(self):
+        if not self._loaded:
+            return "<LazyObject %s (not created)>" % self._name
+        return "<LazyObject %s: %r>" % (self._name, self._target)
+
+
+# -------------------
+# -X importtime breakdown
+# -------------------
+def parse_importtime(stderr):
+    """
+    Parse `python -X importtime` output into [(module, self_us, cumulative_us, depth)],
+    depth 0 being the top-level imports (the measured module itself, site, ...).
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|")
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            rows.append((name.strip(), int(self_us), int(cum_us), max(0, depth)))
+        except ValueError:
+            continue
+    return rows
+
+
+def import_time_breakdown(module, top=25, python=sys.executable):
+    """Import `module` in a fresh interpreter with -X importtime; return the slowest imports."""
+    proc = subprocess.run([python, "-X", "importtime", "-c", "import %s" % module],
+                          capture_output=True, text=True)
+    rows = parse_importtime(proc.stderr)
+    total = next((cum for name, _, cum, _ in reversed(rows) if name == module), None)
+    rows.sort(key=lambda r: -r[2])
+    return {"module": module, "total_us": total, "ok": proc.returncode == 0, "top": rows[:top]}
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "go_live_main"
+    report = import_time_breakdown(target)
+    status = "" if report["ok"] else " (import FAILED)"
+    print(f"⏱️ import {target}: {(report['total_us'] or 0) / 1e6:.3f}s{status}")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for name, self_us, cum_us, depth in report["top"]:
+        print(f"{cum_us / 1e3:>10.1f}ms {self_us / 1e3:>8.1f}ms  {'  ' * depth}{name}")
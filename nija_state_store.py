@@ -0,0 +1,146 @@
+# nija_state_store.py
+"""
+NIJA: persistent per-symbol state snapshots for fast restart
+Each registered key (normally a symbol) is checkpointed to its own small
+binary file under STATE_DIR (pickle, highest protocol). Checkpoints are
+incremental: only keys marked dirty since the last checkpoint are
+re-serialized and rewritten, and files are replaced atomically
+(tmp + os.replace) so a crash mid-write never corrupts a snapshot.
+
+One file per symbol also means sharded workers never clobber each other,
+and a symbol keeps its state when it moves to another shard.
+
+Usage:
+    store = StateStore()
+    state, age = store.restore("BTC-USD", {})     # on boot, ~ms
+    store.register("BTC-USD", lambda: {...})      # provider of current state
+    store.mark_dirty("BTC-USD")                    # after each tick
+    asyncio.create_task(store.checkpoint_forever())
+"""
+
+import os
+import time
+import pickle
+import asyncio
+import logging
+
+logger = logging.getLogger("nija")
+
+# ---------- CONFIG ----------
+STATE_DIR = os.getenv("NIJA_STATE_DIR", "nija_state")
+CHECKPOINT_INTERVAL_SEC = float(os.getenv("NIJA_CHECKPOINT_SEC", "5"))
+MAGIC = b"NIJAS1"
+# ----------------------------
+
+
+def _filename(key):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in key) + ".bin"
+
+
+class StateStore:
+    def __init__(self, state_dir=STATE_DIR):
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+        self._providers = {}
+        self._dirty = set()
+
+    # -------------------
+    # RESTORE
+    # -------------------
+    def _path(self, key):
+        return os.path.join(self.state_dir, _filename(key))
+
+    def restore(self, key, default=None):
+        """Return (state, age_seconds) for key, or (default, None) if missing/corrupt."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            if not raw.startswith(MAGIC):
+                raise ValueError("bad magic")
+            saved_at, state = pickle.loads(raw[len(MAGIC):])
+            return state, max(0.0, time.time() - saved_at)
+        except FileNotFoundError:
+            return default, None
+        except Exception as e:
+            logger.warning("Ignoring unreadable state snapshot %s: %s", path, e)
+            return default, None
+
+    # -------------------
+    # CHECKPOINT
+    # -------------------
+    def register(self, key, provider):
+        """provider() -> picklable state; called on the owning loop at checkpoint time."""
+        self._providers[key] = provider
+        self._dirty.add(key)
+
+    def unregister(self, key, delete=False):
+        self._providers.pop(key, None)
+        self._dirty.discard(key)
+        if delete:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def mark_dirty(self, key):
+        self._dirty.add(key)
+
+    def serialize_dirty(self):
+        """Serialize dirty keys (cheap, on the caller's thread) -> [(path, bytes)]."""
+        dirty, self._dirty = self._dirty, set()
+        now = time.time()
+        out = []
+        for key in dirty:
+            provider = self._providers.get(key)
+            if provider is None:
+                continue
+            blob = self._blob(key, provider, now)
+            if blob is not None:
+                out.append((self._path(key), blob))
+        return out
+
+    @staticmethod
+    def _blob(key, provider, now):
+        try:
+            return MAGIC + pickle.dumps((now, provider()), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.warning("State snapshot for %s failed: %s", key, e)
+            return None
+
+    @staticmethod
+    def write(blobs):
+        for path, blob in blobs:
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+
+    def checkpoint(self):
+        """Synchronous checkpoint (e.g. on shutdown)."""
+        self.write(self.serialize_dirty())
+
+    def release(self, key):
+        """
+        Hand a key off to another process: write its current state synchronously
+        (dirty or not) and stop tracking it here. Returns True if a snapshot was written.
+        """
+        provider = self._providers.pop(key, None)
+        self._dirty.discard(key)
+        if provider is None:
+            return False
+        blob = self._blob(key, provider, time.time())
+        if blob is None:
+            return False
+        self.write([(self._path(key), blob)])
+        return True
+
+    async def checkpoint_forever(self, interval=CHECKPOINT_INTERVAL_SEC):
+        while True:
+            await asyncio.sleep(interval)
+            blobs = self.serialize_dirty()
+            if blobs:
+                try:
+                    await asyncio.to_thread(self.write, blobs)
+                except Exception as e:
+                    logger.warning("State checkpoint write failed: %s", e)
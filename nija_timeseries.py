@@ -0,0 +1,347 @@
+# nija_timeseries.py
+"""
+NIJA: time-series sink for ticks, indicators, signals, orders and equity
+Apart from the CSV trade journal nothing was persisted. TimeSeriesRecorder
+keeps it for post-trade analysis and backtest validation. It never blocks
+the trading loop:
+
+  - record calls (tick / indicator / signal / order / equity) only append a
+    tuple to a bounded in-memory buffer, with no I/O and no lock. When the
+    buffer is full, the oldest rows are dropped and counted; rows are
+    never waited on.
+  - flush_forever() drains the buffers every FLUSH_SEC (or sooner, once
+    BATCH_ROWS rows are pending) and hands them to the sink in a worker
+    thread, one executemany per table per batch.
+  - maintain_forever() applies the downsampling and retention policies in
+    a worker thread every MAINTAIN_SEC.
+
+Downsampling: raw ticks older than DOWNSAMPLE_AFTER_SEC are folded into 1m
+OHLCV bars (ticks_1m) and indicator values into 1m means (indicators_1m),
+then the raw rows are deleted. Retention: rows older than RETENTION_SEC[table]
+are deleted; None keeps them forever (orders, by default).
+
+Sinks are pluggable; any object with write(table, rows), maintain(now) and
+close() works. Built in: SqliteSink (default, WAL mode) and DuckDbSink
+(needs the optional duckdb package). NIJA_TSDB picks one:
+"sqlite:<path>", "duckdb:<path>" or "none".
+
+    recorder = recorder_from_env()                  # None when NIJA_TSDB=none
+    asyncio.create_task(recorder.flush_forever())
+    asyncio.create_task(recorder.maintain_forever())
+    recorder.tick("BTC-USD", 67000.5)
+    recorder.equity("live", 1234.5)
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from nija_metrics import Counter, QUEUE_DEPTH
+
+logger = logging.getLogger("nija")
+
+# ---------- CONFIG ----------
+TSDB_URL = os.getenv("NIJA_TSDB", "sqlite:nija_timeseries.db")
+BATCH_ROWS = 500
+FLUSH_SEC = 2.0
+MAX_BUFFERED_ROWS = 100_000        # per table; oldest rows are dropped beyond this
+MAINTAIN_SEC = 3600.0
+EQUITY_SAMPLE_SEC = 60.0
+DOWNSAMPLE_AFTER_SEC = 86400       # raw ticks / indicator values kept this long at full resolution
+DOWNSAMPLE_BUCKET_SEC = 60
+RETENTION_SEC = {
+    "ticks": 2 * 86400,
+    "indicators": 2 * 86400,
+    "ticks_1m": 365 * 86400,
+    "indicators_1m": 365 * 86400,
+    "signals": 90 * 86400,
+    "equity": 365 * 86400,
+    "orders": None,
+}
+# ----------------------------
+
+TABLES = {
+    "ticks": ("ts", "symbol", "price", "size"),
+    "indicators": ("ts", "symbol", "name", "value"),
+    "signals": ("ts", "symbol", "side", "signal_type", "risk_pct", "price"),
+    "orders": ("ts", "symbol", "side", "size", "price", "signal_type", "status", "order_id", "notes"),
+    "equity": ("ts", "source", "balance"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ticks (ts REAL NOT NULL, symbol TEXT NOT NULL, price REAL NOT NULL, size REAL);
+CREATE INDEX IF NOT EXISTS ticks_symbol_ts ON ticks (symbol, ts);
+CREATE TABLE IF NOT EXISTS indicators (ts REAL NOT NULL, symbol TEXT NOT NULL, name TEXT NOT NULL, value REAL);
+CREATE INDEX IF NOT EXISTS indicators_symbol_ts ON indicators (symbol, name, ts);
+CREATE TABLE IF NOT EXISTS signals (ts REAL NOT NULL, symbol TEXT NOT NULL, side TEXT, signal_type TEXT,
+                                    risk_pct REAL, price REAL);
+CREATE INDEX IF NOT EXISTS signals_symbol_ts ON signals (symbol, ts);
+CREATE TABLE IF NOT EXISTS orders (ts REAL NOT NULL, symbol TEXT NOT NULL, side TEXT, size REAL, price REAL,
+                                   signal_type TEXT, status TEXT, order_id TEXT, notes TEXT);
+CREATE INDEX IF NOT EXISTS orders_symbol_ts ON orders (symbol, ts);
+CREATE TABLE IF NOT EXISTS equity (ts REAL NOT NULL, source TEXT NOT NULL, balance REAL);
+CREATE INDEX IF NOT EXISTS equity_source_ts ON equity (source, ts);
+CREATE TABLE IF NOT EXISTS ticks_1m (ts INTEGER NOT NULL, symbol TEXT NOT NULL, open REAL, high REAL, low REAL,
+                                     close REAL, volume REAL, n INTEGER, PRIMARY KEY (symbol, ts));
+CREATE TABLE IF NOT EXISTS indicators_1m (ts INTEGER NOT NULL, symbol TEXT NOT NULL, name TEXT NOT NULL,
+                                          value REAL, n INTEGER, PRIMARY KEY (symbol, name, ts));
+"""
+
+# raw rows of whole buckets before the cutoff -> one row per (symbol, bucket); merged into an existing
+# bucket row if late rows arrive for it after it was downsampled
+_DOWNSAMPLE_TICKS = """
+INSERT INTO ticks_1m (ts, symbol, open, high, low, close, volume, n)
+SELECT bucket, symbol, MIN(open), MAX(price), MIN(price), MIN(close), SUM(COALESCE(size, 0)), COUNT(*)
+FROM (
+    SELECT {bucket} AS bucket, symbol, price, size,
+           FIRST_VALUE(price) OVER (PARTITION BY symbol, {bucket} ORDER BY ts) AS open,
+           FIRST_VALUE(price) OVER (PARTITION BY symbol, {bucket} ORDER BY ts DESC) AS close
+    FROM ticks WHERE ts < ?
+) AS raw
+GROUP BY bucket, symbol
+ON CONFLICT (symbol, ts) DO UPDATE SET
+    high = {greatest}(ticks_1m.high, excluded.high), low = {least}(ticks_1m.low, excluded.low),
+    close = excluded.close, volume = ticks_1m.volume + excluded.volume, n = ticks_1m.n + excluded.n
+"""
+
+_DOWNSAMPLE_INDICATORS = """
+INSERT INTO indicators_1m (ts, symbol, name, value, n)
+SELECT {bucket} AS bucket, symbol, name, AVG(value), COUNT(*)
+FROM indicators WHERE ts < ?
+GROUP BY bucket, symbol, name
+ON CONFLICT (symbol, name, ts) DO UPDATE SET
+    value = (indicators_1m.value * indicators_1m.n + excluded.value * excluded.n) / (indicators_1m.n + excluded.n),
+    n = indicators_1m.n + excluded.n
+"""
+
+ROWS_WRITTEN = Counter("nija_timeseries_rows_written_total", "Rows written to the time-series sink", ["table"])
+ROWS_DROPPED = Counter("nija_timeseries_rows_dropped_total", "Rows dropped because the sink fell behind", ["table"])
+
+
+# -------------------
+# SINKS
+# -------------------
+class SqliteSink:
+    """
+    SQLite time-series store (WAL). One connection, shared by the recorder's flush and
+    maintenance threads (and readers): a lock serializes write / maintain / query, so
+    their transactions never interleave.
+    """
+    name = "sqlite"
+    dialect = {"bucket": "CAST(ts / {b} AS INTEGER) * {b}", "greatest": "MAX", "least": "MIN"}
+
+    def __init__(self, path="nija_timeseries.db", retention=None, downsample_after=DOWNSAMPLE_AFTER_SEC,
+                 bucket_sec=DOWNSAMPLE_BUCKET_SEC):
+        self.path = path
+        self.retention = dict(RETENTION_SEC if retention is None else retention)
+        self.downsample_after = downsample_after
+        self.bucket_sec = bucket_sec
+        self._db = self._connect(path)
+        self._lock = threading.Lock()
+        self._inserts = {t: "INSERT INTO %s (%s) VALUES (%s)" % (t, ", ".join(cols), ", ".join("?" * len(cols)))
+                         for t, cols in TABLES.items()}
+        sql = dict(self.dialect, bucket=self.dialect["bucket"].format(b=bucket_sec))
+        self._downsample = [(_DOWNSAMPLE_TICKS.format(**sql), "ticks"),
+                            (_DOWNSAMPLE_INDICATORS.format(**sql), "indicators")]
+
+    def _connect(self, path):
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(_SCHEMA)
+        return db
+
+    def _transaction(self):
+        return self._db
+
+    def _delete(self, table, before):
+        return self._db.execute("DELETE FROM %s WHERE ts < ?" % table, (before,)).rowcount
+
+    def write(self, table, rows):
+        """One transaction per batch."""
+        with self._lock, self._transaction():
+            self._db.executemany(self._inserts[table], rows)
+
+    def maintain(self, now=None):
+        """Downsample old raw rows, then apply retention. Returns {table: rows deleted}."""
+        now = time.time() if now is None else now
+        deleted = {}
+        with self._lock:
+            if self.downsample_after is not None:
+                # whole buckets only
+                cutoff = int((now - self.downsample_after) // self.bucket_sec) * self.bucket_sec
+                with self._transaction():
+                    for sql, table in self._downsample:
+                        self._db.execute(sql, (cutoff,))
+                        deleted[table] = self._delete(table, cutoff)
+            with self._transaction():
+                for table, keep in self.retention.items():
+                    if keep is not None:
+                        deleted[table] = deleted.get(table, 0) + self._delete(table, now - keep)
+        return deleted
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class DuckDbSink(SqliteSink):
+    """DuckDB file (columnar, faster analytical scans). Requires the optional duckdb package."""
+    name = "duckdb"
+    dialect = {"bucket": "CAST(FLOOR(ts / {b}) AS BIGINT) * {b}", "greatest": "GREATEST", "least": "LEAST"}
+
+    def _connect(self, path):
+        import duckdb
+        db = duckdb.connect(path)
+        for stmt in _SCHEMA.split(";"):
+            if stmt.strip():
+                db.execute(stmt)
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        self._db.execute("BEGIN TRANSACTION")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def _delete(self, table, before):
+        row = self._db.execute("DELETE FROM %s WHERE ts < ?" % table, (before,)).fetchone()
+        return row[0] if row else 0
+
+
+def open_sink(url=TSDB_URL):
+    """Sink for "sqlite:<path>" / "duckdb:<path>"; None for "none" / ""."""
+    kind, _, path = (url or "none").partition(":")
+    if kind in ("none", "off", ""):
+        return None
+    if kind == "sqlite":
+        return SqliteSink(path or "nija_timeseries.db")
+    if kind == "duckdb":
+        return DuckDbSink(path or "nija_timeseries.duckdb")
+    raise ValueError("unknown time-series sink %r (sqlite:<path> | duckdb:<path> | none)" % url)
+
+
+# -------------------
+# RECORDER
+# -------------------
+class TimeSeriesRecorder:
+    def __init__(self, sink, batch_rows=BATCH_ROWS, flush_sec=FLUSH_SEC, max_rows=MAX_BUFFERED_ROWS):
+        self.sink = sink
+        self.batch_rows = batch_rows
+        self.flush_sec = flush_sec
+        self._buffers = {t: deque(maxlen=max_rows) for t in TABLES}
+        self._depth = QUEUE_DEPTH.labels("timeseries_rows")
+
+    # -------------------
+    # RECORD (loop thread, O(1), no I/O)
+    # -------------------
+    def _put(self, table, row):
+        buf = self._buffers[table]
+        if len(buf) == buf.maxlen:
+            ROWS_DROPPED.labels(table).inc()
+        buf.append(row)
+
+    def tick(self, symbol, price, size=None, ts=None):
+        self._put("ticks", (time.time() if ts is None else ts, symbol, float(price), size))
+
+    def indicator(self, symbol, name, value, ts=None):
+        self._put("indicators", (time.time() if ts is None else ts, symbol, name,
+                                 None if value is None else float(value)))
+
+    def indicators(self, symbol, values, ts=None):
+        ts = time.time() if ts is None else ts
+        for name, value in values.items():
+            self.indicator(symbol, name, value, ts)
+
+    def signal(self, symbol, side, signal_type, risk_pct=None, price=None, ts=None):
+        self._put("signals", (time.time() if ts is None else ts, symbol, side, signal_type, risk_pct, price))
+
+    def order(self, payload, status, notes="", ts=None):
+        """An engine order payload (product_id / side / size / meta) and its outcome."""
+        meta = payload.get("meta", {})
+        self._put("orders", (time.time() if ts is None else ts, payload.get("product_id"), payload.get("side"),
+                             float(payload.get("size") or 0), meta.get("entry_price"), meta.get("signal_type"),
+                             status, payload.get("idempotency_key"), notes))
+
+    def equity(self, source, balance, ts=None):
+        self._put("equity", (time.time() if ts is None else ts, source, float(balance)))
+
+    def pending(self):
+        return sum(len(b) for b in self._buffers.values())
+
+    # -------------------
+    # FLUSH (worker thread)
+    # -------------------
+    def flush(self):
+        """Blocking: write everything buffered so far; returns the number of rows written."""
+        written = 0
+        for table, buf in self._buffers.items():
+            n = len(buf)
+            if not n:
+                continue
+            rows = [buf.popleft() for _ in range(n)]      # appends racing this drain stay for the next flush
+            try:
+                self.sink.write(table, rows)
+            except Exception as e:
+                ROWS_DROPPED.labels(table).inc(n)
+                logger.warning("time-series write of %d %s rows failed: %s", n, table, e)
+                continue
+            ROWS_WRITTEN.labels(table).inc(n)
+            written += n
+        self._depth.set(self.pending())
+        return written
+
+    async def flush_forever(self):
+        waited = 0.0
+        step = min(0.25, self.flush_sec)
+        while True:
+            await asyncio.sleep(step)
+            waited += step
+            if waited >= self.flush_sec or self.pending() >= self.batch_rows:
+                waited = 0.0
+                await asyncio.to_thread(self.flush)
+
+    async def maintain_forever(self, interval=MAINTAIN_SEC):
+        while True:
+            try:
+                deleted = await asyncio.to_thread(self.sink.maintain)
+                if deleted and any(deleted.values()):
+                    logger.info("time-series maintenance removed %s", deleted)
+            except Exception as e:
+                logger.warning("time-series maintenance failed: %s", e)
+            await asyncio.sleep(interval)
+
+    async def sample_forever(self, source, fn, interval=EQUITY_SAMPLE_SEC):
+        """Record equity(source, fn()) every interval; fn is blocking and runs in a worker thread."""
+        while True:
+            try:
+                self.equity(source, await asyncio.to_thread(fn))
+            except Exception as e:
+                logger.warning("equity sample for %s failed: %s", source, e)
+            await asyncio.sleep(interval)
+
+    def background_tasks(self):
+        return [self.flush_forever(), self.maintain_forever()]
+
+    def close(self):
+        self.flush()
+        self.sink.close()
+
+
+def recorder_from_env(url=TSDB_URL):
+    """TimeSeriesRecorder on the NIJA_TSDB sink, or None when it is disabled."""
+    sink = open_sink(url)
+    return TimeSeriesRecorder(sink) if sink is not None else None
@@ -10,10 +10,12 @@ Docs examples: coinbase-advanced-py README / SDK quickstart.
 """
 
 import os
-import math
 import time
 from json import dumps
 from coinbase.rest import RESTClient   # official SDK
+from nija_portfolio import service_for, USD_CURRENCIES
+from nija_products import catalog_for, FALLBACK_BASE_INCREMENT, floor_to
+from nija_price_cache import price_cache_for
 
 # ---------- CONFIG ----------
 DRY_RUN = True            # True => won't submit orders. Set False to enable live submits.
@@ -21,12 +23,8 @@ MIN_PCT = 0.02            # 2%
 MAX_PCT = 0.10            # 10%
 MIN_TRADE_USD = 1.00      # floor in USD (adjust to actual pair minimums)
 FEE_BUFFER = 0.005        # 0.5% safety buffer
-PRICE_PRECISION = 2       # cents
-ASSET_PRECISION = {
-    "BTC-USD": 8,
-    "ETH-USD": 6,
-    "DEFAULT": 6
-}
+PRICE_MAX_AGE_SEC = 2.0   # get_price() reuses a cached price up to this old
+PRICE_PRECISION = 2       # cents (used when the product's quote_increment is unknown)
 # Place your API creds in env vars for safety
 API_KEY = os.getenv("COINBASE_API_KEY")        # e.g. "organizations/{org_id}/apiKeys/{key_id}"
 API_SECRET = os.getenv("COINBASE_API_SECRET")  # the full PEM private key text string
@@ -39,51 +37,38 @@ def init_client():
     client = RESTClient(api_key=API_KEY, api_secret=API_SECRET)
     return client
 
-def get_usd_equity(client):
+def get_usd_equity(client, include_non_usd=True):
     """
-    Uses client.get_accounts() to sum USD/USDC available balances.
-    Returns a float (USD-equivalent available).
+    USD-equivalent available equity from the shared portfolio snapshot
+    (one paginated bulk get_accounts(), normalized once - see nija_portfolio).
+    Non-USD assets are valued with cached bulk prices unless include_non_usd=False.
+    Returns a float.
     """
-    accounts = client.get_accounts()  # returns a custom response object
-    # convert to dict/list for safe access
-    acc_list = accounts.to_dict().get("accounts", []) if hasattr(accounts, "to_dict") else accounts
-    usd_equity = 0.0
-    for a in acc_list:
-        currency = a.get("currency") or a.get("asset") or a.get("code")
-        # available balance field may be 'available_balance' or 'available'
-        # the SDK uses structures; use defensive parsing:
-        avail = None
-        if "available_balance" in a and isinstance(a["available_balance"], dict):
-            avail = a["available_balance"].get("value")
-        elif "available" in a:
-            avail = a.get("available")
-        elif "balance" in a and isinstance(a["balance"], dict):
-            avail = a["balance"].get("value")
-        elif "balance" in a:
-            avail = a.get("balance")
-        if avail is None:
-            continue
-        try:
-            bal = float(avail)
-        except Exception:
-            # if nested structure with string, try to extract
-            try:
-                bal = float(str(avail))
-            except Exception:
-                bal = 0.0
-        if currency in ("USD", "USDC", "USD-C"):
-            usd_equity += bal
-        # NOTE: we ignore non-USD assets for now; could convert via product prices if desired
-    return usd_equity
+    snap = service_for(client).snapshot()
+    if include_non_usd:
+        return snap.usd_equity()
+    return sum(snap.available(c) for c in USD_CURRENCIES)
 
-def compute_trade_size(account_equity, desired_pct, min_trade=MIN_TRADE_USD, fee_buffer=FEE_BUFFER):
+def compute_trade_size(account_equity, desired_pct, min_trade=MIN_TRADE_USD, fee_buffer=FEE_BUFFER, product=None):
+    """
+    USD amount to trade. With a catalog `product` (nija_products.Product) the
+    floor is raised to the product's quote_min_size, the amount is capped at
+    quote_max_size and floored to quote_increment.
+    """
     pct = max(MIN_PCT, min(MAX_PCT, desired_pct))
     raw = account_equity * pct
     raw_after_fees = raw * (1.0 - fee_buffer)
+    if product is None:
+        final = max(raw_after_fees, min_trade)
+        return round(final, PRICE_PRECISION)
+    if product.quote_min_size:
+        min_trade = max(min_trade, float(product.quote_min_size))
     final = max(raw_after_fees, min_trade)
-    return round(final, PRICE_PRECISION)
+    if product.quote_max_size:
+        final = min(final, float(product.quote_max_size))
+    return float(product.floor_quote(final))
 
-def get_price(client, product_id):
+def _fetch_product_price(client, product_id):
     """
     Use client.get_product(product_id) to get product.price
     Returns float price (USD per base unit).
@@ -95,26 +80,39 @@ def get_price(client, product_id):
     p = product.to_dict() if hasattr(product, "to_dict") else product
     return float(p.get("price") or p.get("last") or 0.0)
 
-def usd_to_base_amount(usd_amount, price, product_id):
-    precision = ASSET_PRECISION.get(product_id, ASSET_PRECISION["DEFAULT"])
+def get_price(client, product_id, max_age=PRICE_MAX_AGE_SEC):
+    """
+    Price from the shared last-price cache (nija_price_cache) if it is at most
+    max_age seconds old; otherwise one get_product() call shared by concurrent callers.
+    """
+    cache = price_cache_for(client, fetch=lambda pid: _fetch_product_price(client, pid))
+    return cache.get(product_id, max_age)
+
+def usd_to_base_amount(usd_amount, price, product_id, client=None):
     base_amount = usd_amount / price if price > 0 else 0.0
-    # floor to avoid buying more than quote_size worth
-    rounded = math.floor(base_amount * (10 ** precision)) / (10 ** precision)
-    return rounded
+    # floor to the product's base_increment to avoid buying more than quote_size worth
+    if client is None:
+        return float(floor_to(base_amount, FALLBACK_BASE_INCREMENT))
+    return catalog_for(client).floor_base(product_id, base_amount)
 
 def build_and_submit_order(client, product_id, side, trade_usd, prefer_quote=True, order_type="market", client_order_id=""):
     """
     prefer_quote=True uses quote_size (spend USD); otherwise converts to base size.
     Uses official SDK methods: market_order_buy / market_order_sell or generic create_order wrapper.
     """
+    products = catalog_for(client)
     if prefer_quote and order_type == "market" and side.lower() == "buy":
         # SDK helper for a market buy using quote_size
+        quote_size = products.floor_quote(product_id, trade_usd)
         payload = {
             "client_order_id": client_order_id or "",
             "product_id": product_id,
-            "quote_size": str(round(trade_usd, PRICE_PRECISION))
+            "quote_size": str(quote_size)
         }
         print("[NIJA] Prepared market buy (quote_size):", payload)
+        reason = products.check(product_id, quote_size=quote_size)
+        if reason:
+            return {"status": "rejected", "reason": reason, "payload": payload}
         if DRY_RUN:
             return {"status":"dry_run", "payload": payload}
         # submit using market_order_buy
@@ -122,13 +120,16 @@ def build_and_submit_order(client, product_id, side, trade_usd, prefer_quote=Tru
     else:
         # convert to base size and place a market order via market_order()
         price = get_price(client, product_id)
-        base_size = usd_to_base_amount(trade_usd, price, product_id)
+        base_size = usd_to_base_amount(trade_usd, price, product_id, client)
         payload = {
             "client_order_id": client_order_id or "",
             "product_id": product_id,
-            "base_size": str(base_size)
+            "base_size": products.base_size(product_id, base_size)   # plain decimal string
         }
         print("[NIJA] Prepared market buy/sell (base_size):", payload)
+        reason = products.check(product_id, base_size=base_size)
+        if reason:
+            return {"status": "rejected", "reason": reason, "payload": payload}
         if DRY_RUN:
             return {"status":"dry_run", "payload": payload}
         if order_type == "market":
@@ -143,7 +144,7 @@ def build_and_submit_order(client, product_id, side, trade_usd, prefer_quote=Tru
                 "client_order_id": client_order_id or "",
                 "product_id": product_id,
                 "order_configuration": {
-                    "market_order": {"quote_size": str(round(trade_usd, PRICE_PRECISION))}
+                    "market_order": {"quote_size": str(products.floor_quote(product_id, trade_usd))}
                 }
             }
             resp = client.create_order(ord_req)  # may need adjustment per SDK shape
@@ -177,7 +178,7 @@ if __name__ == "__main__":
 
     # Example: try a 5% allocation on BTC-USD
     desired_pct = 0.05
-    trade_usd = compute_trade_size(equity, desired_pct)
+    trade_usd = compute_trade_size(equity, desired_pct, product=catalog_for(client).get("BTC-USD"))
     print(f"Computed trade size for {int(desired_pct*100)}% -> ${trade_usd:.2f}")
 
     # Build and submit (or dry-run) a market buy for BTC-USD
@@ -0,0 +1,204 @@
+# nija_trade_history.py
+"""
+NIJA: indexed trade history (SQLite, WAL mode)
+Replaces the trade_history.json file that was rewritten in full on every
+trade. Each entry is one INSERT, each exit one UPDATE, both committed in
+WAL mode (appends to the log, no full-file rewrite).
+
+Per-symbol win/loss counters (and the last closed trade's profit) live in
+a `symbol_stats` table that is updated in the same transaction as the
+exit, and are mirrored in memory, so stats(symbol) is an O(1) dict
+lookup instead of a scan over the symbol's history.
+
+A legacy trade_history.json is imported once, the first time the
+database is created.
+
+Usage:
+    history = TradeHistory()
+    entry = history.save_entry("BTC-USD", "buy", 0.001, 67000.0)
+    history.close_entry(entry["id"], 67500.0)
+    history.stats("BTC-USD")   # {"wins": 1, "losses": 0, "last_profit_percent": 0.746...}
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+# ---------- CONFIG ----------
+TRADE_HISTORY_DB = os.getenv("NIJA_TRADE_HISTORY_DB", "trade_history.db")
+LEGACY_HISTORY_FILE = "trade_history.json"
+# ----------------------------
+
+_COLUMNS = ("id", "symbol", "side", "amount", "entry_price", "entry_ts", "exit_price", "exit_ts",
+            "profit_percent", "market_type", "note")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    amount REAL NOT NULL,
+    entry_price REAL,
+    entry_ts INTEGER NOT NULL,
+    exit_price REAL,
+    exit_ts INTEGER,
+    profit_percent REAL,
+    market_type TEXT,
+    note TEXT
+);
+CREATE INDEX IF NOT EXISTS trades_symbol_ts ON trades (symbol, entry_ts);
+CREATE TABLE IF NOT EXISTS model_state (
+    name TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_ts INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbol_stats (
+    symbol TEXT PRIMARY KEY,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    last_profit_percent REAL
+);
+"""
+
+
+def profit_percent(side, entry_price, exit_price):
+    """Signed % return of a closed trade (short entries profit when the price falls)."""
+    if not entry_price or exit_price is None:
+        return None
+    pct = (float(exit_price) - float(entry_price)) / float(entry_price) * 100.0
+    return pct if side == "buy" else -pct
+
+
+class TradeHistory:
+    def __init__(self, path=TRADE_HISTORY_DB, legacy_file=LEGACY_HISTORY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        empty = self._db.execute("SELECT 1 FROM trades LIMIT 1").fetchone() is None
+        if empty and legacy_file and os.path.exists(legacy_file):
+            self._import_legacy(legacy_file)
+        self._stats = {r["symbol"]: dict(r) for r in self._db.execute("SELECT * FROM symbol_stats")}
+        for s in self._stats.values():
+            s.pop("symbol")
+
+    def _import_legacy(self, legacy_file):
+        try:
+            with open(legacy_file) as f:
+                legacy = json.load(f)
+        except Exception as e:
+            print("⚠️ Could not import legacy trade history:", e)
+            return
+        with self._db:
+            for symbol, entries in legacy.items():
+                for e in entries:
+                    row = dict(e, symbol=symbol, id="%s-%s" % (e.get("id", "entry"), uuid.uuid4().hex[:6]))
+                    self._db.execute("INSERT INTO trades VALUES (%s)" % ",".join("?" * len(_COLUMNS)),
+                                     [row.get(c) for c in _COLUMNS])
+            self._db.execute("""
+                INSERT OR REPLACE INTO symbol_stats (symbol, wins, losses, last_profit_percent)
+                SELECT symbol,
+                       SUM(profit_percent > 0), SUM(profit_percent < 0),
+                       (SELECT t2.profit_percent FROM trades t2
+                        WHERE t2.symbol = t.symbol AND t2.profit_percent IS NOT NULL
+                        ORDER BY t2.exit_ts DESC, t2.rowid DESC LIMIT 1)
+                FROM trades t WHERE profit_percent IS NOT NULL GROUP BY symbol
+            """)
+        print(f"📥 Imported legacy trade history from {legacy_file}")
+
+    # -------------------
+    # WRITES
+    # -------------------
+    def save_entry(self, symbol, side, amount, entry_price, market_type="spot", note="simulated"):
+        """O(1): one INSERT."""
+        now = int(time.time())
+        entry = {
+            "id": "entry-%d-%s" % (now, uuid.uuid4().hex[:6]),
+            "side": side,
+            "amount": float(amount),
+            "entry_price": float(entry_price) if entry_price is not None else None,
+            "entry_ts": now,
+            "exit_price": None,
+            "exit_ts": None,
+            "profit_percent": None,
+            "market_type": market_type,
+            "note": note,
+        }
+        row = dict(entry, symbol=symbol)
+        with self._lock, self._db:
+            self._db.execute("INSERT INTO trades VALUES (%s)" % ",".join("?" * len(_COLUMNS)),
+                             [row[c] for c in _COLUMNS])
+        return entry
+
+    def close_entry(self, entry_id, exit_price):
+        """
+        Record the exit of an entry and update its symbol's counters (one transaction).
+        Returns the closed row, or None if the entry is unknown or already closed.
+        """
+        with self._lock, self._db:
+            row = self._db.execute("SELECT * FROM trades WHERE id = ?", (entry_id,)).fetchone()
+            if row is None or row["exit_ts"] is not None:
+                return None
+            pct = profit_percent(row["side"], row["entry_price"], exit_price)
+            now = int(time.time())
+            self._db.execute("UPDATE trades SET exit_price = ?, exit_ts = ?, profit_percent = ? WHERE id = ?",
+                             (float(exit_price), now, pct, entry_id))
+            stats = self._stats.setdefault(row["symbol"], {"wins": 0, "losses": 0, "last_profit_percent": None})
+            if pct is not None:
+                won, lost = int(pct > 0), int(pct < 0)
+                self._db.execute("""
+                    INSERT INTO symbol_stats (symbol, wins, losses, last_profit_percent) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(symbol) DO UPDATE SET wins = wins + excluded.wins,
+                        losses = losses + excluded.losses, last_profit_percent = excluded.last_profit_percent
+                """, (row["symbol"], won, lost, pct))
+                stats["wins"] += won
+                stats["losses"] += lost
+                stats["last_profit_percent"] = pct
+        out = dict(row)
+        out.update(exit_price=float(exit_price), exit_ts=now, profit_percent=pct)
+        return out
+
+    # -------------------
+    # READS
+    # -------------------
+    def stats(self, symbol):
+        """O(1): {"wins", "losses", "last_profit_percent"} for symbol (zeros if it never closed a trade)."""
+        return self._stats.get(symbol) or {"wins": 0, "losses": 0, "last_profit_percent": None}
+
+    def entries(self, symbol, limit=100):
+        """Most recent entries for symbol (newest first), via the (symbol, entry_ts) index."""
+        rows = self._db.execute("SELECT * FROM trades WHERE symbol = ? ORDER BY entry_ts DESC, rowid DESC LIMIT ?",
+                                (symbol, limit)).fetchall()
+        return [dict(r) for r in rows]
+
+    def open_entries(self, symbol):
+        rows = self._db.execute("SELECT * FROM trades WHERE symbol = ? AND exit_ts IS NULL ORDER BY entry_ts",
+                                (symbol,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def closed_trades(self):
+        """(symbol, fractional return) for every closed trade, in exit order (for replays/backtests)."""
+        rows = self._db.execute("SELECT symbol, profit_percent FROM trades WHERE profit_percent IS NOT NULL "
+                                "ORDER BY exit_ts, rowid")
+        for r in rows:
+            yield r["symbol"], r["profit_percent"] / 100.0
+
+    def save_state(self, name, state):
+        """Persist a small JSON-able model snapshot under name."""
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO model_state VALUES (?, ?, ?)",
+                             (name, json.dumps(state), int(time.time())))
+
+    def load_state(self, name):
+        row = self._db.execute("SELECT state FROM model_state WHERE name = ?", (name,)).fetchone()
+        return json.loads(row["state"]) if row else None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
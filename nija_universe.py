@@ -0,0 +1,112 @@
+# nija_universe.py
+"""
+NIJA: dynamic symbol universe
+Keeps the set of traded products in line with a ranking source (the
+nija_ai_scan scanner, a liquidity list, ...) while the bot runs:
+
+  - new products are pre-warmed (indicator windows filled) BEFORE their
+    trade loop starts, so they never trade on an empty window
+  - dropped products are drained: their loop keeps running so exits are
+    still managed, and is cancelled once they are flat
+  - at most `max_symbols` loops run at once
+
+Usage:
+    universe = UniverseManager(trade_symbol, prewarm=..., is_busy=...)
+    await universe.set_ranking(["BTC-USD", "ETH-USD", ...])   # best first
+"""
+
+import os
+import asyncio
+import logging
+
+logger = logging.getLogger("nija")
+
+# ---------- CONFIG ----------
+MAX_ACTIVE_SYMBOLS = int(os.getenv("MAX_ACTIVE_SYMBOLS", "10"))
+PREWARM_CONCURRENCY = 4
+# ----------------------------
+
+
+class UniverseManager:
+    def __init__(self, run_symbol, max_symbols=MAX_ACTIVE_SYMBOLS, prewarm=None, is_busy=None, on_change=None):
+        """
+        run_symbol(symbol, prewarmed) -> coroutine running the symbol's loop
+        prewarm(symbol)               -> awaitable returning warm state (passed to run_symbol)
+        is_busy(symbol)               -> True while the symbol still has open positions
+        on_change(active_symbols)     -> called after every add/remove
+        """
+        self.run_symbol = run_symbol
+        self.max_symbols = max_symbols
+        self.prewarm = prewarm
+        self.is_busy = is_busy or (lambda s: False)
+        self.on_change = on_change
+        self.tasks = {}          # symbol -> asyncio.Task
+        self.draining = set()    # removed from ranking, waiting to go flat
+        self._lock = asyncio.Lock()
+        self._warm_sem = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+    def symbols(self):
+        return list(self.tasks)
+
+    async def _start(self, symbol):
+        prewarmed = None
+        if self.prewarm is not None:
+            async with self._warm_sem:
+                try:
+                    prewarmed = await self.prewarm(symbol)
+                except Exception as e:
+                    logger.warning("universe: prewarm %s failed: %s", symbol, e)
+        self.tasks[symbol] = asyncio.create_task(self.run_symbol(symbol, prewarmed))
+        logger.info("universe: +%s (%d active)", symbol, len(self.tasks))
+
+    def _stop(self, symbol):
+        task = self.tasks.pop(symbol, None)
+        self.draining.discard(symbol)
+        if task is not None:
+            task.cancel()
+            logger.info("universe: -%s (%d active)", symbol, len(self.tasks))
+
+    async def set_ranking(self, ranked):
+        """Apply a new ranking (best first)."""
+        async with self._lock:
+            desired = []
+            for s in ranked:
+                if s not in desired:
+                    desired.append(s)
+                if len(desired) >= self.max_symbols:
+                    break
+            wanted = set(desired)
+
+            # drop / drain symbols that fell out of the ranking
+            for s in list(self.tasks):
+                if s in wanted:
+                    self.draining.discard(s)
+                elif self.is_busy(s):
+                    self.draining.add(s)
+                else:
+                    self._stop(s)
+
+            # add new symbols while capacity allows (draining ones still hold a slot)
+            free = self.max_symbols - len(self.tasks)
+            new = [s for s in desired if s not in self.tasks][:max(0, free)]
+            if new:
+                await asyncio.gather(*(self._start(s) for s in new))
+        if self.on_change is not None:
+            self.on_change(self.symbols())
+
+    async def reap_forever(self, interval=10):
+        """Cancel drained symbols once they are flat; restart loops that died."""
+        while True:
+            await asyncio.sleep(interval)
+            changed = False
+            async with self._lock:
+                for s in list(self.draining):
+                    if not self.is_busy(s):
+                        self._stop(s)
+                        changed = True
+                for s, task in list(self.tasks.items()):
+                    if task.done() and not task.cancelled():
+                        logger.warning("universe: %s loop exited (%s) - restarting", s, task.exception())
+                        self.tasks[s] = asyncio.create_task(self.run_symbol(s, None))
+            if changed and self.on_change is not None:
+                self.on_change(self.symbols())
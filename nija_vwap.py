@@ -0,0 +1,197 @@
+# nija_vwap.py
+"""
+NIJA: volume-weighted average price from matched trades
+calculate_vwap() in the bots was the mean of the last N ticker samples
+(volume assumed to be 1). VwapTracker computes the real thing from
+trade-level volume, per symbol, with running sums so every trade is O(1):
+
+    session VWAP   anchored at the start of the UTC day (sums reset on rollover)
+    rolling VWAP   over the last ROLLING_WINDOW_SEC (expired trades subtracted)
+
+For both, sum(p*v), sum(v) and sum(p*p*v) give the VWAP and the
+volume-weighted standard deviation, hence the bands vwap +/- k*std.
+
+TradeFeed polls the exchange's matched trades for a set of symbols and
+pushes only the new ones to any sink with on_trade(symbol, price, size, ts)
+(a VwapTracker, a nija_bars.BarAggregator, ...):
+
+    vwap = VwapTracker()
+    feed = TradeFeed(client, SYMBOLS, [vwap, bars])
+    asyncio.create_task(feed.poll_forever())
+    vwap.bands("BTC-USD", k=2)     # (lower, vwap, upper) or None
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+
+from nija_metrics import Counter
+from nija_exchange import exchange_for
+
+logger = logging.getLogger("nija")
+
+# ---------- CONFIG ----------
+ROLLING_WINDOW_SEC = 15 * 60
+SESSION_SEC = 86400            # session = UTC day
+TRADE_POLL_SEC = 2.0
+TRADE_POLL_LIMIT = 100
+# ----------------------------
+
+TRADES_INGESTED = Counter("nija_trades_ingested_total", "Matched trades fed to VWAP/bar sinks", ["symbol"])
+
+
+class _Sums:
+    __slots__ = ("pv", "v", "ppv")
+
+    def __init__(self):
+        self.pv = self.v = self.ppv = 0.0
+
+    def add(self, price, size):
+        self.pv += price * size
+        self.v += size
+        self.ppv += price * price * size
+
+    def sub(self, price, size):
+        self.pv -= price * size
+        self.v -= size
+        self.ppv -= price * price * size
+
+    def vwap_std(self):
+        if self.v <= 0:
+            return None
+        vwap = self.pv / self.v
+        var = self.ppv / self.v - vwap * vwap
+        return vwap, (var if var > 0 else 0.0) ** 0.5
+
+
+class _SymbolVwap:
+    __slots__ = ("session_start", "session", "rolling", "window")
+
+    def __init__(self):
+        self.session_start = None
+        self.session = _Sums()
+        self.rolling = _Sums()
+        self.window = deque()     # (ts, price, size) inside the rolling window
+
+
+class VwapTracker:
+    def __init__(self, window_sec=ROLLING_WINDOW_SEC, session_sec=SESSION_SEC):
+        self.window_sec = window_sec
+        self.session_sec = session_sec
+        self._symbols = {}
+        self._lock = threading.Lock()     # fed from the trade feed's worker thread
+
+    def on_trade(self, symbol, price, size, ts=None):
+        """Fold one matched trade in. O(1) amortized (each trade is added and expired once)."""
+        size = float(size)
+        if size <= 0:
+            return
+        price = float(price)
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            s = self._symbols.get(symbol)
+            if s is None:
+                s = self._symbols[symbol] = _SymbolVwap()
+
+            start = int(ts // self.session_sec) * self.session_sec
+            if s.session_start is None or start > s.session_start:
+                s.session_start = start
+                s.session = _Sums()
+            s.session.add(price, size)
+
+            s.window.append((ts, price, size))
+            s.rolling.add(price, size)
+            self._expire(s, ts)
+
+    def _expire(self, s, now):
+        cutoff = now - self.window_sec
+        window = s.window
+        while window and window[0][0] < cutoff:
+            _, p, v = window.popleft()
+            s.rolling.sub(p, v)
+        if not window:
+            s.rolling = _Sums()      # drop accumulated float drift
+
+    # -------------------
+    # READS
+    # -------------------
+    def session(self, symbol):
+        """(vwap, std) since the session anchor, or None without trades."""
+        s = self._symbols.get(symbol)
+        if s is None:
+            return None
+        with self._lock:
+            return s.session.vwap_std()
+
+    def rolling(self, symbol, now=None):
+        """(vwap, std) over the rolling window, or None without trades in it."""
+        s = self._symbols.get(symbol)
+        if s is None:
+            return None
+        with self._lock:
+            self._expire(s, time.time() if now is None else now)
+            return s.rolling.vwap_std()
+
+    def vwap(self, symbol, kind="rolling"):
+        stats = self.rolling(symbol) if kind == "rolling" else self.session(symbol)
+        return stats[0] if stats else None
+
+    def bands(self, symbol, k=2.0, kind="rolling"):
+        """(lower, vwap, upper) = vwap -/+ k * std, or None."""
+        stats = self.rolling(symbol) if kind == "rolling" else self.session(symbol)
+        if not stats:
+            return None
+        vwap, std = stats
+        return vwap - k * std, vwap, vwap + k * std
+
+    def volume(self, symbol, kind="rolling"):
+        s = self._symbols.get(symbol)
+        if s is None:
+            return 0.0
+        return s.rolling.v if kind == "rolling" else s.session.v
+
+
+# -------------------
+# MATCHED-TRADE FEED
+# -------------------
+def fetch_market_trades(client, symbol, limit=TRADE_POLL_LIMIT):
+    """Blocking: recent matched trades as [(trade_id, price, size, ts)], oldest first."""
+    trades = exchange_for(client).backend.market_trades(symbol, limit)
+    return [(t.trade_id, t.price, t.size, t.ts) for t in trades]
+
+
+class TradeFeed:
+    def __init__(self, client, symbols, sinks, interval=TRADE_POLL_SEC, fetch=fetch_market_trades):
+        self.client = client
+        self.symbols = symbols          # may be mutated in place (dynamic universe)
+        self.sinks = list(sinks)
+        self.interval = interval
+        self.fetch = fetch
+        self._last = {}                 # symbol -> (ts, ids seen at that ts)
+
+    def poll(self, symbol):
+        """Blocking: fetch recent trades and push the unseen ones to every sink. Returns how many."""
+        trades = self.fetch(self.client, symbol)
+        last_ts, seen = self._last.get(symbol, (None, set()))
+        new = [t for t in trades if last_ts is None or t[3] > last_ts or (t[3] == last_ts and t[0] not in seen)]
+        if not new:
+            return 0
+        top = new[-1][3]
+        ids = {t[0] for t in new if t[3] == top}
+        self._last[symbol] = (top, ids | seen if top == last_ts else ids)
+        for _, price, size, ts in new:
+            for sink in self.sinks:
+                sink.on_trade(symbol, price, size, ts)
+        TRADES_INGESTED.labels(symbol).inc(len(new))
+        return len(new)
+
+    async def poll_forever(self):
+        while True:
+            for symbol in list(self.symbols):
+                try:
+                    await asyncio.to_thread(self.poll, symbol)
+                except Exception as e:
+                    logger.warning("trade feed poll failed for %s: %s", symbol, e)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,52 @@
+# nija_warm_start.py
+"""
+NIJA: historical candle warm start for indicator windows
+Before a symbol starts trading, the closes of its most recent candles seed
+the strategy's RSI / VWAP (HfmtHighReturnStrategy.seed), so they are valid
+on the first tick instead of after RSI_PERIOD / VWAP_PERIOD blind ticks.
+The candles are kept apart from the tick window: HFMT and the volatility
+leverage only ever see real ticks, never a mix of 1m closes and 1s ticks.
+
+Candles come from the shared on-disk nija_candle_cache, which only asks
+the exchange for the candles it is missing. Each symbol loop warms itself
+as it starts, so all symbols sync concurrently (bounded by
+WARM_START_CONCURRENCY) in worker threads and the event loop never blocks
+on the REST calls.
+"""
+
+import os
+import asyncio
+import logging
+
+logger = logging.getLogger("nija")
+
+# ---------- CONFIG ----------
+WARM_START_GRANULARITY = os.getenv("WARM_START_GRANULARITY", "ONE_MINUTE")
+WARM_START_CONCURRENCY = 8
+# ----------------------------
+
+_semaphore = None
+_cache = None
+
+
+def candle_cache():
+    global _cache
+    if _cache is None:
+        from nija_candle_cache import CandleCache   # numpy is only imported once warm start runs
+        _cache = CandleCache()
+    return _cache
+
+
+async def warm_start_symbol(client, product_id, count, granularity=WARM_START_GRANULARITY):
+    """Closes of the last `count` candles for one symbol ([] on failure -> caller just starts cold)."""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(WARM_START_CONCURRENCY)
+    async with _semaphore:
+        try:
+            bars = await asyncio.to_thread(candle_cache().sync_recent, client, product_id, granularity, count)
+        except Exception as e:
+            logger.warning("warm start for %s failed: %s", product_id, e)
+            return []
+    return bars["close"].tolist()
+
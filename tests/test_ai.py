@@ -0,0 +1,28 @@
+import sys
+import types
+import importlib
+
+
+def import_nija_ai(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("COINBASE_SPOT_KEY", raising=False)
+    monkeypatch.setitem(sys.modules, "ccxt", types.ModuleType("ccxt"))
+    monkeypatch.delitem(sys.modules, "nija_ai", raising=False)
+    return importlib.import_module("nija_ai")
+
+
+def test_import_does_not_create_the_history_db(monkeypatch, tmp_path):
+    import_nija_ai(monkeypatch, tmp_path)
+    assert not (tmp_path / "trade_history.db").exists()
+
+
+def test_history_and_sizing_open_on_first_use(monkeypatch, tmp_path):
+    ai = import_nija_ai(monkeypatch, tmp_path)
+    assert not ai.history.loaded and not ai.sizing.loaded
+    result = ai.execute_trade("BTC-USD", "buy", 0.01, dry_run=True)
+    assert result["simulated"] and (tmp_path / "trade_history.db").exists()
+    entry = ai.save_entry("BTC-USD", "buy", 0.01, 100.0)
+    ai.close_entry(entry["id"], 110.0)
+    assert ai.sizing.loaded
+    assert ai.last_trade_profit_percent("BTC-USD") == 10.0
+    assert ai.ai_adjust_amount("BTC-USD", 1.0) > 1.0
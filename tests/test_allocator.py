@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from nija_allocator import PortfolioAllocator
+from nija_engine import PctSizing
+
+
+def fed(method="inverse_vol", ticks=60, seed=7):
+    alloc = PortfolioAllocator(["A", "B", "C"], window=100, method=method, min_obs=20)
+    rng = np.random.default_rng(seed)
+    prices = {"A": 100.0, "B": 100.0, "C": 100.0}
+    vols = {"A": 0.001, "B": 0.002, "C": 0.004}
+    for _ in range(ticks):
+        for s, v in vols.items():
+            prices[s] *= float(np.exp(rng.normal(0, v)))
+            alloc.update(s, prices[s])
+    return alloc
+
+
+def test_equal_weights_until_min_obs():
+    alloc = fed(ticks=5)
+    w = alloc.compute_weights()
+    assert w == pytest.approx([1 / 3] * 3)
+    assert alloc.weight("A") == pytest.approx(1.0)
+
+
+def test_inverse_vol_weights_sum_to_one_and_favour_calm_symbols():
+    alloc = fed()
+    weights = alloc.rebalance()
+    assert sum(weights.values()) == pytest.approx(1.0)
+    assert weights["A"] > weights["B"] > weights["C"]
+
+
+def test_risk_parity_weights_sum_to_one():
+    alloc = fed(method="risk_parity")
+    weights = alloc.rebalance()
+    assert sum(weights.values()) == pytest.approx(1.0)
+    assert weights["A"] > weights["C"]
+
+
+def test_weight_multiplier_has_mean_one():
+    alloc = fed()
+    alloc.rebalance()
+    mult = [alloc.weight(s) for s in alloc.symbols]
+    assert np.mean(mult) == pytest.approx(1.0)
+    assert alloc.weight("A") == pytest.approx(alloc.weights["A"] * 3)
+
+
+def test_pct_sizing_with_allocator_weights_is_not_clamped_to_min():
+    alloc = fed()
+    alloc.rebalance()
+    sizing = PctSizing(0.02, 0.10, weight=alloc.weight)
+    pcts = [sizing.allocation(s, 1000.0, 0.05, 1)[0] / 1000.0 for s in alloc.symbols]
+    assert pcts[0] > pcts[1] > pcts[2]
+    assert pcts[0] > 0.05 > pcts[2]
+    assert all(0.02 <= p <= 0.10 for p in pcts)
@@ -0,0 +1,69 @@
+from nija_bars import BarAggregator
+
+
+def agg():
+    return BarAggregator({"1m": 60, "5m": 300})
+
+
+def test_trades_bucket_into_ohlcv():
+    bars = agg()
+    bars.on_trade("BTC-USD", 100.0, 1.0, ts=60.0)
+    bars.on_trade("BTC-USD", 105.0, 2.0, ts=75.0)
+    bars.on_trade("BTC-USD", 98.0, 0.5, ts=119.9)
+    assert bars.current("BTC-USD", "1m") == [60, 100.0, 105.0, 98.0, 98.0, 3.5]
+    bars.on_trade("BTC-USD", 99.0, 1.0, ts=120.0)
+    closed = bars.bars("BTC-USD", "1m")
+    assert len(closed) == 1
+    assert closed[0]["ts"] == 60 and closed[0]["close"] == 98.0 and closed[0]["volume"] == 3.5
+    assert bars.current("BTC-USD", "5m") == [0, 100.0, 105.0, 98.0, 99.0, 4.5]
+
+
+def test_bar_close_events_per_timeframe():
+    bars = agg()
+    seen = []
+    bars.subscribe(lambda s, tf, bar: seen.append((s, tf, bar[0])), "1m")
+    bars.on_trade("ETH-USD", 10.0, 1.0, ts=0.0)
+    bars.on_trade("ETH-USD", 11.0, 1.0, ts=61.0)
+    bars.on_tick("ETH-USD", 12.0, ts=301.0)
+    assert seen == [("ETH-USD", "1m", 0), ("ETH-USD", "1m", 60)]
+
+
+def test_close_due_closes_ended_buckets_once():
+    bars = agg()
+    bars.on_trade("BTC-USD", 100.0, 1.0, ts=10.0)
+    assert bars.close_due(now=59.0) == 0
+    assert bars.close_due(now=60.0) == 1
+    assert bars.current("BTC-USD", "1m") is None
+    assert bars.close_due(now=61.0) == 0
+
+
+def test_late_trade_after_timer_close_does_not_duplicate_the_bar():
+    bars = agg()
+    bars.on_trade("BTC-USD", 100.0, 1.0, ts=10.0)
+    bars.close_due(now=60.5)
+    bars.on_trade("BTC-USD", 90.0, 1.0, ts=59.0)        # late: its 1m bucket already closed
+    assert bars.current("BTC-USD", "1m") is None
+    bars.on_trade("BTC-USD", 101.0, 1.0, ts=61.0)
+    bars.close_due(now=121.0)
+    ts = list(bars.bars("BTC-USD", "1m")["ts"])
+    assert ts == [0, 60]
+    assert bars.bars("BTC-USD", "1m")[0]["low"] == 100.0
+
+
+def test_late_trade_after_tick_close_is_dropped():
+    bars = agg()
+    bars.on_trade("BTC-USD", 100.0, 1.0, ts=10.0)
+    bars.on_trade("BTC-USD", 101.0, 1.0, ts=70.0)
+    bars.on_trade("BTC-USD", 50.0, 1.0, ts=20.0)
+    assert bars.current("BTC-USD", "1m") == [60, 101.0, 101.0, 101.0, 101.0, 1.0]
+    # the 5m bucket is still open, so the late trade is folded into it
+    assert bars.current("BTC-USD", "5m")[3] == 50.0
+
+
+def test_ring_keeps_the_last_capacity_bars_oldest_first():
+    bars = BarAggregator({"1s": 1}, capacity=3)
+    for i in range(6):
+        bars.on_trade("BTC-USD", 100.0 + i, 1.0, ts=float(i))
+    closes = list(bars.closes("BTC-USD", "1s"))
+    assert closes == [102.0, 103.0, 104.0]
+    assert list(bars.closes("BTC-USD", "1s", 2)) == [103.0, 104.0]
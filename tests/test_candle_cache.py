@@ -0,0 +1,66 @@
+import os
+import struct
+
+from nija_candle_cache import CANDLE_DTYPE, CandleCache, _to_records
+
+
+class FakeClient:
+    """get_candles over a synthetic 1m series: close == ts / 60."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_candles(self, product_id, start, end, granularity):
+        self.calls.append((int(start), int(end)))
+        return {"candles": [
+            {"start": str(ts), "open": ts / 60, "high": ts / 60 + 1, "low": ts / 60 - 1,
+             "close": ts / 60, "volume": 1.0}
+            for ts in range(int(start), int(end), 60)
+        ]}
+
+
+def test_record_layout_is_48_byte_little_endian():
+    assert CANDLE_DTYPE.itemsize == 48
+    rec = _to_records([{"start": "120", "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 3}])
+    assert rec.tobytes() == struct.pack("<q5d", 120, 1.0, 2.0, 0.5, 1.5, 3.0)
+
+
+def test_to_records_sorts_and_dedups():
+    c = lambda ts: {"start": ts, "open": 1, "high": 1, "low": 1, "close": ts, "volume": 0}
+    rec = _to_records([c(180), c(60), c(180), c(120)])
+    assert list(rec["ts"]) == [60, 120, 180]
+
+
+def test_sync_fetches_only_the_missing_tail(tmp_path):
+    cache = CandleCache(str(tmp_path))
+    client = FakeClient()
+    assert cache.sync(client, "BTC-USD", "ONE_MINUTE", 0, 600) == 10
+    client.calls.clear()
+    assert cache.sync(client, "BTC-USD", "ONE_MINUTE", 0, 900) == 5
+    assert client.calls == [(540, 900)]        # refetches the possibly partial last candle
+    assert list(cache.range("BTC-USD", "ONE_MINUTE", 300, 420)["ts"]) == [300, 360]
+    assert cache.bounds("BTC-USD", "ONE_MINUTE") == (0, 840)
+
+
+def test_sync_prepends_older_history(tmp_path):
+    cache = CandleCache(str(tmp_path))
+    client = FakeClient()
+    cache.sync(client, "BTC-USD", "ONE_MINUTE", 600, 900)
+    assert cache.sync(client, "BTC-USD", "ONE_MINUTE", 300, 900) == 5
+    assert list(cache.data("BTC-USD", "ONE_MINUTE")["ts"]) == list(range(300, 900, 60))
+
+
+def test_torn_trailing_record_is_truncated_before_append(tmp_path):
+    cache = CandleCache(str(tmp_path))
+    client = FakeClient()
+    cache.sync(client, "BTC-USD", "ONE_MINUTE", 0, 300)
+    path = os.path.join(str(tmp_path), "BTC-USD_ONE_MINUTE.bin")
+    with open(path, "ab") as f:
+        f.write(b"\x01" * 20)                  # interrupted append
+    fresh = CandleCache(str(tmp_path))
+    assert len(fresh.data("BTC-USD", "ONE_MINUTE")) == 5
+    assert os.path.getsize(path) == 5 * CANDLE_DTYPE.itemsize
+    fresh.sync(client, "BTC-USD", "ONE_MINUTE", 0, 600)
+    arr = fresh.data("BTC-USD", "ONE_MINUTE")
+    assert list(arr["ts"]) == list(range(0, 600, 60))
+    assert list(arr["close"]) == [ts / 60 for ts in range(0, 600, 60)]
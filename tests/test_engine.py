@@ -0,0 +1,212 @@
+import asyncio
+
+import pytest
+
+from nija_engine import HfmtHighReturnStrategy, PctSizing, FixedLeverage, StopTakeTrailingExits, trade_pnl
+
+
+def trade(side, size, entry, leverage=1):
+    return {"side": side, "size": str(size), "meta": {"entry_price": entry, "max_price": entry, "leverage": leverage,
+                                                        "risk_pct": 0.02}}
+
+
+def test_trade_pnl_counts_leverage_once():
+    # 100 USD at 5x -> 500 USD notional -> size 5 at 100; a 1% move is 5 USD, not 25
+    assert trade_pnl(trade("buy", 5, 100.0, leverage=5), 101.0) == pytest.approx(5.0)
+    assert trade_pnl(trade("sell", 5, 100.0, leverage=5), 101.0) == pytest.approx(-5.0)
+
+
+def test_pct_sizing_leverage_scales_allocation():
+    sizing = PctSizing(0.02, 0.10, leverage=FixedLeverage(3))
+    base, leveraged = sizing.allocation("BTC-USD", 1000.0, 0.05, sizing.leverage(1000.0, []))
+    assert base == pytest.approx(50.0) and leveraged == pytest.approx(150.0)
+
+
+def test_stop_take_trailing_exits():
+    fixed = StopTakeTrailingExits(0.05, 0.07, trailing_stop=False)
+    assert fixed.check(trade("buy", 1, 100.0), 94.9) == "stop_loss"
+    assert fixed.check(trade("sell", 1, 100.0), 105.1) == "stop_loss"
+    assert fixed.check(trade("buy", 1, 100.0), 107.1) == "take_profit"
+    exits = StopTakeTrailingExits(0.05, 0.07, True, 0.03)
+    t = trade("buy", 1, 100.0)
+    assert exits.check(t, 106.0) is None
+    assert exits.check(t, 102.5) == "trailing_stop"
+
+
+def test_seeded_closes_feed_rsi_until_the_tick_window_fills():
+    strategy = HfmtHighReturnStrategy(rsi_period=14, vwap_period=20)
+    strategy.seed("BTC-USD", [100.0 - i for i in range(30)])     # falling 1m closes: RSI 0
+    assert strategy.signal("BTC-USD", [70.0]) == ("buy", 0.1, "HighReturn")
+    assert strategy.hf_micro_trade_signal([70.0]) is None       # HFMT waits for two real ticks
+    ticks = [100.0, 100.1] * 10                                  # flat ticks: RSI 50, no signal
+    assert strategy.signal("BTC-USD", ticks) is None and "BTC-USD" not in strategy.seeded
+
+
+class FakeClient:
+    """Legacy-shaped client: get_ticker for prices, place_market_order for orders."""
+
+    def __init__(self, price=100.0):
+        self.price = price
+        self.sent = []
+
+    def get_ticker(self, symbol):
+        return {"price": str(self.price)}
+
+    def place_market_order(self, payload):
+        self.sent.append(dict(payload))
+        return {"order_id": "o%d" % len(self.sent), "status": "OPEN"}
+
+
+class OnceStrategy:
+    def __init__(self, decision):
+        self.decision = decision
+
+    def signal(self, symbol, price_data):
+        decision, self.decision = self.decision, None
+        return decision
+
+
+class NullJournal:
+    def __init__(self):
+        self.rows = []
+
+    def record(self, payload, status, balance, pnl=0, notes=""):
+        self.rows.append((payload["side"], status, pnl, notes))
+
+    def flush(self):
+        pass
+
+    async def flush_forever(self):
+        pass
+
+
+def hooked_engine(client, strategy, **kw):
+    from nija_engine import EngineConfig, SimulatedBalance, TradingEngine
+    config = kw.pop("config", None) or EngineConfig("t", ["BTC-USD"], tick_sec=0.01, timeseries=False,
+                                                    coalesce_window_sec=kw.pop("coalesce", 0.0))
+    return TradingEngine(client, config, strategy, PctSizing(), exits=StopTakeTrailingExits(),
+                         balance=SimulatedBalance(1000.0), journal=NullJournal(), **kw)
+
+
+def test_coalesced_entries_are_tracked_and_repriced_with_fills():
+    from nija_order_tracker import OrderTracker
+    client = FakeClient()
+    engine = hooked_engine(client, OnceStrategy(("buy", 0.05, "T")), coalesce=0.01, tracker=OrderTracker())
+
+    async def main():
+        engine.coalescer.bind()
+        engine.tracker.bind()
+        open_trades = engine.open_trades.setdefault("BTC-USD", [])
+        await engine._open_trade("BTC-USD", open_trades, 100.0, 1000.0, [100.0])
+        assert open_trades == []                           # still inside the coalescing window
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if open_trades:
+                break
+        key = client.sent[0]["idempotency_key"]
+        engine.tracker.apply_update({"client_order_id": key, "status": "FILLED", "filled_size": "0.4",
+                                     "average_filled_price": "101"})
+        await asyncio.sleep(0.01)
+        return open_trades
+
+    open_trades = asyncio.run(main())
+    assert len(open_trades) == 1
+    assert open_trades[0]["meta"]["entry_price"] == 101.0 and float(open_trades[0]["size"]) == 0.4
+    assert engine.journal.rows == [("buy", "success", 0, "")]
+
+
+def test_rejected_entry_drops_the_position_but_unknown_keeps_it():
+    from nija_order_tracker import OrderTracker
+    client = FakeClient()
+    engine = hooked_engine(client, OnceStrategy(("buy", 0.05, "T")), tracker=OrderTracker())
+
+    async def main():
+        open_trades = engine.open_trades.setdefault("BTC-USD", [])
+        await engine._open_trade("BTC-USD", open_trades, 100.0, 1000.0, [100.0])
+        key = client.sent[0]["idempotency_key"]
+        engine.tracker.apply_update({"client_order_id": key, "status": "UNKNOWN"})
+        kept = len(open_trades)
+        engine.tracker.apply_update({"client_order_id": key, "status": "CANCELLED"})
+        return kept, open_trades
+
+    kept, open_trades = asyncio.run(main())
+    assert kept == 1 and open_trades == []
+
+
+def test_state_is_restored_and_short_windows_are_warm_started(tmp_path):
+    from nija_engine import EngineConfig
+    from nija_state_store import StateStore
+    store = StateStore(str(tmp_path))
+    trade_payload = trade("buy", 1, 100.0)
+    store.register("BTC-USD", lambda: {"price_data": [99.0], "open_trades": [trade_payload]})
+    store.checkpoint()
+
+    async def warm(symbol):
+        return [float(i) for i in range(50)]
+
+    config = EngineConfig("t", ["BTC-USD"], max_ticks=30, timeseries=False, warm_min_ticks=10)
+    strategy = HfmtHighReturnStrategy(rsi_period=14, vwap_period=20)
+    engine = hooked_engine(FakeClient(), strategy, config=config, state=StateStore(str(tmp_path)), warm=warm)
+    price_data, open_trades = asyncio.run(engine._restore("BTC-USD", None))
+    assert price_data == [99.0]                          # candle closes never enter the tick window
+    assert strategy.seeded["BTC-USD"] == [float(i) for i in range(30, 50)]
+    assert open_trades == [trade_payload] and engine.open_trades["BTC-USD"] is open_trades
+    assert "BTC-USD" in engine.state_store._providers
+
+
+def test_trade_loop_exits_and_checkpoints(tmp_path):
+    from nija_state_store import StateStore
+    client = FakeClient(price=90.0)                        # 10% under the entry: trailing stop
+    store = StateStore(str(tmp_path))
+    engine = hooked_engine(client, OnceStrategy(None), state=store)
+    engine.open_trades["BTC-USD"] = [trade("buy", 1, 100.0)]
+
+    async def main():
+        task = asyncio.create_task(engine.trade_symbol("BTC-USD"))
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if client.sent:
+                break
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+    engine.close()
+    assert client.sent[0]["side"] == "sell"
+    assert engine.open_trades["BTC-USD"] == []
+    assert engine.journal.rows[0][1:] == ("success", pytest.approx(-10.0), "trailing_stop")
+    state, _ = StateStore(str(tmp_path)).restore("BTC-USD")
+    assert state["open_trades"] == [] and state["price_data"][0] == 90.0
+
+
+class FakeRouter:
+    """ExecutionScheduler stand-in filling every parent at 101."""
+
+    def __init__(self, fill_ratio=1.0):
+        self.fill_ratio = fill_ratio
+        self.parents = []
+
+    async def execute(self, symbol, side, size, algo="auto", duration=None, parent_id=None):
+        from types import SimpleNamespace
+        self.parents.append((symbol, side, size, algo))
+        return SimpleNamespace(filled=size * self.fill_ratio, avg_price=101.0, status="DONE", error=None)
+
+
+def test_routed_parents_go_through_the_risk_hook():
+    from nija_risk import RiskConfig, RiskEngine, RiskGate
+    risk = RiskEngine(RiskConfig(max_order_usd=100.0))
+    router = FakeRouter(fill_ratio=0.5)
+    engine = hooked_engine(FakeClient(), OnceStrategy(None), router=router, risk=RiskGate(risk))
+
+    def payload(side, size):
+        return {"product_id": "BTC-USD", "side": side, "size": str(size), "idempotency_key": "k-%s" % side,
+                "meta": {"entry_price": 100.0, "max_price": 100.0}}
+
+    with pytest.raises(RuntimeError, match="max_order_exceeded"):
+        asyncio.run(engine.execute(payload("buy", 2), "auto"))
+    assert router.parents == []                          # refused before anything was routed
+    asyncio.run(engine.execute(payload("buy", 0.8), "auto"))
+    assert risk.positions["BTC-USD"] == pytest.approx((0.4, 101.0))   # booked what filled, not what was asked
+    risk.update_config(kill_switch=True)
+    with pytest.raises(RuntimeError, match="kill_switch"):
+        asyncio.run(engine.execute(payload("sell", 0.4), "auto"))
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from nija_engine import EngineConfig, PctSizing, TradingEngine
+from nija_exchange import Exchange, LegacyBackend, UnsupportedOperation, backend_for_client
+from nija_execution import REQUIRED_OPERATIONS
+
+
+class LegacyClient:
+    def get_ticker(self, symbol):
+        return {"price": "100.0"}
+
+    def place_market_order(self, payload):
+        return {"order_id": "o1", "status": "FILLED"}
+
+
+class RestClient:
+    def get_product(self, symbol):
+        return {"price": "100.0"}
+
+
+def test_legacy_backend_reports_its_operations():
+    ex = Exchange(backend_for_client(LegacyClient()))
+    assert isinstance(ex.backend, LegacyBackend)
+    assert ex.supports("ticker", "market_order")
+    assert not ex.supports(*REQUIRED_OPERATIONS)
+    with pytest.raises(UnsupportedOperation, match="book"):
+        ex.require(*REQUIRED_OPERATIONS)
+
+
+def test_unsupported_calls_raise_unsupported_operation():
+    legacy = backend_for_client(LegacyClient())
+    with pytest.raises(UnsupportedOperation):
+        legacy.book("BTC-USD")
+    with pytest.raises(UnsupportedOperation):
+        legacy.cancel_order("o1", symbol="BTC-USD")
+    # a missing client method on a full backend is the same error (and still a NotImplementedError)
+    rest = backend_for_client(RestClient())
+    with pytest.raises(NotImplementedError):
+        rest.book("BTC-USD")
+    assert rest.ticker("BTC-USD").price == 100.0
+
+
+class NullJournal:
+    def flush(self):
+        pass
+
+    async def flush_forever(self):
+        pass
+
+
+def test_smart_execution_refuses_a_legacy_client_at_startup():
+    config = EngineConfig("t", ["BTC-USD"], execution="smart", timeseries=False)
+    engine = TradingEngine(LegacyClient(), config, strategy=None, sizing=PctSizing(), journal=NullJournal())
+    with pytest.raises(UnsupportedOperation):
+        asyncio.run(engine.run())
+    assert engine.router is None
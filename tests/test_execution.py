@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+
+import nija_execution as ne
+from nija_exchange import Book, Order
+from nija_order_tracker import FILLED
+
+
+def book(mid=100.0, size=1.0, levels=20, tick=0.01):
+    return Book("BTC-USD", [(round(mid - tick * (i + 1), 2), size) for i in range(levels)],
+                [(round(mid + tick * (i + 1), 2), size) for i in range(levels)])
+
+
+class FakeExchange:
+    """Resting orders never fill; IOC / market orders fill in full at the touch."""
+
+    def __init__(self, get_order_error=None, rest_order_id="r1"):
+        self.get_order_error = get_order_error
+        self.rest_order_id = rest_order_id
+        self.cancelled = []
+        self.get_calls = []
+        self.live = {}
+
+    async def book(self, symbol, depth=50):
+        return book()
+
+    async def limit_order(self, symbol, side, size, price, post_only=False, ioc=False, client_order_id=None):
+        size = float(size)
+        if ioc:
+            return Order("i-" + client_order_id, client_order_id, symbol, side, size, FILLED, size, float(price))
+        o = Order(self.rest_order_id, client_order_id, symbol, side, size, "OPEN", 0.0, None)
+        self.live[o.order_id] = o
+        return o
+
+    async def market_order(self, symbol, side, base_size=None, quote_size=None, client_order_id=None):
+        size = float(base_size)
+        return Order("m-" + client_order_id, client_order_id, symbol, side, size, FILLED, size, 100.0)
+
+    async def get_order(self, order_id, symbol=None):
+        self.get_calls.append((order_id, symbol))
+        if order_id is None:
+            raise AssertionError("get_order(None)")
+        if self.get_order_error is not None:
+            raise self.get_order_error
+        return self.live[order_id]
+
+    async def cancel_order(self, order_id, symbol=None):
+        self.cancelled.append((order_id, symbol))
+        self.live[order_id].status = "CANCELLED"
+        return True
+
+
+class LateFillExchange(FakeExchange):
+    """IOC orders are acknowledged NEW; the fill shows up one poll after the first get_order."""
+
+    def __init__(self, polls_until_fill=1):
+        super().__init__()
+        self.polls_until_fill = polls_until_fill
+        self.iocs = []
+
+    async def limit_order(self, symbol, side, size, price, post_only=False, ioc=False, client_order_id=None):
+        if not ioc:
+            return await super().limit_order(symbol, side, size, price, post_only, ioc, client_order_id)
+        size = float(size)
+        o = Order("i-" + client_order_id, client_order_id, symbol, side, size, "NEW", 0.0, None)
+        self.iocs.append(o)
+        self.live[o.order_id] = (o, [self.polls_until_fill], float(price))
+        return o
+
+    async def get_order(self, order_id, symbol=None):
+        self.get_calls.append((order_id, symbol))
+        o, left, price = self.live[order_id]
+        if left[0] > 0:
+            left[0] -= 1
+            return Order(o.order_id, o.client_order_id, symbol, o.side, o.size, "NEW", 0.0, None)
+        return Order(o.order_id, o.client_order_id, symbol, o.side, o.size, FILLED, o.size, price)
+
+
+@pytest.fixture(autouse=True)
+def fast_chase(monkeypatch):
+    monkeypatch.setattr(ne, "CHASE_INTERVAL_SEC", 0.01)
+    monkeypatch.setattr(ne, "SETTLE_POLL_SEC", 0.01)
+
+
+async def run_parent(ex, *args, **kwargs):
+    router = ne.ExecutionScheduler(ex)
+    runner = asyncio.create_task(router.run())
+    try:
+        return await asyncio.wait_for(router.execute(*args, **kwargs), 5)
+    finally:
+        runner.cancel()
+
+
+def test_resting_child_is_cancelled_when_polling_fails():
+    ex = FakeExchange(get_order_error=ConnectionError("timeout"))
+    parent = asyncio.run(run_parent(ex, "BTC-USD", "buy", 0.5, algo="passive"))
+    assert parent.status == ne.FAILED and "timeout" in parent.error
+    assert ex.cancelled == [("r1", "BTC-USD")]          # not left live on the exchange
+
+
+def test_resting_child_without_order_id_is_not_watched():
+    ex = FakeExchange(rest_order_id=None)
+    parent = asyncio.run(run_parent(ex, "BTC-USD", "buy", 0.5, algo="passive"))
+    assert ex.get_calls == [] and ex.cancelled == []
+    assert parent.status == ne.FAILED and "no order id" in parent.error
+
+
+def test_order_calls_pass_the_symbol():
+    ex = FakeExchange()
+    parent = asyncio.run(run_parent(ex, "BTC-USD", "buy", 0.5, algo="passive", duration=0.05))
+    assert ex.get_calls and all(sym == "BTC-USD" for _, sym in ex.get_calls)
+    assert ex.cancelled and all(sym == "BTC-USD" for _, sym in ex.cancelled)
+    # the resting child never filled and was cancelled; the remainder went out as IOC at the deadline
+    assert parent.status == ne.DONE and parent.filled == pytest.approx(0.5)
+
+
+def test_ioc_parent_fills():
+    parent = asyncio.run(run_parent(FakeExchange(), "BTC-USD", "sell", 3.0, algo="ioc"))
+    assert parent.status == ne.DONE and parent.filled == pytest.approx(3.0)
+
+
+def test_ioc_fill_reported_late_is_not_resent():
+    ex = LateFillExchange(polls_until_fill=1)
+    parent = asyncio.run(run_parent(ex, "BTC-USD", "buy", 2.0, algo="ioc"))
+    assert len(ex.iocs) == 1 and len(ex.get_calls) == 2
+    assert parent.status == ne.DONE and parent.filled == pytest.approx(2.0)
+
+
+def test_unsettled_ioc_stops_the_parent(monkeypatch):
+    monkeypatch.setattr(ne, "SETTLE_TIMEOUT_SEC", 0.05)
+    ex = LateFillExchange(polls_until_fill=10 ** 6)
+    parent = asyncio.run(run_parent(ex, "BTC-USD", "buy", 2.0, algo="ioc"))
+    assert len(ex.iocs) == 1                            # never re-sent while the first may still fill
+    assert parent.status == ne.FAILED and "not settled" in parent.error
+
+
+def test_plan_slices_sum_to_size():
+    for algo in ("auto", "twap", "vwap"):
+        slices = ne.plan_slices(10.0, algo, book(), "buy", 60, profile=lambda n: range(1, n + 1))
+        assert sum(s for _, s in slices) == pytest.approx(10.0)
+        assert [o for o, _ in slices] == sorted(o for o, _ in slices)
+
+
+def test_decide_rests_when_too_big_or_spread_wide():
+    assert ne.decide(book(), "buy", 0.1) == "cross"
+    assert ne.decide(book(), "buy", 100.0) == "rest"
+    wide = Book("X", [(99.0, 5.0)], [(101.0, 5.0)])
+    assert ne.decide(wide, "buy", 0.1) == "rest"
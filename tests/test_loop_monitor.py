@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+from nija_loop_monitor import LoopWatchdog
+
+
+def blocking_call(seconds):
+    time.sleep(seconds)
+
+
+def test_stall_is_charged_to_the_blocking_call_site():
+    watchdog = LoopWatchdog(threshold=0.05, interval=0.01, sample_interval=0.005)
+
+    async def main():
+        task = asyncio.create_task(watchdog.run())
+        await asyncio.sleep(0.05)
+        blocking_call(0.2)
+        await asyncio.sleep(0.1)                # let the sampler see the beat resume
+        task.cancel()
+
+    asyncio.run(main())
+    worst = watchdog.worst(1)
+    assert worst and "test_loop_monitor.py" in worst[0]["site"] and "blocking_call" in worst[0]["site"]
+    assert worst[0]["count"] == 1 and 0.15 <= worst[0]["max_s"] < 1.0
+    assert watchdog.max_lag >= 0.15
+
+
+def test_short_pauses_are_not_stalls():
+    watchdog = LoopWatchdog(threshold=0.2, interval=0.01, sample_interval=0.005)
+
+    async def main():
+        task = asyncio.create_task(watchdog.run())
+        for _ in range(5):
+            blocking_call(0.02)
+            await asyncio.sleep(0.02)
+        task.cancel()
+
+    asyncio.run(main())
+    assert watchdog.worst() == []
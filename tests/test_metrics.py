@@ -0,0 +1,70 @@
+import pytest
+
+import nija_metrics as nm
+
+
+class HTTPError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__("HTTP %d" % status)
+        self.response = type("Response", (), {"status_code": status, "headers": headers or {}})()
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+def wait_count(endpoint):
+    return nm.RATE_LIMIT_WAIT.labels(endpoint).snapshot()[2]
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(nm, "RATE_LIMIT_BACKOFF_SEC", 0.001)
+
+
+def test_rate_limited_calls_are_retried_and_their_waits_recorded():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise HTTPError(429, {"Retry-After": "0.002"})
+        if len(calls) == 2:
+            raise RateLimitExceeded("ccxt")
+        return "ok"
+
+    assert nm.exchange_call("t_retry", flaky) == "ok"
+    assert len(calls) == 3 and wait_count("t_retry") == 2
+
+
+def test_other_errors_and_exhausted_retries_raise(monkeypatch):
+    monkeypatch.setattr(nm, "RATE_LIMIT_RETRIES", 2)
+
+    def down():
+        raise HTTPError(500)
+
+    with pytest.raises(HTTPError):
+        nm.exchange_call("t_down", down)
+    assert wait_count("t_down") == 0
+
+    def limited():
+        raise HTTPError(429)
+
+    with pytest.raises(HTTPError):
+        nm.exchange_call("t_limited", limited)
+    assert wait_count("t_limited") == 2
+
+
+def test_client_side_throttle_is_timed_once():
+    class Exchange:
+        def __init__(self):
+            self.throttled = 0
+
+        def throttle(self, cost=None):
+            self.throttled += 1
+
+    ex = Exchange()
+    nm.time_waits(ex, "throttle", "t_throttle")
+    nm.time_waits(ex, "throttle", "t_throttle")         # a second backend over the same client
+    ex.throttle(1)
+    assert ex.throttled == 1 and wait_count("t_throttle") == 1
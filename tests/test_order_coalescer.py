@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from nija_order_coalescer import OrderCoalescer
+
+
+def intent(side, size, key, pid="BTC-USD"):
+    return {"product_id": pid, "side": side, "size": str(size), "idempotency_key": key,
+            "meta": {"signal_type": key}}
+
+
+def run(intents, submit_fn=None, size_fn=None):
+    sent = []
+
+    async def main():
+        co = OrderCoalescer(submit_fn or (lambda p: sent.append(p) or {"order_id": "o1"}), window=60,
+                            size_fn=size_fn)
+        futs = [co.submit(p) for p in intents]
+        await co.flush_all()
+        return [f.result() for f in futs]
+
+    return asyncio.run(main()), sent
+
+
+def test_opposite_intents_are_netted_into_one_order():
+    results, sent = run([intent("buy", 1.0, "a"), intent("buy", 0.5, "b"), intent("sell", 0.6, "c")])
+    assert len(sent) == 1
+    assert sent[0]["side"] == "buy" and float(sent[0]["size"]) == pytest.approx(0.9)
+    assert sent[0]["idempotency_key"] not in ("a", "b", "c")
+    assert [r["status"] for r in results] == ["sent", "sent", "netted"]
+    assert results[0]["fill_ratio"] == pytest.approx(0.9 / 1.5)
+    assert results[2]["fill_ratio"] == 0.0
+    assert [a["idempotency_key"] for a in sent[0]["meta"]["coalesced"]] == ["a", "b", "c"]
+    assert sent[0]["meta"]["signal_type"] == "b"     # newest winning-side intent carries the meta
+
+
+def test_intents_that_cancel_out_send_nothing():
+    results, sent = run([intent("buy", 0.3, "a"), intent("sell", 0.1, "b"), intent("sell", 0.2, "c")])
+    assert sent == []
+    assert {r["status"] for r in results} == {"netted"}
+    assert results[0]["order"] is None
+
+
+def test_products_are_netted_separately_and_size_fn_formats():
+    results, sent = run([intent("buy", 1, "a"), intent("sell", 2, "b", pid="ETH-USD")],
+                        size_fn=lambda pid, size: "%.2f" % size)
+    assert sorted((p["product_id"], p["side"], p["size"]) for p in sent) == [
+        ("BTC-USD", "buy", "1.00"), ("ETH-USD", "sell", "2.00")]
+
+
+def test_submit_error_is_reported_to_every_intent():
+    def boom(payload):
+        raise RuntimeError("exchange down")
+
+    results, _ = run([intent("buy", 1, "a"), intent("sell", 0.5, "b")], submit_fn=boom)
+    assert [r["status"] for r in results] == ["error", "error"]
+    assert results[0]["error"] == "exchange down"
+
+
+def test_timer_flushes_after_the_window():
+    sent = []
+
+    async def main():
+        co = OrderCoalescer(lambda p: sent.append(p), window=0.01)
+        fut = co.submit(intent("sell", 1, "a"))
+        return await asyncio.wait_for(fut, 2)
+
+    assert asyncio.run(main())["status"] == "sent"
+    assert len(sent) == 1
@@ -0,0 +1,77 @@
+import time
+
+import nija_order_tracker as ot
+from nija_order_tracker import OrderTracker, FILLED, OPEN, PARTIALLY_FILLED, REJECTED, UNKNOWN
+
+
+def payload(cid="c1", size="1.0"):
+    return {"idempotency_key": cid, "product_id": "BTC-USD", "side": "buy", "size": size}
+
+
+class Client:
+    def __init__(self, orders=()):
+        self.orders = list(orders)
+        self.calls = []
+
+    def list_orders(self, order_ids=None):
+        self.calls.append(order_ids)
+        if order_ids is None:
+            return {"orders": self.orders}
+        return {"orders": [o for o in self.orders if o.get("order_id") in order_ids]}
+
+
+def test_state_machine_partial_then_filled():
+    t = OrderTracker()
+    t.track(payload())
+    t.on_submit_response("c1", {"success": True, "success_response": {"order_id": "o1"}})
+    seen = []
+    t.on_update("c1", lambda o: seen.append((o.status, o.filled_size)))
+    t.apply_update({"order_id": "o1", "status": "OPEN", "filled_size": "0.4", "average_filled_price": "100"})
+    assert t.inflight["c1"].status == PARTIALLY_FILLED
+    t.apply_update({"order_id": "o1", "status": "FILLED", "filled_size": "1.0", "average_filled_price": "101"})
+    assert "c1" not in t.inflight
+    assert seen == [(PARTIALLY_FILLED, 0.4), (FILLED, 1.0)]
+    assert t.completed[-1].avg_fill_price == 101.0
+
+
+def test_submit_error_rejects():
+    t = OrderTracker()
+    t.track(payload())
+    t.on_submit_response("c1", error=RuntimeError("insufficient funds"))
+    assert t.completed[-1].status == REJECTED
+    assert "insufficient" in t.completed[-1].reason
+
+
+def test_missing_ack_is_resolved_by_client_order_id():
+    t = OrderTracker()
+    t.track(payload())
+    t.on_submit_response("c1", {})          # legacy client: no order id in the response
+    assert t.inflight["c1"].status == OPEN and t.inflight["c1"].order_id is None
+    client = Client([{"client_order_id": "c1", "order_id": "o9", "status": "FILLED", "filled_size": "1.0"}])
+    t.poll_once(client)
+    assert client.calls == [None]
+    assert t.completed[-1].status == FILLED and t.completed[-1].order_id == "o9"
+
+
+def test_missing_ack_times_out_to_unknown_not_rejected(monkeypatch):
+    t = OrderTracker()
+    t.track(payload())
+    t.on_submit_response("c1", {})
+    seen = []
+    t.on_update("c1", lambda o: seen.append(o.status))
+    t.inflight["c1"].created_ts = time.time() - ot.STALE_ORDER_SEC - 1
+    t.poll_once(Client())
+    assert t.inflight["c1"].status == UNKNOWN       # still tracked, never REJECTED
+    assert seen == [UNKNOWN]
+    # shows up later: resolves normally
+    t.poll_once(Client([{"client_order_id": "c1", "order_id": "o2", "status": "FILLED", "filled_size": "1"}]))
+    assert seen == [UNKNOWN, FILLED]
+
+
+def test_ws_message_updates_by_order_id():
+    t = OrderTracker()
+    t.track(payload())
+    t.on_submit_response("c1", {"order_id": "o1"})
+    t.handle_ws_message({"channel": "user", "events": [{"orders": [
+        {"order_id": "o1", "status": "CANCELLED", "cumulative_quantity": "0"}]}]})
+    assert t.completed[-1].status == "CANCELLED"
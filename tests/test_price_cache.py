@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from nija_price_cache import PriceCache
+
+
+class SlowFetch:
+    """fetch(symbol) that blocks until released, counting calls."""
+
+    def __init__(self, price=100.0, error=None):
+        self.price = price
+        self.error = error
+        self.calls = []
+        self.release = threading.Event()
+
+    def __call__(self, symbol):
+        self.calls.append(symbol)
+        assert self.release.wait(2)
+        if self.error is not None:
+            raise self.error
+        return self.price
+
+
+def wait_for_inflight(cache, symbol):
+    for _ in range(200):
+        if symbol in cache._inflight:
+            return
+        time.sleep(0.005)
+    raise AssertionError("no fetch in flight")
+
+
+def test_concurrent_misses_share_one_fetch():
+    fetch = SlowFetch()
+    cache = PriceCache(fetch)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("BTC-USD"))) for _ in range(5)]
+
+    async def loop_readers():
+        return await asyncio.gather(*(cache.aget("BTC-USD") for _ in range(3)))
+
+    for t in threads:
+        t.start()
+    wait_for_inflight(cache, "BTC-USD")
+    threading.Timer(0.05, fetch.release.set).start()
+    results.extend(asyncio.run(loop_readers()))
+    for t in threads:
+        t.join()
+    assert fetch.calls == ["BTC-USD"]
+    assert results == [100.0] * 8
+    assert cache.get("BTC-USD") == 100.0 and fetch.calls == ["BTC-USD"]   # fresh: a hit
+    assert cache._inflight == {}
+
+
+def test_a_failed_fetch_fails_every_waiter_once():
+    fetch = SlowFetch(error=ConnectionError("timeout"))
+    cache = PriceCache(fetch)
+    errors = []
+
+    def read():
+        try:
+            cache.get("ETH-USD")
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for t in threads:
+        t.start()
+    wait_for_inflight(cache, "ETH-USD")
+    time.sleep(0.05)
+    fetch.release.set()
+    for t in threads:
+        t.join()
+    assert len(errors) == 4 and len(fetch.calls) == 1
+    fetch.error = None
+    assert cache.get("ETH-USD") == 100.0 and len(fetch.calls) == 2      # the next miss fetches again
+
+
+def test_stale_prices_are_refetched():
+    fetch = SlowFetch(price=101.0)
+    fetch.release.set()
+    cache = PriceCache(fetch, max_age=2.0)
+    cache.put("BTC-USD", 100.0, ts=time.time() - 5)
+    assert cache.peek("BTC-USD") is None and cache.peek("BTC-USD", max_age=10) == 100.0
+    assert cache.get("BTC-USD") == pytest.approx(101.0) and fetch.calls == ["BTC-USD"]
@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from nija_products import ProductCatalog, floor_to
+
+
+class ProductsClient:
+    def __init__(self, products):
+        self.products = products
+        self.calls = 0
+
+    def get_products(self, get_all_products=False):
+        self.calls += 1
+        return {"products": self.products}
+
+
+def catalog():
+    return ProductCatalog(ProductsClient([
+        {"product_id": "BTC-USD", "base_increment": "0.00000001", "quote_increment": "0.01",
+         "base_min_size": "0.00001", "base_max_size": "3400", "quote_min_size": "1"},
+        {"product_id": "DOGE-USD", "base_increment": "0.1", "quote_increment": "0.00001"},
+        {"product_id": "XYZ-USD", "base_increment": "1", "status": "delisted"},
+    ]))
+
+
+def test_floor_to_never_rounds_up():
+    assert floor_to("0.123456789", Decimal("0.00000001")) == Decimal("0.12345678")
+    assert floor_to(0.3, Decimal("0.1")) == Decimal("0.3")              # no binary-float 0.29999
+    assert floor_to(-1, Decimal("0.01")) == Decimal("0.00")
+
+
+def test_floor_base_uses_each_products_increment():
+    cat = catalog()
+    assert cat.floor_base("BTC-USD", 0.123456789) == 0.12345678
+    assert cat.floor_base("DOGE-USD", 12.39) == 12.3
+    assert cat.base_size("DOGE-USD", 1e-7) == "0.0"
+    assert cat.base_size("BTC-USD", 1.5e-5) == "0.00001500"               # no exponent notation
+    assert cat.floor_base("NEW-USD", 1.123456789) == 1.12345678           # unlisted: 8-decimal fallback
+    assert cat.client.calls == 1                                           # one bulk load, then O(1) lookups
+
+
+def test_check_reports_what_the_exchange_would_reject():
+    cat = catalog()
+    assert cat.check("BTC-USD", base_size="0.00001") is None
+    assert "below minimum 0.00001" in cat.check("BTC-USD", base_size="0.000009")
+    assert "above maximum 3400" in cat.check("BTC-USD", base_size=Decimal("3400.00000001"))
+    assert "quote size 0.99 below minimum 1" in cat.check("BTC-USD", quote_size="0.99")
+    assert "not tradable" in cat.check("XYZ-USD", base_size="1")
+    assert cat.check("NEW-USD", base_size="0.000000001") is None          # unknown products pass
@@ -0,0 +1,42 @@
+import threading
+import time
+
+import pytest
+
+from nija_profiler import HARD_MAX_SEC, SamplingProfiler
+
+
+def busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_start_stop_collects_collapsed_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_worker, args=(stop,), name="busy")
+    worker.start()
+    prof = SamplingProfiler(interval=0.002)
+    try:
+        prof.start()
+        assert prof.running
+        with pytest.raises(RuntimeError, match="already running"):
+            prof.start()
+        time.sleep(0.1)
+        text = prof.stop()
+    finally:
+        stop.set()
+        worker.join()
+    assert not prof.running and prof.samples > 0 and prof.stopped_at is not None
+    lines = [line for line in text.splitlines() if line.startswith("busy;")]
+    assert lines and any("busy_worker (test_profiler.py:" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in text.splitlines())
+    assert "nija-profiler" not in text                  # never samples itself
+
+
+def test_sampling_stops_on_its_own_after_max_seconds():
+    prof = SamplingProfiler(interval=0.001, max_seconds=0.05)
+    prof.start()
+    time.sleep(0.2)
+    assert not prof.running and prof.summary()["stopped_at"] is not None
+    assert SamplingProfiler(max_seconds=10 * HARD_MAX_SEC).max_seconds == HARD_MAX_SEC
+    prof.stop()                                         # stopping a finished profiler is harmless
@@ -0,0 +1,128 @@
+import types
+import multiprocessing as mp
+
+import pytest
+
+import nija_sharded_runtime as rt
+from nija_risk import RiskEngine, RiskConfig
+
+
+def engine(**cfg):
+    return RiskEngine(RiskConfig(**dict({"max_order_usd": 1e9}, **cfg)))
+
+
+def test_max_order_and_kill_switch():
+    e = engine(max_order_usd=10)
+    assert e.check(10) == (True, None)
+    assert e.check(10.01) == (False, "max_order_exceeded")
+    e.update_config(kill_switch=True)
+    assert e.check(1) == (False, "kill_switch")
+
+
+def test_symbol_and_portfolio_exposure():
+    e = engine(max_symbol_exposure_usd=100, max_portfolio_exposure_usd=150)
+    e.record_order("BTC-USD", "buy", 90)
+    assert e.check(20, "BTC-USD", "buy") == (False, "symbol_exposure_limit")
+    assert e.check(20, "BTC-USD", "sell")[0]                 # reducing is always allowed
+    e.record_order("ETH-USD", "sell", 50)
+    assert e.open_notional == 140
+    assert e.check(20, "SOL-USD", "buy") == (False, "portfolio_exposure_limit")
+
+
+def test_order_rate_limit():
+    e = engine(max_orders_per_min=2)
+    e.record_order("A", "buy", 1)
+    e.record_order("A", "buy", 1)
+    assert e.check(1) == (False, "order_rate_limit")
+
+
+def test_record_fill_realizes_pnl_on_reduce_close_and_flip():
+    e = engine()
+    assert e.record_fill("BTC-USD", "buy", 2, 100) == 0
+    assert e.record_fill("BTC-USD", "buy", 2, 110) == 0
+    assert e.positions["BTC-USD"] == (4, 105)
+    assert e.record_fill("BTC-USD", "sell", 1, 95) == pytest.approx(-10)       # reduce
+    assert e.record_fill("BTC-USD", "sell", 5, 100) == pytest.approx(-15)      # close 3 @ -5, flip short 2
+    assert e.positions["BTC-USD"] == (-2, 100)
+    assert e.record_fill("BTC-USD", "buy", 2, 90) == pytest.approx(20)         # short closed in profit
+    assert e.positions["BTC-USD"][0] == 0
+    assert e.daily_pnl == pytest.approx(-5)
+
+
+def test_daily_loss_limit_triggers_from_fills():
+    e = engine(max_daily_loss_usd=25)
+    e.record_fill("ETH-USD", "buy", 10, 50)
+    assert e.check(1)[0]
+    e.record_fill("ETH-USD", "sell", 10, 47)                               # -30 realized
+    assert e.check(1) == (False, "daily_loss_limit")
+
+
+def test_exits_pass_every_check_but_the_kill_switch():
+    e = engine(max_daily_loss_usd=5, max_order_usd=50, max_orders_per_min=3)
+    e.record_fill("BTC-USD", "buy", 1, 100)
+    e.record_fill("ETH-USD", "buy", 1, 100)
+    e.record_fill("BTC-USD", "sell", 1, 90)                                # -10 realized
+    assert e.check(20, "SOL-USD", "buy") == (False, "daily_loss_limit")
+    assert e.check(95, "ETH-USD", "sell") == (True, None)                  # exit: shrinks +100 exposure
+    assert e.check(250, "ETH-USD", "sell") == (False, "max_order_exceeded")   # flips past the position
+    assert e.check(20, "SOL-USD", "buy", reduce_only=True) == (True, None)
+    e.update_config(kill_switch=True)
+    assert e.check(95, "ETH-USD", "sell") == (False, "kill_switch")
+
+
+def test_shard_guard_feeds_realized_pnl():
+    sent = []
+    bot = types.SimpleNamespace(client=types.SimpleNamespace(place_market_order=lambda p: sent.append(p)))
+    risk = rt.SharedRiskState(mp.get_context("spawn"), 1, ["BTC-USD", "ETH-USD"])
+    e = engine(max_daily_loss_usd=5)
+    rt._guard_client(bot, risk, e)
+    order = lambda side, price: {"product_id": "BTC-USD", "side": side, "size": "1", "meta": {"entry_price": price}}
+    bot.client.place_market_order(order("buy", 100))
+    bot.client.place_market_order(order("sell", 90))
+    assert e.daily_pnl == pytest.approx(-10)
+    with pytest.raises(RuntimeError, match="daily_loss_limit"):
+        bot.client.place_market_order(order("buy", 90))
+    assert len(sent) == 2
+
+
+def test_shard_exit_passes_after_daily_loss_limit():
+    sent = []
+    bot = types.SimpleNamespace(client=types.SimpleNamespace(place_market_order=lambda p: sent.append(p)))
+    risk = rt.SharedRiskState(mp.get_context("spawn"), 1, ["BTC-USD", "ETH-USD"])
+    e = engine(max_daily_loss_usd=5)
+    rt._guard_client(bot, risk, e)
+    order = lambda sym, side, price: {"product_id": sym, "side": side, "size": "1", "meta": {"entry_price": price}}
+    bot.client.place_market_order(order("ETH-USD", "buy", 100))
+    bot.client.place_market_order(order("BTC-USD", "buy", 100))
+    bot.client.place_market_order(order("BTC-USD", "sell", 90))      # -10 realized, limit 5
+    with pytest.raises(RuntimeError, match="daily_loss_limit"):
+        bot.client.place_market_order(order("BTC-USD", "buy", 90))
+    bot.client.place_market_order(order("ETH-USD", "sell", 95))      # stop-loss exit still goes out
+    assert e.positions["ETH-USD"][0] == 0
+    assert len(sent) == 4
+
+
+def test_update_config_coerces_admin_json():
+    e = engine()
+    cfg = e.update_config(kill_switch="off", live_order_enabled="true", max_order_usd="12.5", max_orders_per_min="30")
+    assert cfg.kill_switch is False and cfg.live_order_enabled is True
+    assert cfg.max_order_usd == 12.5 and cfg.max_orders_per_min == 30
+    assert e.check(1)[0]
+
+
+@pytest.mark.parametrize("changes", [
+    {"max_order_usd": "abc"},
+    {"max_order_usd": -1},
+    {"max_order_usd": float("nan")},
+    {"max_orders_per_min": 2.5},
+    {"kill_switch": "maybe"},
+    {"kill_switch": 2},
+    {"max_order_usd": True},
+    {"no_such_limit": 1},
+])
+def test_update_config_rejects_bad_values(changes):
+    e = engine()
+    before = e.config
+    with pytest.raises(ValueError):
+        e.update_config(**changes)
+    assert e.config is before
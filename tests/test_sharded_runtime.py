@@ -0,0 +1,151 @@
+import sys
+import time
+import queue
+import types
+import asyncio
+import multiprocessing as mp
+
+import pytest
+
+import nija_sharded_runtime as rt
+from nija_state_store import StateStore
+from nija_order_coalescer import OrderCoalescer
+
+
+def make_bot(tmp_path, sent):
+    bot = types.ModuleType("fake_shard_bot")
+    bot.client = types.SimpleNamespace(place_market_order=lambda p: sent.append(p) or {"order_id": "x"})
+    bot.state_store = StateStore(str(tmp_path))
+    bot.coalescer = OrderCoalescer(bot.client.place_market_order, window=60)   # only an explicit flush sends
+    bot.OPEN_TRADES = {}
+
+    async def trade_symbol(sym):
+        open_trades = bot.OPEN_TRADES.setdefault(sym, [])
+        bot.state_store.register(sym, lambda: {"open_trades": list(open_trades)})
+        payload = {"product_id": sym, "side": "buy", "size": "1", "idempotency_key": "k1", "meta": {}}
+        bot.coalescer.submit(payload).add_done_callback(lambda f: open_trades.append(payload))
+        while True:
+            await asyncio.sleep(0.01)
+
+    bot.trade_symbol = trade_symbol
+    return bot
+
+
+def test_hand_off_checkpoints_and_acks_before_add(tmp_path, monkeypatch):
+    monkeypatch.setattr(rt, "MONITOR_INTERVAL_SEC", 0.01)
+    sent = []
+    bot = make_bot(tmp_path, sent)
+    monkeypatch.setitem(sys.modules, "fake_shard_bot", bot)
+    commands, acks = queue.Queue(), queue.Queue()
+    risk = rt.SharedRiskState(mp.get_context("spawn"), 1, ["BTC-USD"])
+    config = {"max_order_usd": 1e9}
+
+    async def drive():
+        worker = asyncio.create_task(rt._worker_main(0, ["BTC-USD"], commands, acks, risk, "fake_shard_bot", config))
+        await asyncio.sleep(0.05)
+        commands.put(("remove", "BTC-USD"))
+        while acks.empty():
+            await asyncio.sleep(0.01)
+        commands.put(("stop", None))
+        await worker
+
+    asyncio.run(drive())
+    assert acks.get_nowait() == ("removed", 0, "BTC-USD")
+    assert len(sent) == 1                                   # the pending entry was flushed, not dropped
+    state, age = StateStore(str(tmp_path)).restore("BTC-USD")
+    assert age is not None and len(state["open_trades"]) == 1   # ...and is in the hand-off snapshot
+    assert "BTC-USD" not in bot.OPEN_TRADES
+
+
+def test_coordinator_adds_only_after_ack():
+    coord = rt.Coordinator(["A", "B", "C"], num_workers=2)
+    src = next(i for i, s in enumerate(coord.shards) if "A" in s)
+    dst = 1 - src
+    coord.move_symbol("A", src, dst)
+    assert coord.commands[src].get(timeout=5) == ("remove", "A")
+    assert coord.commands[dst].empty() and "A" not in coord.shards[dst]
+    coord.acks.put(("removed", src, "A"))
+    for _ in range(500):              # mp queues deliver through a feeder thread
+        coord.drain_acks()
+        if not coord.moving:
+            break
+        time.sleep(0.01)
+    assert coord.commands[dst].get(timeout=5) == ("add", "A")
+    assert "A" in coord.shards[dst] and not coord.moving
+
+
+def test_state_store_release_writes_clean_state(tmp_path):
+    store = StateStore(str(tmp_path))
+    store.register("ETH-USD", lambda: {"n": 7})
+    store.checkpoint()
+    store.register("ETH-USD", lambda: {"n": 8})
+    store._dirty.clear()                    # not dirty, still written on hand-off
+    assert store.release("ETH-USD")
+    assert StateStore(str(tmp_path)).restore("ETH-USD")[0] == {"n": 8}
+    assert not store.release("ETH-USD")
+
+
+def guarded_shard(shared, engine_config, fail=False):
+    def place(payload):
+        if fail:
+            raise ConnectionError("exchange down")
+        return {"order_id": "x"}
+    bot = types.SimpleNamespace(client=types.SimpleNamespace(place_market_order=place))
+    rt._guard_client(bot, shared, rt.RiskEngine(engine_config))
+    return bot.client.place_market_order
+
+
+def order(symbol, side, usd):
+    return {"product_id": symbol, "side": side, "size": "1", "meta": {"entry_price": usd}}
+
+
+def test_exposure_limits_are_global_across_shards():
+    config = rt.RiskConfig(max_order_usd=1e9, max_portfolio_exposure_usd=150, max_symbol_exposure_usd=100)
+    shared = rt.SharedRiskState(mp.get_context("spawn"), 2, ["BTC-USD", "ETH-USD", "SOL-USD"])
+    shard_a, shard_b = guarded_shard(shared, config), guarded_shard(shared, config)
+    shard_a(order("BTC-USD", "buy", 90))
+    shard_b(order("ETH-USD", "buy", 50))
+    with pytest.raises(RuntimeError, match="portfolio_exposure_limit"):
+        shard_b(order("SOL-USD", "buy", 20))        # each shard alone is under 150; together they are not
+    with pytest.raises(RuntimeError, match="symbol_exposure_limit"):
+        shard_b(order("BTC-USD", "buy", 20))        # BTC's exposure was built on the other shard
+    shard_b(order("BTC-USD", "sell", 40))            # reducing is allowed
+    assert shared.gross_exposure.value == pytest.approx(100)
+    assert shared.total_exposure.value == pytest.approx(100)
+
+
+def test_failed_order_releases_its_reservation():
+    config = rt.RiskConfig(max_order_usd=1e9, max_portfolio_exposure_usd=150)
+    shared = rt.SharedRiskState(mp.get_context("spawn"), 1, ["BTC-USD"])
+    with pytest.raises(ConnectionError):
+        guarded_shard(shared, config, fail=True)(order("BTC-USD", "buy", 100))
+    assert shared.gross_exposure.value == 0 and shared.symbol_exposure[0] == 0
+
+
+def test_unknown_symbols_are_refused_and_reducing_orders_shrink_gross():
+    config = rt.RiskConfig(max_order_usd=1e9)
+    shared = rt.SharedRiskState(mp.get_context("spawn"), 1, ["BTC-USD"])
+    place = guarded_shard(shared, config)
+    with pytest.raises(RuntimeError, match="unknown_symbol"):
+        place(order("DOGE-USD", "buy", 10))
+    place(order("BTC-USD", "buy", 100))
+    place(order("BTC-USD", "sell", 100))
+    assert shared.gross_exposure.value == 0 and shared.total_exposure.value == 0
+
+
+def test_guard_handles_a_missing_client():
+    bot = types.SimpleNamespace(client=rt.LazyObject(lambda: None, "client"))
+    shared = rt.SharedRiskState(mp.get_context("spawn"), 1, ["BTC-USD"])
+    assert rt._guard_client(bot, shared, rt.RiskEngine(rt.RiskConfig())) is False
+
+
+def test_routed_partial_fill_releases_the_unfilled_reservation():
+    shared = rt.SharedRiskState(mp.get_context("spawn"), 1, ["BTC-USD"])
+    trading = types.SimpleNamespace(risk=None)
+    bot = types.SimpleNamespace(client=None, engine=trading)
+    rt._guard_client(bot, shared, rt.RiskEngine(rt.RiskConfig(max_order_usd=1e9)))
+    payload = order("BTC-USD", "buy", 100)
+    reserved = trading.risk.before(payload)          # the engine reserves a routed parent's full size...
+    assert shared.gross_exposure.value == pytest.approx(100)
+    trading.risk.after(payload, reserved, 0.25, 100.0)   # ...and keeps only what filled
+    assert shared.gross_exposure.value == pytest.approx(25)
@@ -0,0 +1,59 @@
+import pytest
+
+from nija_sizing_model import DecayedKelly, backtest
+
+
+def test_no_history_sizes_at_one():
+    model = DecayedKelly()
+    assert model.kelly_fraction("BTC-USD") == pytest.approx(0.0)
+    assert model.multiplier("BTC-USD") == 1.0
+
+
+def test_kelly_fraction_matches_the_closed_form():
+    model = DecayedKelly(halflife=1e9, prior=2.0, prior_return=0.01, gain=4.0)
+    for ret in (0.02, 0.02, 0.02, -0.01):
+        model.update("BTC-USD", ret)
+    p = (3 + 2) / (4 + 4)
+    avg_win = (0.06 + 0.02) / 5
+    avg_loss = (0.01 + 0.02) / 3
+    f = p - (1 - p) * avg_loss / avg_win
+    assert model.kelly_fraction("BTC-USD") == pytest.approx(f, rel=1e-6)
+    assert model.multiplier("BTC-USD") == pytest.approx(1 + 4 * f, rel=1e-6)
+
+
+def test_multiplier_is_clamped_and_per_symbol():
+    model = DecayedKelly(min_mult=0.5, max_mult=2.0)
+    for _ in range(30):
+        model.update("WIN-USD", 0.05)
+        model.update("LOSE-USD", -0.05)
+    assert model.multiplier("WIN-USD") == 2.0
+    assert model.multiplier("LOSE-USD") == 0.5
+    assert model.multiplier("ETH-USD") == 1.0
+
+
+def test_decay_lets_recent_trades_dominate():
+    model = DecayedKelly(halflife=2)
+    for _ in range(10):
+        model.update("BTC-USD", -0.02)
+    for _ in range(10):
+        model.update("BTC-USD", 0.02)
+    assert model.kelly_fraction("BTC-USD") > 0
+
+
+def test_snapshot_restore_round_trip():
+    model = DecayedKelly()
+    for ret in (0.01, -0.02, 0.03):
+        model.update("BTC-USD", ret)
+    clone = DecayedKelly()
+    assert clone.restore(model.snapshot())
+    assert clone.multiplier("BTC-USD") == pytest.approx(model.multiplier("BTC-USD"))
+    assert not clone.restore(None) and not clone.restore({"version": 0})
+
+
+def test_backtest_sizes_before_updating():
+    result = backtest(DecayedKelly(), [("BTC-USD", 0.1), ("BTC-USD", 0.1)])
+    first = 0.1                                    # multiplier 1.0 before any history
+    model = DecayedKelly()
+    model.update("BTC-USD", 0.1)
+    assert result == {"trades": 2, "pnl": pytest.approx(first + 0.1 * model.multiplier("BTC-USD")),
+                      "flat_pnl": pytest.approx(0.2)}
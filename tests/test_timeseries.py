@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from nija_timeseries import SqliteSink, TimeSeriesRecorder, open_sink
+
+NOW = 10 * 86400.0
+
+
+def sink(tmp_path):
+    return SqliteSink(str(tmp_path / "ts.db"), retention={"ticks": None}, downsample_after=86400, bucket_sec=60)
+
+
+def test_recorder_batches_rows_into_the_sink(tmp_path):
+    s = sink(tmp_path)
+    rec = TimeSeriesRecorder(s)
+    rec.tick("BTC-USD", 100.0, 0.5, ts=1.0)
+    rec.indicators("BTC-USD", {"rsi": 55.0, "vwap": None}, ts=1.0)
+    rec.order({"product_id": "BTC-USD", "side": "buy", "size": "0.1", "idempotency_key": "k",
+               "meta": {"entry_price": 100.0, "signal_type": "hf"}}, "sent", ts=2.0)
+    assert rec.pending() == 4
+    assert rec.flush() == 4 and rec.pending() == 0
+    assert s.query("SELECT symbol, price, size FROM ticks") == [("BTC-USD", 100.0, 0.5)]
+    assert s.query("SELECT order_id, status FROM orders") == [("k", "sent")]
+
+
+def test_downsample_ticks_into_ohlcv_buckets(tmp_path):
+    s = sink(tmp_path)
+    old = NOW - 2 * 86400
+    s.write("ticks", [(old + 1, "BTC-USD", 100.0, 1.0), (old + 20, "BTC-USD", 105.0, None),
+                      (old + 40, "BTC-USD", 95.0, 2.0), (old + 59, "BTC-USD", 101.0, 1.0),
+                      (old + 61, "BTC-USD", 110.0, 1.0), (NOW - 10, "BTC-USD", 120.0, 1.0)])
+    deleted = s.maintain(now=NOW)
+    assert deleted["ticks"] == 5
+    assert s.query("SELECT ts, open, high, low, close, volume, n FROM ticks_1m ORDER BY ts") == [
+        (int(old), 100.0, 105.0, 95.0, 101.0, 4.0, 4), (int(old) + 60, 110.0, 110.0, 110.0, 110.0, 1.0, 1)]
+    assert s.query("SELECT price FROM ticks") == [(120.0,)]
+
+
+def test_late_rows_merge_into_an_already_downsampled_bucket(tmp_path):
+    s = sink(tmp_path)
+    old = NOW - 2 * 86400
+    s.write("ticks", [(old + 1, "BTC-USD", 100.0, 1.0), (old + 30, "BTC-USD", 102.0, 1.0)])
+    s.write("indicators", [(old + 1, "BTC-USD", "rsi", 40.0), (old + 2, "BTC-USD", "rsi", 50.0)])
+    s.maintain(now=NOW)
+    s.write("ticks", [(old + 50, "BTC-USD", 90.0, 3.0)])
+    s.write("indicators", [(old + 50, "BTC-USD", "rsi", 75.0)])
+    s.maintain(now=NOW)
+    assert s.query("SELECT open, high, low, close, volume, n FROM ticks_1m") == [(100.0, 102.0, 90.0, 90.0, 5.0, 3)]
+    value, n = s.query("SELECT value, n FROM indicators_1m")[0]
+    assert n == 3 and value == pytest.approx((40 + 50 + 75) / 3)
+
+
+def test_flush_and_maintenance_threads_share_the_connection(tmp_path):
+    import threading
+    s = sink(tmp_path)
+    old = NOW - 2 * 86400
+    errors = []
+
+    def run(fn):
+        try:
+            for i in range(200):
+                fn(i)
+        except Exception as e:          # interleaved transactions raise here
+            errors.append(e)
+
+    rows = [(old + 1, "BTC-USD", 100.0, 1.0)] * 5
+    writer = threading.Thread(target=run, args=(lambda i: s.write("ticks", rows),))
+    janitor = threading.Thread(target=run, args=(lambda i: s.maintain(now=NOW),))
+    writer.start(), janitor.start()
+    writer.join(), janitor.join()
+    s.maintain(now=NOW)
+    assert errors == []
+    assert s.query("SELECT SUM(n) FROM ticks_1m") == [(1000,)] and s.query("SELECT COUNT(*) FROM ticks") == [(0,)]
+
+
+def test_retention_deletes_old_rows(tmp_path):
+    s = SqliteSink(str(tmp_path / "ts.db"), retention={"equity": 3600}, downsample_after=None)
+    s.write("equity", [(NOW - 7200, "bot", 1.0), (NOW - 60, "bot", 2.0)])
+    assert s.maintain(now=NOW) == {"equity": 1}
+    assert s.query("SELECT balance FROM equity") == [(2.0,)]
+
+
+def test_flush_forever_writes_on_a_timer(tmp_path):
+    rec = TimeSeriesRecorder(sink(tmp_path), flush_sec=0.01)
+    rec.equity("bot", 100.0, ts=1.0)
+
+    async def main():
+        task = asyncio.create_task(rec.flush_forever())
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if not rec.pending():
+                break
+        task.cancel()
+
+    asyncio.run(main())
+    assert rec.sink.query("SELECT balance FROM equity") == [(100.0,)]
+
+
+def test_open_sink_urls(tmp_path):
+    assert open_sink("none") is None and open_sink("") is None
+    assert isinstance(open_sink("sqlite:" + str(tmp_path / "a.db")), SqliteSink)
+    with pytest.raises(ValueError):
+        open_sink("postgres:x")
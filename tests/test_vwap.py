@@ -0,0 +1,50 @@
+import pytest
+
+from nija_vwap import TradeFeed, VwapTracker
+
+DAY = 86400
+
+
+def test_session_vwap_and_std_from_trade_volume():
+    vwap = VwapTracker()
+    vwap.on_trade("BTC-USD", 100.0, 1.0, ts=10.0)
+    vwap.on_trade("BTC-USD", 110.0, 3.0, ts=20.0)
+    vwap.on_trade("BTC-USD", 999.0, 0.0, ts=30.0)        # no volume: ignored
+    mean, std = vwap.session("BTC-USD")
+    assert mean == pytest.approx(107.5)
+    assert std == pytest.approx((0.25 * 7.5 ** 2 + 0.75 * 2.5 ** 2) ** 0.5)
+    assert vwap.volume("BTC-USD", "session") == 4.0
+    lower, mid, upper = vwap.bands("BTC-USD", k=2, kind="session")
+    assert mid == pytest.approx(107.5) and upper - mid == pytest.approx(2 * std)
+
+
+def test_session_resets_at_the_utc_day_boundary():
+    vwap = VwapTracker()
+    vwap.on_trade("BTC-USD", 100.0, 5.0, ts=DAY - 1)
+    vwap.on_trade("BTC-USD", 200.0, 1.0, ts=DAY + 1)
+    assert vwap.session("BTC-USD") == (pytest.approx(200.0), pytest.approx(0.0))
+    assert vwap.volume("BTC-USD", "session") == 1.0
+
+
+def test_rolling_window_expires_old_trades():
+    vwap = VwapTracker(window_sec=60)
+    vwap.on_trade("BTC-USD", 100.0, 1.0, ts=0.0)
+    vwap.on_trade("BTC-USD", 120.0, 1.0, ts=50.0)
+    assert vwap.rolling("BTC-USD", now=50.0)[0] == pytest.approx(110.0)
+    assert vwap.rolling("BTC-USD", now=100.0)[0] == pytest.approx(120.0)
+    assert vwap.rolling("BTC-USD", now=200.0) is None
+    assert vwap.volume("BTC-USD") == 0.0
+    assert vwap.session("BTC-USD")[0] == pytest.approx(110.0)
+    assert vwap.session("ETH-USD") is None
+
+
+def test_trade_feed_pushes_only_unseen_trades():
+    batches = [
+        [("1", 100.0, 1.0, 10.0), ("2", 101.0, 1.0, 11.0)],
+        [("1", 100.0, 1.0, 10.0), ("2", 101.0, 1.0, 11.0), ("3", 102.0, 2.0, 11.0)],
+        [("3", 102.0, 2.0, 11.0)],
+    ]
+    vwap = VwapTracker()
+    feed = TradeFeed(None, ["BTC-USD"], [vwap], fetch=lambda client, symbol: batches.pop(0))
+    assert [feed.poll("BTC-USD") for _ in range(3)] == [2, 1, 0]
+    assert vwap.volume("BTC-USD", "session") == 4.0
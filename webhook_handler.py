@@ -8,6 +8,8 @@ import uuid
 from fastapi import APIRouter, Request, Header, HTTPException
 from starlette.responses import JSONResponse
 
+from nija_metrics import ORDERS_SENT, ORDERS_DRY_RUN, ORDER_ERRORS
+
 router = APIRouter()
 logger = logging.getLogger("nija")
 
@@ -80,6 +82,7 @@ async def tradingview_webhook(
 
     if DRY_RUN:
         logger.info({"evt":"order.dry_run","req_id":req_id,"order": order_payload})
+        ORDERS_DRY_RUN.labels("webhook").inc()
         return JSONResponse({"status":"dry_run", "req_id": req_id, "order": order_payload})
 
     # 5) Place order (replace with your actual function that calls Coinbase SDK)
@@ -89,8 +92,10 @@ async def tradingview_webhook(
         logger.info({"evt":"order.sending","req_id":req_id,"order":order_payload})
         result = {"ok": True, "order_id": "SIM-12345"}  # placeholder
         logger.info({"evt":"order.sent","req_id":req_id,"result": result})
+        ORDERS_SENT.labels("webhook").inc()
     except Exception as e:
         logger.exception({"evt":"order.error","req_id":req_id,"error": str(e)})
+        ORDER_ERRORS.labels("webhook").inc()
         raise HTTPException(status_code=500, detail="Order placement failed")
 
     return JSONResponse({"status":"ok","req_id":req_id,"result": result})